@@ -1,11 +1,24 @@
 import dash
-from dash import dcc, html, Input, Output
-from dash_auth import BasicAuth
+from dash import dcc, html, Input, Output, State, Patch, ctx
+from dash_auth import BasicAuth, add_public_routes
 import os
+import csv
 import json
-import plotly.graph_objs as go
-import pandas as pd
-from flask import send_from_directory, abort
+import time
+import random
+import bisect
+import logging
+import hashlib
+import hmac
+import mimetypes
+import threading
+from collections import OrderedDict
+from functools import lru_cache, wraps
+import numpy as np
+from flask import send_from_directory, abort, request, jsonify, g, Response
+from werkzeug.security import safe_join
+from compact_figure import load_figure, decode_typed_array
+from coverage_tracks import load_track_index, track_window, TRACK_INDEX_FILENAME
 
 # Initialize Dash app
 app = dash.Dash(__name__)
@@ -28,27 +41,815 @@ files = [
     "gene_category_summary_table.csv"
 ]
 
-# Load Plotly figure from JSON
-fig_dict = {}
-try:
-    with open(os.path.join("assets", "all_sporulation_genes_scatter_plot.json"), 'r') as f:
-        fig_dict = json.load(f)
-except Exception as e:
-    print(f"Error loading plot JSON: {e}")
-
-# Read gene count and gene list from sporulation_CV_statistics.csv
-gene_count = 0
-valid_genes = set()
-try:
-    df = pd.read_csv(os.path.join("data", "sporulation_CV_statistics.csv"))
-    gene_count = len(df["Gene"].unique())
-    valid_genes = set(df["Gene"].str.lower())  # List of valid gene names for validation
-except Exception as e:
-    print(f"Error reading gene count: {e}")
+# Dashboard data sources produced by script.py
+FIGURE_JSON_PATH = os.path.join("assets", "all_sporulation_genes_scatter_plot.json")
+# Compact exports are preferred over the plain JSON when present (see compact_figure.py)
+FIGURE_PATHS = [
+    os.path.join("assets", "all_sporulation_genes_scatter_plot.compact.json.gz"),
+    os.path.join("assets", "all_sporulation_genes_scatter_plot.compact.json"),
+    FIGURE_JSON_PATH
+]
+STATS_CSV_PATH = os.path.join("data", "sporulation_CV_statistics.csv")
+STATS_COLUMNS_DIR = os.path.join("data", "sporulation_CV_statistics_columns")
+CATEGORY_TABLE_PATH = os.path.join("data", "gene_category_summary_table.csv")
+TRACKS_DIR = os.path.join("data", "coverage_tracks")
+
+# /api/genes pagination
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 1000
+API_MAX_BATCH = 1000
+
+# Points per sample returned by /api/tracks and drawn in the coverage-track panel
+TRACK_DEFAULT_POINTS = 1000
+TRACK_MAX_POINTS = 5000
+
+# Cache lifetime for /data responses requested with a matching ?v=<etag> (the dashboard's own links)
+DATA_MAX_AGE = 365 * 24 * 3600
+
+# Precompressed variants written by script.py, in order of preference
+DATA_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+# Files whose changes trigger a reload of the dashboard data (see SnapshotWatcher)
+SNAPSHOT_SOURCES = FIGURE_PATHS + [
+    STATS_CSV_PATH,
+    os.path.join(STATS_COLUMNS_DIR, "categories.json"),
+    CATEGORY_TABLE_PATH,
+    os.path.join(TRACKS_DIR, TRACK_INDEX_FILENAME)
+] + [os.path.join("data", filename) for filename in files if filename not in
+     ("sporulation_CV_statistics.csv", "gene_category_summary_table.csv")]
+
+# Seconds between checks for new pipeline outputs (0 = load once at startup)
+DATA_RELOAD_INTERVAL = float(os.environ.get("DATA_RELOAD_INTERVAL", 5))
+
+# Gene-search result cache settings
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 256))
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 3600))  # seconds, 0 = no expiry
+
+# Fraction of searches logged as structured JSON lines (0 = off, 1 = every search)
+SEARCH_LOG_SAMPLE_RATE = float(os.environ.get("SEARCH_LOG_SAMPLE_RATE", 0.1))
+
+# Bearer token for /metrics scrapers. Unset, /metrics needs the dashboard login like every other page.
+# The client address is not trusted: behind a reverse proxy every request comes from 127.0.0.1
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+logger = logging.getLogger("sporulation.app")
+
+# Request metrics, exposed in Prometheus text format on /metrics
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+def format_labels(names, values, extra=""):
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    pairs = [f'{name}="{value}"' for name, value in zip(names, escaped)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Thread-safe Prometheus counter with labels"""
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.label_names, labels)} {value}")
+        return lines
+
+class Histogram:
+    """Thread-safe Prometheus histogram with labels and fixed bucket bounds"""
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, sum, count
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            position = bisect.bisect_left(self.buckets, value)
+            if position < len(self.buckets):
+                series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = format_labels(self.label_names, labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                inf_labels = format_labels(self.label_names, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf_labels} {count}")
+                lines.append(f"{self.name}_sum{format_labels(self.label_names, labels)} {total}")
+                lines.append(f"{self.name}_count{format_labels(self.label_names, labels)} {count}")
+        return lines
+
+callback_latency = Histogram("sporulation_callback_duration_seconds", "Dash callback latency",
+                             ("callback",), LATENCY_BUCKETS)
+request_latency = Histogram("sporulation_http_request_duration_seconds", "HTTP request latency by route",
+                            ("route", "method"), LATENCY_BUCKETS)
+response_size = Histogram("sporulation_http_response_bytes", "HTTP response body size by route",
+                          ("route", "method"), SIZE_BUCKETS)
+request_count = Counter("sporulation_http_requests_total", "HTTP requests by route and status",
+                        ("route", "method", "status"))
+
+def timed_callback(name):
+    """Record the wrapped Dash callback's latency in callback_latency"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                callback_latency.observe((name,), time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+@app.server.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.server.after_request
+def record_request_metrics(response):
+    # Label by URL rule rather than path so /data/<filename> etc. stay one series
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    labels = (route, request.method)
+    request_count.inc((route, request.method, str(response.status_code)))
+    start = g.pop("request_start", None)
+    if start is not None:
+        request_latency.observe(labels, time.perf_counter() - start)
+    if response.content_length is not None:
+        response_size.observe(labels, response.content_length)
+    return response
+
+def load_stats_columns(directory):
+    """Load the columnar statistics store written by script.py.
+
+    Numeric and code columns are memory-mapped, so gunicorn workers share the
+    page cache instead of each holding a parsed copy. Returns a dict of column
+    arrays plus the Gene/Sample/Color lookup tables under "categories".
+    """
+    with open(os.path.join(directory, "categories.json"), 'r') as f:
+        meta = json.load(f)
+    columns = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+        for name in ["Gene", "Sample", "Color", "Mean", "SD", "CV", "Range"]
+    }
+    columns["categories"] = meta["categories"]
+    return columns
+
+def decode_stats_columns(columns):
+    """Turn a columnar store's Gene/Sample/Color codes into arrays of names, leaving the numeric columns as they are"""
+    decoded = {
+        name: np.asarray(columns["categories"][name], dtype=object)[columns[name]]
+        for name in ["Gene", "Sample", "Color"]
+    }
+    decoded.update({name: columns[name] for name in ["Mean", "SD", "CV", "Range"]})
+    return decoded
+
+def load_gene_categories(path):
+    """Map gene name -> category from gene_category_summary_table.csv"""
+    with open(path, 'r', newline='') as f:
+        return {
+            gene: row["Category"]
+            for row in csv.DictReader(f)
+            for gene in row["Genes"].split(", ")
+        }
+
+def json_number(value):
+    """Convert a NumPy scalar to a JSON-safe Python number (NaN becomes None)"""
+    value = value.item() if hasattr(value, "item") else value
+    return None if isinstance(value, float) and value != value else value
+
+def build_gene_index(columns, gene_categories):
+    """Index per-gene statistics for the /api/genes endpoints.
+
+    columns maps Gene, Sample (and optionally Color) to per-row names and
+    Mean, SD, CV and Range to per-row values. Rows are sorted by gene once and
+    converted to Python values in bulk rather than grouped gene by gene.
+
+    Genes are kept in sorted order with their JSON records prebuilt, so a name
+    lookup is a dict hit. Each gene's maximum CV and Range across samples are
+    kept in sorted arrays, so cv_min/range_min filters become searchsorted
+    range scans.
+    """
+    gene_names = np.asarray(columns["Gene"]).astype(str)
+    order = np.argsort(gene_names, kind="stable")
+    sorted_genes = gene_names[order]
+    starts = np.flatnonzero(np.r_[True, sorted_genes[1:] != sorted_genes[:-1]]) if len(order) else order
+    ends = np.r_[starts[1:], len(order)]
+
+    fields = ["Sample", "Mean", "SD", "CV", "Range"] + (["Color"] if "Color" in columns else [])
+    values = {name: np.asarray(columns[name])[order].tolist() for name in fields}
+    cv_sorted = np.asarray(columns["CV"], dtype=float)[order]
+    range_sorted = np.asarray(columns["Range"], dtype=float)[order]
+    cv_max = np.fmax.reduceat(cv_sorted, starts) if len(starts) else np.array([])
+    range_max = np.fmax.reduceat(range_sorted, starts) if len(starts) else np.array([])
+
+    genes = sorted_genes[starts].tolist()
+    records = []
+    for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        samples = [
+            {
+                "Sample": str(values["Sample"][j]),
+                "Mean": json_number(values["Mean"][j]),
+                "SD": json_number(values["SD"][j]),
+                "CV": json_number(values["CV"][j]),
+                "Range": json_number(values["Range"][j]),
+                **({"Color": str(values["Color"][j])} if "Color" in values else {})
+            }
+            for j in range(start, end)
+        ]
+        records.append({
+            "gene": genes[i],
+            "category": gene_categories.get(genes[i]),
+            "max_cv": json_number(cv_max[i]),
+            "max_range": json_number(range_max[i]),
+            "samples": samples
+        })
+
+    categories = np.array([record["category"] or "" for record in records], dtype=object)
+    cv_order = np.argsort(cv_max, kind="stable")
+    range_order = np.argsort(range_max, kind="stable")
+    return {
+        "genes": genes,
+        "records": records,
+        "by_name": {gene.lower(): i for i, gene in enumerate(genes)},
+        "category_genes": {
+            category.lower(): np.flatnonzero(categories == category)
+            for category in set(categories) if category
+        },
+        "cv_max": cv_max,
+        "cv_order": cv_order,
+        "cv_sorted": cv_max[cv_order],
+        "range_max": range_max,
+        "range_order": range_order,
+        "range_sorted": range_max[range_order]
+    }
+
+def query_gene_index(index, category=None, cv_min=None, range_min=None):
+    """Return sorted gene positions matching all given filters"""
+    candidates = None
+    for key, minimum in (("cv", cv_min), ("range", range_min)):
+        if minimum is None:
+            continue
+        values = index[f"{key}_sorted"]
+        # NaN maxima sort last and never satisfy a minimum
+        start = np.searchsorted(values, minimum, side="left")
+        end = np.searchsorted(values, np.inf, side="right")
+        matches = index[f"{key}_order"][start:end]
+        candidates = matches if candidates is None else np.intersect1d(candidates, matches)
+    if category is not None:
+        matches = index["category_genes"].get(category.lower(), np.array([], dtype=np.intp))
+        candidates = matches if candidates is None else np.intersect1d(candidates, matches)
+    if candidates is None:
+        return np.arange(len(index["genes"]))
+    return np.sort(candidates)
+
+def trace_gene_names(trace):
+    """Return the gene name of every point in a figure trace, or None if it has no customdata"""
+    customdata = trace.get("customdata")
+    if customdata is None:
+        return None
+    return [row[0] if row[0] else "" for row in customdata]
+
+def build_search_index(fig_dict, valid_genes):
+    """Precompute everything update_plot needs to answer a search.
+
+    Genes are numbered once, every point is mapped to its gene number, and
+    every substring of every lowercase gene name maps to the genes that
+    contain it. A search term is then a dict lookup returning only its hits,
+    and the per-trace marker arrays come from NumPy masks.
+    """
+    gene_ids = {}
+    traces = []
+    n_points = 0
+    for trace in fig_dict.get("data", []):
+        names = trace_gene_names(trace)
+        if names is None:
+            traces.append(None)
+            continue
+        marker = trace.get("marker", {})
+        codes = np.array([gene_ids.setdefault(name.lower(), len(gene_ids)) for name in names], dtype=np.int32)
+        traces.append({
+            "gene_codes": codes,
+            # Positions of this trace's points in the figure-wide point arrays
+            "points": np.arange(n_points, n_points + len(codes)),
+            "opacity": marker.get("opacity", 1.0),
+            "size": marker.get("size", 6),
+            "hovertemplate": trace.get("hovertemplate")
+        })
+        n_points += len(codes)
+
+    genes = list(gene_ids)
+    substrings = {}
+    for gene_id, gene in enumerate(genes):
+        for start in range(len(gene)):
+            for end in range(start + 1, len(gene) + 1):
+                substrings.setdefault(gene[start:end], set()).add(gene_id)
+
+    return {
+        "genes": genes,
+        "valid": np.array([gene in valid_genes for gene in genes], dtype=bool),
+        "substrings": {key: np.fromiter(ids, dtype=np.int32, count=len(ids)) for key, ids in substrings.items()},
+        "traces": traces,
+        "point_gene_codes": np.concatenate(
+            [info["gene_codes"] for info in traces if info is not None] or [np.array([], dtype=np.int32)]
+        )
+    }
+
+def match_genes(index, search_genes):
+    """Return a boolean mask over index["genes"] of valid genes containing any search term"""
+    matched = np.zeros(len(index["genes"]), dtype=bool)
+    for search_gene in search_genes:
+        hits = index["substrings"].get(search_gene)
+        if hits is not None:
+            matched[hits] = True
+    return matched & index["valid"]
+
+def source_signature(paths):
+    """Return (path, size, mtime) for each existing path, used to detect regenerated data"""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((path, st.st_size, st.st_mtime_ns))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+class SearchCache:
+    """Thread-safe LRU cache of gene-search results with an optional TTL.
+
+    Entries are dropped once they're older than `ttl` seconds. Keys carry the
+    snapshot version and reload_snapshot() clears the cache, so lookups never
+    need to check the data files themselves.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+def compute_search_result(index, search_genes, slots=None):
+    """Return the matched gene names and per-trace (opacity, size, hovertemplate) lists for a search.
+
+    slots optionally gives each trace's point positions (from a threshold view)
+    in place of the figure's own trace membership.
+    """
+    matched = match_genes(index, search_genes)
+    traces = []
+    for i, info in enumerate(index["traces"]):
+        if info is None:
+            traces.append(None)
+            continue
+        gene_codes = info["gene_codes"] if slots is None else index["point_gene_codes"][slots[i]]
+        # Matching points keep their style and grow; the rest are hidden with hover disabled
+        point_mask = matched[gene_codes]
+        traces.append((
+            np.where(point_mask, info["opacity"], 0).tolist(),
+            np.where(point_mask, info["size"] * 1.5, info["size"]).tolist(),
+            np.where(point_mask, info["hovertemplate"], "").tolist()
+        ))
+    return {
+        "matched_genes": frozenset(index["genes"][i] for i in np.flatnonzero(matched)),
+        "traces": traces
+    }
+
+# Threshold what-if: category styling as in script.py's create_interactive_plot.
+# Colors are listed in draw order; codes index this list.
+CATEGORY_COLORS = ["gray", "black", "green", "blue", "red"]
+GRAY, BLACK, GREEN, BLUE, RED = range(len(CATEGORY_COLORS))
+CATEGORY_TRACE_STYLES = {
+    "gray": {"name": "Below Threshold", "legendrank": 4, "marker": {"size": 5, "opacity": 0.7, "symbol": "circle"}},
+    "black": {"name": "Partial Threshold", "legendrank": 3, "marker": {"size": 5, "opacity": 0.9, "symbol": "circle"}},
+    "green": {"name": "Common Genes", "legendrank": 2, "marker": {"size": 7, "opacity": 1.0, "symbol": "square"}},
+    "blue": {"name": "YB955", "legendrank": 0, "marker": {"size": 10, "opacity": 1.0, "symbol": "circle"}},
+    "red": {"name": "Mfd<sup>−</sup>", "legendrank": 1, "marker": {"size": 10, "opacity": 1.0, "symbol": "circle"}}
+}
+CATEGORY_NAMES = {GREEN: "Common Genes", RED: "Mfd-", BLUE: "YB955", BLACK: "Partial Threshold", GRAY: "Below Threshold"}
+SAMPLE_COLUMNS = {"M1": 0, "M2": 1, "M3": 2, "Y1": 3, "Y2": 4, "Y3": 5}
+DEFAULT_CV_THRESHOLD = 0.11
+DEFAULT_RANGE_THRESHOLD = 2000
+
+def supports_threshold_model(fig_dict):
+    """Whether the figure holds M1..Y3 points in the default category colors.
+
+    Figures from a sample-sheet run have their own samples and strain groups,
+    which the figure doesn't record, so the sliders can't reclassify them.
+    """
+    samples = set()
+    for trace in fig_dict.get("data", []):
+        if trace.get("marker", {}).get("color") not in CATEGORY_COLORS:
+            return False
+        samples.update(row[1] for row in trace.get("customdata") or [])
+    return samples == set(SAMPLE_COLUMNS)
+
+def ensure_category_traces(fig_dict):
+    """Append an empty, styled trace for every category color the figure has no trace for"""
+    data = fig_dict.get("data", [])
+    if not data:
+        return fig_dict
+    present = {trace.get("marker", {}).get("color") for trace in data}
+    template = data[0]
+    for color in CATEGORY_COLORS:
+        if color in present:
+            continue
+        style = CATEGORY_TRACE_STYLES[color]
+        data.append({
+            "type": template.get("type", "scatter"),
+            "mode": "markers",
+            "name": style["name"],
+            "legendgroup": color,
+            "legendrank": style["legendrank"],
+            "showlegend": True,
+            "marker": dict(style["marker"], color=color),
+            "hovertemplate": template.get("hovertemplate"),
+            "x": [], "y": [], "customdata": []
+        })
+    return fig_dict
+
+def figure_thresholds(fig_dict):
+    """Read the (CV, Range) threshold line positions from the figure's shapes"""
+    cv_threshold, range_threshold = DEFAULT_CV_THRESHOLD, DEFAULT_RANGE_THRESHOLD
+    for shape in fig_dict.get("layout", {}).get("shapes", []):
+        if shape.get("xref") == "x" and shape.get("x0") == shape.get("x1"):
+            cv_threshold = shape["x0"]
+        elif shape.get("yref") == "y" and shape.get("y0") == shape.get("y1"):
+            range_threshold = shape["y0"]
+    return cv_threshold, range_threshold
+
+def build_threshold_model(fig_dict, index):
+    """Lay every plotted point out as a (genes x M1..Y3) CV/Range matrix for fast reclassification.
+
+    "enabled" is False for figures supports_threshold_model() rejects; their
+    views always keep the figure's own trace membership.
+    """
+    xs, ys, customdata = [], [], []
+    for trace, info in zip(fig_dict.get("data", []), index["traces"]):
+        if info is None:
+            continue
+        xs.append(decode_typed_array(trace.get("x", [])).astype(float))
+        ys.append(decode_typed_array(trace.get("y", [])).astype(float))
+        customdata.extend(list(row) for row in trace["customdata"])
+    x = np.concatenate(xs) if xs else np.array([])
+    y = np.concatenate(ys) if ys else np.array([])
+
+    gene_codes = index["point_gene_codes"]
+    columns = np.array([SAMPLE_COLUMNS.get(row[1], -1) for row in customdata], dtype=np.intp)
+    in_matrix = columns >= 0
+    cv = np.full((len(index["genes"]), 6), np.nan)
+    value_range = np.full((len(index["genes"]), 6), np.nan)
+    present = np.zeros((len(index["genes"]), 6), dtype=bool)
+    cv[gene_codes[in_matrix], columns[in_matrix]] = x[in_matrix]
+    value_range[gene_codes[in_matrix], columns[in_matrix]] = y[in_matrix]
+    present[gene_codes[in_matrix], columns[in_matrix]] = True
+
+    trace_colors = [trace.get("marker", {}).get("color") for trace in fig_dict.get("data", [])]
+    return {
+        "x": x, "y": y, "customdata": customdata,
+        "gene_codes": gene_codes, "columns": columns,
+        "cv": cv, "range": value_range, "present": present,
+        "color_slots": {
+            code: trace_colors.index(color) for code, color in enumerate(CATEGORY_COLORS) if color in trace_colors
+        },
+        "default_thresholds": figure_thresholds(fig_dict),
+        "enabled": supports_threshold_model(fig_dict)
+    }
+
+def classify_points(model, cv_threshold, range_threshold):
+    """Return (color code per point, category color code per gene) for the given thresholds.
+
+    Same rules as script.py: a complete M or Y half is red/blue when every
+    sample meets a threshold and black when some do; a gene is green when
+    both halves fully meet them.
+    """
+    with np.errstate(invalid='ignore'):
+        meets = (model["range"] >= range_threshold) | (model["cv"] >= cv_threshold)
+    m_complete = model["present"][:, :3].all(axis=1)
+    y_complete = model["present"][:, 3:].all(axis=1)
+    m_all = m_complete & meets[:, :3].all(axis=1)
+    m_any = m_complete & meets[:, :3].any(axis=1)
+    y_all = y_complete & meets[:, 3:].all(axis=1)
+    y_any = y_complete & meets[:, 3:].any(axis=1)
+    green = m_all & y_all
+
+    m_code = np.select([green, m_all, m_any], [GREEN, RED, BLACK], GRAY)
+    y_code = np.select([green, y_all, y_any], [GREEN, BLUE, BLACK], GRAY)
+    other_code = np.where(green, GREEN, GRAY)
+
+    genes, columns = model["gene_codes"], model["columns"]
+    point_codes = np.select(
+        [(columns >= 0) & (columns < 3), columns >= 3],
+        [m_code[genes], y_code[genes]],
+        other_code[genes]
+    )
+    gene_categories = np.select(
+        [green, m_code == RED, y_code == BLUE, (m_code == BLACK) | (y_code == BLACK)],
+        [GREEN, RED, BLUE, BLACK],
+        GRAY
+    )
+    return point_codes, gene_categories
+
+def threshold_view(model, index, cv_threshold, range_threshold):
+    """Return per-trace point positions and per-category gene counts for the given thresholds"""
+    if not model["enabled"]:
+        slots = [info["points"] if info is not None else None for info in index["traces"]]
+        return {"thresholds": model["default_thresholds"], "slots": slots, "counts": {}}
+    if (cv_threshold, range_threshold) == model["default_thresholds"]:
+        # The figure was built at these thresholds; keep its exact trace membership
+        slots = [info["points"] if info is not None else None for info in index["traces"]]
+        _, gene_categories = classify_points(model, cv_threshold, range_threshold)
+    else:
+        point_codes, gene_categories = classify_points(model, cv_threshold, range_threshold)
+        slots = [info["points"][:0] if info is not None else None for info in index["traces"]]
+        for code, slot in model["color_slots"].items():
+            slots[slot] = np.flatnonzero(point_codes == code)
+    # Genes that only have points outside the M1..Y3 matrix aren't counted as Below Threshold
+    counted = model["present"].any(axis=1)
+    counts = {name: int(np.count_nonzero(gene_categories[counted] == code)) for code, name in CATEGORY_NAMES.items()}
+    return {"thresholds": (cv_threshold, range_threshold), "slots": slots, "counts": counts}
+
+def threshold_shapes(layout, cv_threshold, range_threshold):
+    """Return the layout's shapes and annotations with the threshold lines moved"""
+    shapes = []
+    for shape in layout.get("shapes", []):
+        if shape.get("xref") == "x" and shape.get("x0") == shape.get("x1"):
+            shape = dict(shape, x0=cv_threshold, x1=cv_threshold)
+        elif shape.get("yref") == "y" and shape.get("y0") == shape.get("y1"):
+            shape = dict(shape, y0=range_threshold, y1=range_threshold)
+        shapes.append(shape)
+    annotations = []
+    for annotation in layout.get("annotations", []):
+        if annotation.get("xref") == "x":
+            annotation = dict(annotation, x=cv_threshold, text=f" CV ≥ {cv_threshold}")
+        elif annotation.get("yref") == "y":
+            annotation = dict(annotation, y=range_threshold, text=f"Range ≥ {range_threshold}")
+        annotations.append(annotation)
+    return shapes, annotations
+
+def load_snapshot():
+    """Load every dashboard data source and build the indexes derived from them.
+
+    Returns a snapshot dict that is never modified once built; requests read
+    the module-level `snapshot` once and use that object throughout, so a
+    reload swapping in a new snapshot can't change data under them.
+    """
+    signature = source_signature(SNAPSHOT_SOURCES)
+    # Short content version, sent to the page so callbacks can spot a stale figure
+    version = hashlib.sha256(repr(signature).encode()).hexdigest()[:16]
+
+    # Load Plotly figure from the first available export
+    fig_dict = {}
+    try:
+        figure_path = next((path for path in FIGURE_PATHS if os.path.exists(path)), FIGURE_JSON_PATH)
+        fig_dict = load_figure(figure_path)
+    except Exception as e:
+        logger.error(f"Error loading plot JSON: {e}")
+
+    # Read gene count and gene list, preferring the columnar store over sporulation_CV_statistics.csv
+    gene_count = 0
+    valid_genes = set()
+    stats = None
+    try:
+        stats_columns = load_stats_columns(STATS_COLUMNS_DIR)
+        gene_names = stats_columns["categories"]["Gene"]
+        gene_count = len(gene_names)
+        valid_genes = {gene.lower() for gene in gene_names}  # List of valid gene names for validation
+        stats = decode_stats_columns(stats_columns)
+    except Exception:
+        try:
+            # Only needed without a columnar store, so pandas isn't imported otherwise
+            import pandas as pd
+            df = pd.read_csv(STATS_CSV_PATH)
+            gene_count = len(df["Gene"].unique())
+            valid_genes = set(df["Gene"].str.lower())  # List of valid gene names for validation
+            stats = {name: df[name].to_numpy() for name in df.columns}
+        except Exception as e:
+            logger.error(f"Error reading gene count: {e}")
+
+    gene_index = None
+    try:
+        gene_categories = load_gene_categories(CATEGORY_TABLE_PATH) if os.path.exists(CATEGORY_TABLE_PATH) else {}
+        if stats is not None:
+            gene_index = build_gene_index(stats, gene_categories)
+    except Exception as e:
+        logger.exception(f"Error building gene index: {e}")
+
+    track_index = load_track_index(TRACKS_DIR)
+    tracks = None
+    if track_index is not None:
+        tracks = {"index": track_index, "by_name": {gene.lower(): gene for gene in track_index["genes"]}}
+
+    if supports_threshold_model(fig_dict):
+        fig_dict = ensure_category_traces(fig_dict)
+    search_index = build_search_index(fig_dict, valid_genes)
+    threshold_model = build_threshold_model(fig_dict, search_index)
+
+    @lru_cache(maxsize=64)
+    def cached_threshold_view(cv_threshold, range_threshold):
+        return threshold_view(threshold_model, search_index, cv_threshold, range_threshold)
+
+    # Warm the default view so the first callback after a swap isn't slower
+    cached_threshold_view(*threshold_model["default_thresholds"])
+
+    return {
+        "version": version,
+        "signature": signature,
+        "loaded_at": time.time(),
+        "fig_dict": fig_dict,
+        "gene_count": gene_count,
+        "valid_genes": valid_genes,
+        "gene_index": gene_index,
+        "tracks": tracks,
+        "search_index": search_index,
+        "threshold_model": threshold_model,
+        "threshold_view": cached_threshold_view
+    }
+
+snapshot = load_snapshot()
+
+search_cache = SearchCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+snapshot_reloads = Counter("sporulation_snapshot_reloads_total", "Background data reloads by result", ("result",))
+
+def reload_snapshot():
+    """Build a snapshot from the current files and swap it in; the old one stays live on failure"""
+    global snapshot
+    start = time.perf_counter()
+    try:
+        new_snapshot = load_snapshot()
+    except Exception:
+        logger.exception("Data reload failed; keeping the current snapshot")
+        snapshot_reloads.inc(("error",))
+        return False
+    # A single reference assignment, so every request sees either the old or the new snapshot
+    snapshot = new_snapshot
+    search_cache.clear()
+    snapshot_reloads.inc(("ok",))
+    logger.info(json.dumps({
+        "event": "data_reload",
+        "version": new_snapshot["version"],
+        "genes": new_snapshot["gene_count"],
+        "seconds": round(time.perf_counter() - start, 3)
+    }))
+    return True
+
+class SnapshotWatcher:
+    """Daemon thread that polls SNAPSHOT_SOURCES and reloads the snapshot when they change.
+
+    A change is only loaded once the files have stayed the same for one more
+    poll, so a pipeline run that is still writing outputs isn't picked up
+    half-way. A signature whose reload failed isn't retried until it changes.
+    `reload` replaces reload_snapshot (serve.py also restarts its workers).
+    """
+
+    def __init__(self, interval, reload=None):
+        self.interval = interval
+        self.reload = reload or reload_snapshot
+        self.pid = os.getpid()
+        self._pending = None
+        self._failed = None
+        self._thread = threading.Thread(target=self._run, name="snapshot-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def poll(self):
+        signature = source_signature(SNAPSHOT_SOURCES)
+        if signature in (snapshot["signature"], self._failed):
+            self._pending = None
+        elif signature != self._pending:
+            self._pending = signature
+        else:
+            self._pending = None
+            if not self.reload():
+                self._failed = signature
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Data reload check failed")
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+@app.server.before_request
+def ensure_snapshot_watcher():
+    # Started lazily and per process, so forked server workers each get their own thread
+    global _watcher
+    if DATA_RELOAD_INTERVAL <= 0 or (_watcher is not None and _watcher.pid == os.getpid()):
+        return
+    with _watcher_lock:
+        if _watcher is None or _watcher.pid != os.getpid():
+            _watcher = SnapshotWatcher(DATA_RELOAD_INTERVAL).start()
+
+_etag_cache = {}
+
+def file_etag(path):
+    """Content-hash ETag for a file, recomputed only when its size or mtime changes"""
+    st = os.stat(path)
+    key = (st.st_size, st.st_mtime_ns)
+    cached = _etag_cache.get(path)
+    if cached is None or cached[0] != key:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        cached = _etag_cache[path] = (key, digest.hexdigest()[:32])
+    return cached[1]
+
+def precompressed_variant(path, accept_encodings):
+    """Return (encoding, suffix) of the best up-to-date precompressed copy the client accepts, or (None, "")"""
+    source_mtime = os.stat(path).st_mtime_ns
+    for encoding, suffix in DATA_ENCODINGS:
+        if encoding not in accept_encodings:
+            continue
+        try:
+            if os.stat(path + suffix).st_mtime_ns >= source_mtime:
+                return encoding, suffix
+        except OSError:
+            continue
+    return None, ""
+
+def data_file_href(filename):
+    """Link to a data file with its ETag as a version, so the response can be cached long-term"""
+    try:
+        return f"/data/{filename}?v={file_etag(os.path.join('data', filename))}"
+    except OSError:
+        return f"/data/{filename}"
+
+def slider_max(values, fallback, decimals):
+    """Round the largest finite value up for a slider's upper bound"""
+    finite = values[np.isfinite(values)] if len(values) else values
+    if not len(finite):
+        return fallback
+    return float(np.ceil(finite.max() * 10 ** decimals) / 10 ** decimals)
 
 # Define layout with inline CSS
-app.layout = html.Div([
-    dcc.Markdown("""
+# Built per page load from the current snapshot, so reloaded data shows up on refresh
+def serve_layout():
+    current = snapshot
+    threshold_model = current["threshold_model"]
+    return html.Div([
+        dcc.Markdown("""
         <style>
             body {
                 font-family: Arial, sans-serif;
@@ -89,6 +890,10 @@ app.layout = html.Div([
             .search-container {
                 margin-bottom: 20px;
             }
+            .threshold-container {
+                width: 600px;
+                margin: 0 auto 20px auto;
+            }
             input[type="text"] {
                 padding: 8px;
                 font-size: 14px;
@@ -97,111 +902,417 @@ app.layout = html.Div([
                 border-radius: 5px;
             }
         </style>
-    """, dangerously_allow_html=True),
-    html.H1("Sporulation Dashboard"),
-    html.H2(f"n = {gene_count} genes"),
-    html.Div([
-        html.Label("Search Genes (comma-separated):"),
-        dcc.Input(id="gene-search", type="text", placeholder="e.g., cotC, spo0A", style={"marginLeft": "10px"}),
-    ], className="search-container"),
-    dcc.Graph(id="scatter-plot", figure=go.Figure(fig_dict)),
-    html.H2("Data Files"),
-    html.Div([
-        html.Div(
-            html.A(file, href=f"/data/{file}", target="_blank", className="btn")
-        ) for file in files
-    ], className="button-container")
-])
-
-# Callback to update plot based on gene search
-# Minimal modification of your original function
-# Minimal modification of your original function
-# Minimal modification of your original function
-# Minimal modification of your original function
-# Minimal modification of your original function
-# Minimal modification of your original function
+        """, dangerously_allow_html=True),
+        html.H1("Sporulation Dashboard"),
+        html.H2(f"n = {current['gene_count']} genes"),
+        html.Div([
+            html.Label("Search Genes (comma-separated):"),
+            dcc.Input(id="gene-search", type="text", placeholder="e.g., cotC, spo0A", style={"marginLeft": "10px"}),
+        ], className="search-container"),
+        html.Div([
+            html.Label("CV threshold:"),
+            dcc.Slider(
+                id="cv-threshold", min=0, max=slider_max(threshold_model["x"], 0.5, 2), step=0.005,
+                disabled=not threshold_model["enabled"],
+                value=threshold_model["default_thresholds"][0], marks=None,
+                tooltip={"placement": "bottom", "always_visible": True}
+            ),
+            html.Label("Range threshold:"),
+            dcc.Slider(
+                id="range-threshold", min=0, max=slider_max(threshold_model["y"], 10000, -2), step=50,
+                disabled=not threshold_model["enabled"],
+                value=threshold_model["default_thresholds"][1], marks=None,
+                tooltip={"placement": "bottom", "always_visible": True}
+            ),
+            html.Div(id="category-counts")
+        ], className="threshold-container",
+            # Sample-sheet figures can't be reclassified here (see supports_threshold_model)
+            style=None if threshold_model["enabled"] else {"display": "none"}),
+        dcc.Graph(id="scatter-plot", figure=current["fig_dict"]),
+        # Coverage track of the last clicked gene; hidden until a point is clicked
+        dcc.Graph(id="coverage-track", style={"display": "none"}),
+        dcc.Store(id="data-version", data=current["version"]),
+        html.H2("Data Files"),
+        html.Div([
+            html.Div(
+                html.A(file, href=data_file_href(file), target="_blank", className="btn")
+            ) for file in files
+        ], className="button-container")
+    ])
+
+app.layout = serve_layout
+
+def triggered_input():
+    """Id of the input that fired the current callback (None on the initial call or outside a callback)"""
+    try:
+        return ctx.triggered_id
+    except dash.exceptions.MissingCallbackContextException:
+        return None
+
+def should_log_search():
+    return (SEARCH_LOG_SAMPLE_RATE > 0 and logger.isEnabledFor(logging.INFO)
+            and random.random() < SEARCH_LOG_SAMPLE_RATE)
+
+def log_search(search_genes, matched_genes, cache_hit, seconds):
+    logger.info(json.dumps({
+        "event": "gene_search",
+        "terms": search_genes,
+        "matched": len(matched_genes),
+        "genes": sorted(matched_genes)[:20],
+        "cache_hit": cache_hit,
+        "ms": round(seconds * 1000, 3)
+    }))
+
+# Callback to update plot based on gene search and the threshold sliders
+# Returns a Patch: searches send only marker arrays, hovertemplates and the title;
+# threshold changes also move points between category traces and the threshold lines
+# (and pages loaded before a data reload get the whole current figure)
 @app.callback(
     Output("scatter-plot", "figure"),
-    Input("gene-search", "value")
+    Output("category-counts", "children"),
+    Output("data-version", "data"),
+    Input("gene-search", "value"),
+    Input("cv-threshold", "value"),
+    Input("range-threshold", "value"),
+    State("data-version", "data")
 )
-def update_plot(search_input):
-    fig = go.Figure(fig_dict)
-    
+@timed_callback("update_plot")
+def update_plot(search_input, cv_threshold=None, range_threshold=None, data_version=None):
+    # Use one snapshot for the whole call, even if a reload swaps in another meanwhile
+    current = snapshot
+    fig_dict = current["fig_dict"]
+    search_index = current["search_index"]
+    threshold_model = current["threshold_model"]
+    default_thresholds = threshold_model["default_thresholds"]
+    if cv_threshold is None or not threshold_model["enabled"]:
+        cv_threshold = default_thresholds[0]
+    if range_threshold is None or not threshold_model["enabled"]:
+        range_threshold = default_thresholds[1]
+    view = current["threshold_view"](cv_threshold, range_threshold)
+
+    patch = Patch()
+    result = None
+
+    # A page loaded before the last data reload holds the old figure: replace it whole
+    stale = data_version is not None and data_version != current["version"]
+    if stale:
+        patch["data"] = fig_dict.get("data", [])
+        patch["layout"] = fig_dict.get("layout", {})
+
     if search_input and search_input.strip():
         # Split input into list of genes (trim whitespace, convert to lowercase)
         search_genes = [gene.strip().lower() for gene in search_input.split(",") if gene.strip()]
         if search_genes:
-            print("Search genes:", search_genes)  # Debug: Log search input
-            matched_genes = set()
-            
-            for trace in fig.data:
-                customdata = trace.customdata
-                if customdata is None:
-                    continue
-                
-                # Get original properties
-                if hasattr(trace.marker, 'opacity'):
-                    original_opacity = trace.marker.opacity
-                else:
-                    original_opacity = 1.0
-                
-                if hasattr(trace.marker, 'size'):
-                    original_size = trace.marker.size
-                else:
-                    original_size = 6  # Default size
-                
-                # Get the original hovertemplate
-                original_hovertemplate = trace.hovertemplate if hasattr(trace, 'hovertemplate') else None
-                
-                # Create opacity, size, and hovertemplate arrays for all points
-                opacities = []
-                sizes = []
-                hovertemplates = []
-                
-                for i, data in enumerate(customdata):
-                    gene = data[0].lower() if data[0] else ""
-                    # Check if gene matches search and is valid
-                    if any(search_gene in gene for search_gene in search_genes) and gene in valid_genes:
-                        opacities.append(original_opacity)  # Keep original opacity
-                        sizes.append(original_size * 1.5)  # Make matching points bigger
-                        hovertemplates.append(original_hovertemplate)  # Enable hover with original template
-                        matched_genes.add(gene)
-                    else:
-                        opacities.append(0)  # Hide non-matching points
-                        sizes.append(original_size)  # Keep original size (though hidden)
-                        hovertemplates.append("")  # Disable hover by setting empty template
-                
-                # Apply the arrays
-                trace.marker.opacity = opacities
-                trace.marker.size = sizes
-                trace.hovertemplate = hovertemplates
-            
-            print("Matched genes:", matched_genes)  # Debug: Log matched genes
-            
+            search_start = time.perf_counter()
+            cache_key = (current["version"], view["thresholds"], tuple(sorted(set(search_genes))))
+            result = search_cache.get(cache_key)
+            cache_hit = result is not None
+            if result is None:
+                result = compute_search_result(search_index, search_genes, view["slots"])
+                search_cache.put(cache_key, result)
+            matched_genes = result["matched_genes"]
+            if should_log_search():
+                log_search(search_genes, matched_genes, cache_hit, time.perf_counter() - search_start)
+
             # Update title
             if matched_genes:
-                fig.update_layout(
-                    title=f"All Sporulation-Affected Genes - Showing {len(matched_genes)} matching genes"
-                )
+                title = f"All Sporulation-Affected Genes - Showing {len(matched_genes)} matching genes"
             else:
-                fig.update_layout(
-                    title="All Sporulation-Affected Genes - No matching genes found"
-                )
+                title = "All Sporulation-Affected Genes - No matching genes found"
+            patch["layout"]["title"] = {"text": title}
+        else:
+            patch["layout"]["title"] = fig_dict.get("layout", {}).get("title", {})
     else:
         # Reset title when no search
-        fig.update_layout(
-            title="All Sporulation-Affected Genes"
-        )
-    
-    return fig
+        patch["layout"]["title"] = {"text": "All Sporulation-Affected Genes"}
+
+    # The browser already holds the current view's points unless a slider moved
+    # (or the page loaded with non-default thresholds)
+    triggered = triggered_input()
+    resend_points = (stale or triggered in ("cv-threshold", "range-threshold")
+                     or (triggered is None and view["thresholds"] != default_thresholds))
+    if resend_points:
+        shapes, annotations = threshold_shapes(fig_dict.get("layout", {}), cv_threshold, range_threshold)
+        patch["layout"]["shapes"] = shapes
+        patch["layout"]["annotations"] = annotations
+
+    for i, info in enumerate(search_index["traces"]):
+        if info is None:
+            continue
+        trace_patch = patch["data"][i]
+        if resend_points:
+            points = view["slots"][i]
+            trace_patch["x"] = threshold_model["x"][points].tolist()
+            trace_patch["y"] = threshold_model["y"][points].tolist()
+            trace_patch["customdata"] = [threshold_model["customdata"][j] for j in points]
+        if result is None:
+            # Restore the original scalar styling
+            opacity, size, hovertemplate = info["opacity"], info["size"], info["hovertemplate"]
+        else:
+            opacity, size, hovertemplate = result["traces"][i]
+        trace_patch["marker"]["opacity"] = opacity
+        trace_patch["marker"]["size"] = size
+        trace_patch["hovertemplate"] = hovertemplate
+
+    counts = " · ".join(f"{name}: {count}" for name, count in view["counts"].items())
+    return patch, counts, current["version"]
+
+# Coverage-track panel: click a scatter point to plot that gene's per-position counts.
+# Zooming refetches just the visible window at a resolution that fits TRACK_DEFAULT_POINTS.
+TRACK_COLORS = {"M1": "#d62728", "M2": "#ff7f0e", "M3": "#8c564b", "Y1": "#1f77b4", "Y2": "#17becf", "Y3": "#2ca02c"}
+
+def rgba(hex_color, alpha):
+    red, green, blue = (int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
+    return f"rgba({red}, {green}, {blue}, {alpha})"
+
+def coverage_track_figure(window, zoomed=False):
+    """Plot a track_window(): a line per sample, with a min-max band when positions are binned"""
+    traces = []
+    for sample, values in window["samples"].items():
+        color = TRACK_COLORS.get(sample, "#7f7f7f")
+        if "min" in values:
+            traces.append({"type": "scatter", "mode": "lines", "x": window["x"], "y": values["min"],
+                           "line": {"width": 0}, "legendgroup": sample, "showlegend": False, "hoverinfo": "skip"})
+            traces.append({"type": "scatter", "mode": "lines", "x": window["x"], "y": values["max"],
+                           "line": {"width": 0}, "fill": "tonexty", "fillcolor": rgba(color, 0.2),
+                           "legendgroup": sample, "showlegend": False, "hoverinfo": "skip"})
+        traces.append({"type": "scatter", "mode": "lines", "x": window["x"], "y": values["mean"],
+                       "name": sample, "legendgroup": sample, "line": {"color": color, "width": 1}})
+
+    resolution = "per position" if window["bin_size"] == 1 else f"{window['bin_size']}-position bins"
+    xaxis = {"title": {"text": "Position"}}
+    if zoomed:
+        xaxis["range"] = [window["start"], window["end"]]
+    return {
+        "data": traces,
+        "layout": {
+            "title": {"text": f"{window['gene']} coverage ({resolution})"},
+            "xaxis": xaxis,
+            "yaxis": {"title": {"text": "Count"}},
+            "uirevision": window["gene"],
+            "height": 400
+        }
+    }
+
+def relayout_range(relayout_data):
+    """Return (start, end) from a zoom, None for an autorange reset, or False if the x range didn't change"""
+    if not relayout_data:
+        return False
+    if relayout_data.get("xaxis.autorange"):
+        return None
+    if "xaxis.range[0]" in relayout_data:
+        return relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]
+    if "xaxis.range" in relayout_data:
+        return tuple(relayout_data["xaxis.range"])
+    return False
+
+@app.callback(
+    Output("coverage-track", "figure"),
+    Output("coverage-track", "style"),
+    Input("scatter-plot", "clickData"),
+    Input("coverage-track", "relayoutData"),
+    prevent_initial_call=True
+)
+@timed_callback("update_coverage_track")
+def update_coverage_track(click_data, relayout_data):
+    tracks = snapshot["tracks"]
+    try:
+        gene = click_data["points"][0]["customdata"][0]
+    except (TypeError, KeyError, IndexError):
+        return dash.no_update, dash.no_update
+    if tracks is None or str(gene).lower() not in tracks["by_name"]:
+        return {}, {"display": "none"}
+    gene = tracks["by_name"][str(gene).lower()]
+
+    window_range = None
+    if triggered_input() == "coverage-track":
+        window_range = relayout_range(relayout_data)
+        if window_range is False:
+            return dash.no_update, dash.no_update
+    start, end = (None, None) if window_range is None else (int(window_range[0]), int(np.ceil(window_range[1])))
+    window = track_window(TRACKS_DIR, tracks["index"], gene, start, end, TRACK_DEFAULT_POINTS)
+    return coverage_track_figure(window, zoomed=window_range is not None), {"display": "block"}
+
+# JSON API for per-gene statistics, backed by gene_index
+def api_error(message, status=400):
+    return jsonify({"error": message}), status
+
+def float_arg(name):
+    value = request.args.get(name)
+    return None if value in (None, "") else float(value)
+
+def int_arg(name):
+    value = request.args.get(name)
+    return None if value in (None, "") else int(value)
+
+@app.server.route('/api/genes/<name>')
+def api_gene(name):
+    gene_index = snapshot["gene_index"]
+    if gene_index is None:
+        return api_error("Gene statistics are not available", 503)
+    position = gene_index["by_name"].get(name.lower())
+    if position is None:
+        return api_error(f"Gene {name} not found", 404)
+    return jsonify(gene_index["records"][position])
+
+@app.server.route('/api/genes')
+def api_genes():
+    gene_index = snapshot["gene_index"]
+    if gene_index is None:
+        return api_error("Gene statistics are not available", 503)
+    try:
+        cv_min = float_arg("cv_min")
+        range_min = float_arg("range_min")
+        limit = int(request.args.get("limit", API_DEFAULT_LIMIT))
+        offset = int(request.args.get("offset", 0))
+    except ValueError as e:
+        return api_error(f"Invalid query parameter: {e}")
+    if not 0 < limit <= API_MAX_LIMIT or offset < 0:
+        return api_error(f"limit must be 1-{API_MAX_LIMIT} and offset must be >= 0")
+
+    positions = query_gene_index(gene_index, request.args.get("category"), cv_min, range_min)
+    page = positions[offset:offset + limit]
+    records = gene_index["records"]
+    return jsonify({
+        "total": len(positions),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": offset + limit if offset + limit < len(positions) else None,
+        "genes": [
+            {key: records[i][key] for key in ("gene", "category", "max_cv", "max_range")}
+            for i in page
+        ]
+    })
+
+@app.server.route('/api/genes/batch', methods=['POST'])
+def api_genes_batch():
+    gene_index = snapshot["gene_index"]
+    if gene_index is None:
+        return api_error("Gene statistics are not available", 503)
+    payload = request.get_json(silent=True) or {}
+    names = payload.get("genes")
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        return api_error('Expected a JSON body like {"genes": ["spo0A", "cotC"]}')
+    if len(names) > API_MAX_BATCH:
+        return api_error(f"At most {API_MAX_BATCH} genes per batch")
+
+    found = {}
+    missing = []
+    for name in names:
+        position = gene_index["by_name"].get(name.lower())
+        if position is None:
+            missing.append(name)
+        else:
+            found[name] = gene_index["records"][position]
+    return jsonify({"genes": found, "missing": missing})
+
+@app.server.route('/api/tracks/<name>')
+def api_track(name):
+    tracks = snapshot["tracks"]
+    if tracks is None:
+        return api_error("Coverage tracks are not available", 503)
+    gene = tracks["by_name"].get(name.lower())
+    if gene is None:
+        return api_error(f"No coverage track for gene {name}", 404)
+    try:
+        start = int_arg("start")
+        end = int_arg("end")
+        points = int(request.args.get("points", TRACK_DEFAULT_POINTS))
+    except ValueError as e:
+        return api_error(f"Invalid query parameter: {e}")
+    if not 0 < points <= TRACK_MAX_POINTS:
+        return api_error(f"points must be 1-{TRACK_MAX_POINTS}")
+    return jsonify(track_window(TRACKS_DIR, tracks["index"], gene, start, end, points))
 
 # Route to serve data files from data/
+# Serves precompressed variants when accepted, answers If-None-Match with 304 and
+# supports Range requests (on the uncompressed file)
 @app.server.route('/data/<filename>')
 def serve_data_file(filename):
-    file_path = os.path.join("data", filename)
-    if not os.path.exists(file_path):
+    # Only regular files inside data/: directories and ".." would otherwise reach file_etag.
+    # Absolute, as send_from_directory resolves relative paths against the app module, not the cwd
+    data_dir = os.path.abspath("data")
+    file_path = safe_join(data_dir, filename)
+    if file_path is None or not os.path.isfile(file_path):
         abort(404, description=f"File {filename} not found in data/.")
-    return send_from_directory("data", filename)
+
+    etag = file_etag(file_path)
+    encoding, suffix = None, ""
+    if request.range is None:
+        encoding, suffix = precompressed_variant(file_path, request.accept_encodings)
+    representation_etag = f"{etag}-{encoding}" if encoding else etag
+
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if encoding:
+        response = send_from_directory(data_dir, filename + suffix, mimetype=mimetype, conditional=False)
+        response.headers["Content-Encoding"] = encoding
+        response.set_etag(representation_etag)
+        response = response.make_conditional(request)
+    else:
+        # conditional=True handles If-None-Match, If-Range and Range (206) for us
+        response = send_from_directory(data_dir, filename, mimetype=mimetype, conditional=True, etag=etag)
+
+    response.headers["Vary"] = "Accept-Encoding"
+    if request.args.get("v") == etag:
+        response.headers["Cache-Control"] = f"private, max-age={DATA_MAX_AGE}, immutable"
+    else:
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+def render_metrics():
+    lines = []
+    for metric in (callback_latency, request_latency, response_size, request_count, snapshot_reloads):
+        lines.extend(metric.render())
+
+    search_stats = search_cache.stats()
+    view_stats = snapshot["threshold_view"].cache_info()
+    caches = {
+        "search": (search_stats["hits"], search_stats["misses"], search_stats["size"]),
+        "threshold_view": (view_stats.hits, view_stats.misses, view_stats.currsize)
+    }
+    for name, kind, documentation, column in [
+        ("sporulation_cache_hits_total", "counter", "Cache hits", 0),
+        ("sporulation_cache_misses_total", "counter", "Cache misses", 1),
+        ("sporulation_cache_entries", "gauge", "Entries currently cached", 2)
+    ]:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        for cache, values in caches.items():
+            lines.append(f'{name}{{cache="{cache}"}} {values[column]}')
+
+    lines.append("# HELP sporulation_cache_hit_ratio Cache hits / lookups since start")
+    lines.append("# TYPE sporulation_cache_hit_ratio gauge")
+    for cache, (hits, misses, _) in caches.items():
+        lookups = hits + misses
+        lines.append(f'sporulation_cache_hit_ratio{{cache="{cache}"}} {hits / lookups if lookups else 0}')
+    return "\n".join(lines) + "\n"
+
+# Prometheus scrape endpoint: skips the login redirect and checks its own credentials, either
+# "Authorization: Bearer $METRICS_TOKEN" (Prometheus' authorization/bearer_token) or, without a
+# token configured, the dashboard's basic-auth login.
+# /healthz is public, for load balancers and serve.py's startup check
+add_public_routes(app, ["/metrics", "/healthz"])
+
+def metrics_authorized():
+    header = request.headers.get("Authorization", "")
+    if METRICS_TOKEN:
+        return hmac.compare_digest(header.encode(), f"Bearer {METRICS_TOKEN}".encode())
+    try:
+        return header.startswith("Basic ") and auth.is_authorized()
+    except ValueError:
+        return False
+
+@app.server.route('/metrics')
+def metrics():
+    if not metrics_authorized():
+        scheme = "Bearer" if METRICS_TOKEN else 'Basic realm="metrics"'
+        return Response("Unauthorized\n", 401, {"WWW-Authenticate": scheme}, mimetype="text/plain")
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.server.route('/healthz')
+def healthz():
+    return jsonify({"status": "ok", "version": snapshot["version"], "pid": os.getpid()})
 
 if __name__ == '__main__':
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"), format="%(message)s")
     app.run(debug=False, host='0.0.0.0', port=5000)
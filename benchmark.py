@@ -0,0 +1,309 @@
+"""Benchmark the sporulation pipeline and dashboard search on a synthetic gene panel.
+
+Generates per-gene coverage CSVs in the layout script.py expects (a header row,
+then per-sample column triples with the counts at positions 2::3 for M1-Y3),
+runs each pipeline step and times update_plot searches. Each search also
+reports the size of its Patch response next to the whole figure the callback
+sent before it returned a Patch. Results are written as JSON so runs can be
+compared between versions:
+
+    python benchmark.py --genes 2000 --positions 5000 --workers 4 --output bench.json
+
+--samples N generates N samples in two strain groups instead and runs the
+sample-sheet pipeline, so per-sample throughput can be compared across N.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+import script
+
+# Synthetic genes are named gene00000, gene00001, ...; these cover a single hit,
+# growing prefix matches, a multi-term search and a miss
+DEFAULT_QUERIES = ["gene00001", "gene0001", "gene000", "gene", "gene00002, gene00003", "zzz"]
+
+def generate_panel(input_dir, n_genes, positions, seed=0, samples=script.SAMPLES):
+    """Write n_genes synthetic coverage CSVs to input_dir and return the total number of rows.
+
+    Genes mix low-variance and high-variance samples so every color category
+    is represented. Gene lengths vary between positions/2 and positions.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(input_dir, exist_ok=True)
+    header = ",".join(f"{sample}_ref,{sample}_pos,{sample}_count" for sample in samples)
+    total_rows = 0
+    for i in range(n_genes):
+        length = int(rng.integers(max(1, positions // 2), positions + 1))
+        base = rng.uniform(200, 9000, len(samples))
+        spread = rng.choice([0.002, 0.01, 0.15, 0.3], len(samples))
+        counts = np.clip(rng.normal(base, base * spread, (length, len(samples))), 0, None).astype(np.int64)
+
+        pos = np.arange(length)
+        columns = []
+        for j in range(len(samples)):
+            columns.extend([pos, pos, counts[:, j]])
+        np.savetxt(os.path.join(input_dir, f"gene{i:05d}.csv"), np.column_stack(columns),
+                   fmt="%d", delimiter=",", header=header, comments="")
+        total_rows += length
+    return total_rows
+
+def synthetic_sample_sheet(n_samples):
+    """A SampleSheet with n_samples samples split between an M and a Y group"""
+    samples = [f"S{i + 1:03d}" for i in range(n_samples)]
+    groups = ["M" if i < (n_samples + 1) // 2 else "Y" for i in range(n_samples)]
+    return script.SampleSheet(samples, groups, labels={"M": "Mfd-", "Y": "YB955"})
+
+def measure(func, *args, trace_memory=False, **kwargs):
+    """Run func with stdout suppressed; return (result, metrics).
+
+    Wall and CPU time come from an untraced run. The peak RSS of this process
+    and of the largest finished worker process are high-water marks for the
+    benchmark so far, read once the step returns. tracemalloc slows allocation-heavy code
+    several times over and can't see worker processes, so with trace_memory
+    func is run a second time under it just for the main process's peak of
+    Python allocations.
+    """
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    metrics = {
+        "wall_s": round(wall, 6),
+        "cpu_s": round(cpu, 6),
+        "peak_rss_mb": script.peak_rss_mb(),
+        "peak_rss_children_mb": script.peak_rss_mb("children")
+    }
+
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                func(*args, **kwargs)
+            metrics["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 3)
+        finally:
+            tracemalloc.stop()
+    return result, metrics
+
+def step_report(metrics, items, unit):
+    wall = metrics["wall_s"]
+    return dict(metrics, **{unit: items, f"{unit}_per_s": round(items / wall, 1) if wall > 0 else None})
+
+def benchmark_pipeline(input_dir, base_dir, n_rows, workers=1, streaming=False, render_mode=script.RENDER_MODE,
+                       sheet=None, trace_memory=False):
+    """Time each script.py step on the panel in input_dir, writing outputs under base_dir
+
+    With a SampleSheet, the sample-sheet ingestion and classification are timed instead.
+    """
+    data_dir = os.path.join(base_dir, "data")
+    assets_dir = os.path.join(base_dir, "assets")
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(assets_dir, exist_ok=True)
+    steps = {}
+
+    if sheet is not None:
+        data_df, metrics = measure(
+            script.process_files_with_sample_sheet, os.path.join(input_dir, "*.csv"), data_dir, sheet,
+            workers=workers, trace_memory=trace_memory
+        )
+    else:
+        data_df, metrics = measure(
+            script.process_files_with_error_handling, os.path.join(input_dir, "*.csv"), data_dir,
+            workers=workers, streaming=streaming, trace_memory=trace_memory
+        )
+    n_genes = data_df["Gene"].nunique()
+    n_samples = len(sheet.samples) if sheet is not None else len(script.SAMPLES)
+    wall = metrics["wall_s"]
+    steps["ingest"] = step_report(metrics, n_rows, "rows")
+    steps["ingest"]["genes_per_s"] = round(n_genes / wall, 1) if wall > 0 else None
+    steps["ingest"]["sample_values_per_s"] = round(n_rows * n_samples / wall, 1) if wall > 0 else None
+    data_df.to_csv(os.path.join(data_dir, "sporulation_CV_statistics.csv"), index=False)
+
+    if sheet is not None:
+        data_df, metrics = measure(script.process_dataframe_with_sample_sheet, data_df, sheet,
+                                   trace_memory=trace_memory)
+    else:
+        data_df, metrics = measure(script.process_dataframe_with_colors, data_df, trace_memory=trace_memory)
+    steps["coloring"] = step_report(metrics, n_genes, "genes")
+    script.write_columnar_stats(data_df, data_dir)
+
+    priority = sheet.category_priority() if sheet is not None else script.CATEGORY_PRIORITY
+    gene_colors, metrics = measure(script.create_gene_category_summary, data_df, data_dir, priority,
+                                   trace_memory=trace_memory)
+    steps["category_summary"] = step_report(metrics, n_genes, "genes")
+
+    category_order = sheet.category_order() if sheet is not None else script.CATEGORY_ORDER
+    _, metrics = measure(script.create_summary_files_by_category, data_df, gene_colors, data_dir, category_order,
+                         trace_memory=trace_memory)
+    steps["summary_files"] = step_report(metrics, n_genes, "genes")
+
+    fig_dict, metrics = measure(
+        script.create_interactive_plot, data_df, "All Sporulation-Affected Genes",
+        os.path.join(assets_dir, "all_sporulation_genes_scatter_plot.html"), render_mode=render_mode,
+        group_labels=sheet.group_labels() if sheet is not None else None, trace_memory=trace_memory
+    )
+    steps["plot_export"] = step_report(metrics, len(data_df), "points")
+
+    search_stats, metrics = measure(script.write_static_search, fig_dict, assets_dir, trace_memory=trace_memory)
+    steps["static_search"] = step_report(metrics, n_genes, "genes")
+    steps["static_search"].update(search_stats)
+    return steps, n_genes
+
+def full_figure_response(app, search_genes):
+    """The whole figure update_plot returned for a search before it sent a Patch"""
+    fig_dict = app.snapshot["fig_dict"]
+    search_index = app.snapshot["search_index"]
+    result = app.compute_search_result(search_index, search_genes)
+    data = []
+    for trace, info, styling in zip(fig_dict.get("data", []), search_index["traces"], result["traces"]):
+        if info is None:
+            data.append(trace)
+            continue
+        opacity, size, hovertemplate = styling
+        data.append(dict(trace, marker=dict(trace.get("marker", {}), opacity=opacity, size=size),
+                         hovertemplate=hovertemplate))
+    if result["matched_genes"]:
+        title = f"All Sporulation-Affected Genes - Showing {len(result['matched_genes'])} matching genes"
+    else:
+        title = "All Sporulation-Affected Genes - No matching genes found"
+    return dict(fig_dict, data=data, layout=dict(fig_dict.get("layout", {}), title={"text": title}))
+
+def benchmark_search(base_dir, queries, repeats):
+    """Import app.py against the outputs in base_dir and time update_plot for each query"""
+    from plotly.utils import PlotlyJSONEncoder
+
+    cwd = os.getcwd()
+    os.chdir(base_dir)
+    try:
+        load_start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app
+        load_time = time.perf_counter() - load_start
+
+        results = {}
+        for query in queries:
+            timings = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(repeats):
+                    # The first call for a query misses the search cache; later ones hit it
+                    start = time.perf_counter()
+                    patch = app.update_plot(query)[0]
+                    timings.append(time.perf_counter() - start)
+            search_genes = [gene.strip().lower() for gene in query.split(",") if gene.strip()]
+            matched = int(app.match_genes(app.snapshot["search_index"], search_genes).sum())
+            payload = json.dumps(patch.to_plotly_json(), cls=PlotlyJSONEncoder)
+            full_payload = json.dumps(full_figure_response(app, search_genes), cls=PlotlyJSONEncoder)
+            timings_ms = np.array(timings) * 1000
+            results[query] = {
+                "matched_genes": matched,
+                "cold_ms": round(float(timings_ms[0]), 4),
+                "p50_ms": round(float(np.percentile(timings_ms, 50)), 4),
+                "p95_ms": round(float(np.percentile(timings_ms, 95)), 4),
+                "max_ms": round(float(timings_ms.max()), 4),
+                "response_bytes": len(payload),
+                "full_figure_response_bytes": len(full_payload)
+            }
+        return {"app_import_s": round(load_time, 4), "queries": results}
+    finally:
+        os.chdir(cwd)
+
+def environment_info():
+    import pandas
+    import plotly
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "plotly": plotly.__version__,
+        "cpu_count": os.cpu_count()
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the sporulation pipeline on a synthetic gene panel")
+    parser.add_argument("--genes", type=int, default=500, help="Number of synthetic genes")
+    parser.add_argument("--positions", type=int, default=2000, help="Maximum positions (rows) per gene file")
+    parser.add_argument("--workers", type=int, default=1, help="Ingestion worker processes")
+    parser.add_argument("--streaming", action="store_true", help="Use the streaming statistics reader")
+    parser.add_argument("--samples", type=int,
+                        help="Generate this many samples and use the sample-sheet pipeline instead of M1-Y3")
+    parser.add_argument("--render-mode", choices=["auto", "svg", "webgl"], default=script.RENDER_MODE)
+    parser.add_argument("--queries", default=";".join(DEFAULT_QUERIES),
+                        help="Semicolon-separated search inputs for update_plot")
+    parser.add_argument("--repeats", type=int, default=20, help="update_plot calls per query")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Run each pipeline step a second time under tracemalloc for its peak Python allocations")
+    parser.add_argument("--workdir", help="Directory for the synthetic panel and outputs (kept afterwards)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="sporulation_bench_")
+    input_dir = os.path.join(workdir, "input")
+    base_dir = os.path.join(workdir, "output")
+
+    try:
+        sheet = synthetic_sample_sheet(args.samples) if args.samples else None
+        generate_start = time.perf_counter()
+        n_rows = generate_panel(input_dir, args.genes, args.positions, args.seed,
+                                samples=sheet.samples if sheet is not None else script.SAMPLES)
+        generate_time = time.perf_counter() - generate_start
+
+        steps, n_genes = benchmark_pipeline(input_dir, base_dir, n_rows, workers=args.workers,
+                                            streaming=args.streaming, render_mode=args.render_mode, sheet=sheet,
+                                            trace_memory=args.trace_memory)
+        search = benchmark_search(base_dir, [q for q in args.queries.split(";") if q], args.repeats)
+
+        report = {
+            "environment": environment_info(),
+            "config": {
+                "genes": args.genes,
+                "positions": args.positions,
+                "rows": n_rows,
+                "workers": args.workers,
+                "streaming": args.streaming,
+                "samples": args.samples,
+                "render_mode": args.render_mode,
+                "seed": args.seed,
+                "trace_memory": args.trace_memory
+            },
+            "generate_s": round(generate_time, 4),
+            "pipeline": steps,
+            "pipeline_total_s": round(sum(step["wall_s"] for step in steps.values()), 4),
+            "search": search,
+            "peak_rss_mb": script.peak_rss_mb(),
+            "peak_rss_children_mb": script.peak_rss_mb("children")
+        }
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import base64
+import gzip
+import json
+import numpy as np
+
+# Compact plot export shared by script.py (writer) and app.py (reader).
+#
+# Numeric arrays are stored in plotly's typed-array form {"dtype", "bdata"}
+# (little-endian, base64). customdata is stored column by column: string
+# columns become integer codes into a lookup table under "lookups", numeric
+# columns become typed arrays. Decoding rebuilds the usual row-wise customdata.
+
+COMPACT_FORMAT = "sporulation-compact-1"
+
+INTEGER_DTYPES = ["u1", "i1", "u2", "i2", "u4", "i4"]
+
+def encode_typed_array(values):
+    """Encode a 1-D numeric sequence as {"dtype", "bdata"}, using the smallest integer type that fits"""
+    array = np.asarray(values)
+    dtype = "f8"
+    if array.dtype.kind in "iu" or (array.dtype.kind == "f" and array.size and
+                                    np.isfinite(array).all() and (array == np.round(array)).all()):
+        low, high = (array.min(), array.max()) if array.size else (0, 0)
+        for candidate in INTEGER_DTYPES:
+            info = np.iinfo(np.dtype(candidate))
+            if info.min <= low and high <= info.max:
+                dtype = candidate
+                break
+    data = array.astype(np.dtype(dtype).newbyteorder("<"))
+    return {"dtype": dtype, "bdata": base64.b64encode(data.tobytes()).decode("ascii")}
+
+def decode_typed_array(spec):
+    """Inverse of encode_typed_array; plain lists are passed through as arrays"""
+    if not isinstance(spec, dict):
+        return np.asarray(spec)
+    return np.frombuffer(base64.b64decode(spec["bdata"]), dtype=np.dtype(spec["dtype"]).newbyteorder("<"))
+
+def compact_figure(fig_dict):
+    """Return the compact export of a plotly figure dict"""
+    lookups = {}
+    lookup_index = {}
+    data = []
+    for trace in fig_dict.get("data", []):
+        trace = dict(trace)
+        for axis in ("x", "y"):
+            if axis in trace and not isinstance(trace[axis], dict):
+                trace[axis] = encode_typed_array(trace[axis])
+
+        customdata = trace.get("customdata")
+        if customdata is not None and len(customdata) and not isinstance(customdata, dict):
+            columns = []
+            for i, column in enumerate(zip(*customdata)):
+                if all(isinstance(value, str) for value in column):
+                    key = str(i)
+                    table = lookups.setdefault(key, [])
+                    index = lookup_index.setdefault(key, {})
+                    codes = [index.setdefault(value, len(index)) for value in column]
+                    table.extend(list(index)[len(table):])
+                    columns.append({"lookup": key, "codes": encode_typed_array(codes)})
+                else:
+                    columns.append({"values": encode_typed_array(np.asarray(column, dtype=float))})
+            trace["customdata"] = {"columns": columns}
+        data.append(trace)
+
+    return {
+        "format": COMPACT_FORMAT,
+        "lookups": lookups,
+        "figure": dict(fig_dict, data=data)
+    }
+
+def expand_figure(compact):
+    """Rebuild a regular figure dict (row-wise customdata) from a compact export"""
+    lookups = compact["lookups"]
+    data = []
+    for trace in compact["figure"].get("data", []):
+        trace = dict(trace)
+        for axis in ("x", "y"):
+            if axis in trace:
+                trace[axis] = decode_typed_array(trace[axis])
+
+        customdata = trace.get("customdata")
+        if isinstance(customdata, dict):
+            columns = []
+            for column in customdata["columns"]:
+                if "lookup" in column:
+                    table = lookups[column["lookup"]]
+                    columns.append([table[code] for code in decode_typed_array(column["codes"])])
+                else:
+                    columns.append(decode_typed_array(column["values"]).tolist())
+            trace["customdata"] = [list(row) for row in zip(*columns)]
+        data.append(trace)
+
+    return dict(compact["figure"], data=data)
+
+def write_compact_figure(fig_dict, path, gzip_output=False):
+    """Write the compact export to path (path + ".gz" if gzip_output) and return the written path"""
+    payload = json.dumps(compact_figure(fig_dict), separators=(",", ":")).encode("utf-8")
+    if gzip_output:
+        path = path + ".gz"
+        with gzip.GzipFile(path, 'wb', mtime=0) as f:
+            f.write(payload)
+    else:
+        with open(path, 'wb') as f:
+            f.write(payload)
+    return path
+
+def load_figure(path):
+    """Load a figure dict from a regular or compact export, gzipped or not"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rt', encoding="utf-8") as f:
+        loaded = json.load(f)
+    if loaded.get("format") == COMPACT_FORMAT:
+        return expand_figure(loaded)
+    return loaded
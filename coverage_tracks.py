@@ -0,0 +1,211 @@
+import json
+import os
+import numpy as np
+
+# Per-position coverage tracks shared by script.py (writer) and app.py (reader).
+#
+# Each gene gets two flat little-endian float32 files in the tracks directory:
+#   <gene>.f32        raw counts, rows x samples (row = position within the gene file)
+#   <gene>.tiles.f32  min/max/mean tiles, bins x 3 x samples, for every tile level
+# Tile level k has bins of TRACK_BASE_BIN * TRACK_TILE_FACTOR**k positions, down to
+# a single bin, so the layout follows from the row count alone. index.json maps
+# gene -> row count. Both files are memory-mapped by the reader.
+
+TRACK_FORMAT = "sporulation-tracks-1"
+TRACK_BASE_BIN = 16
+TRACK_TILE_FACTOR = 4
+TRACK_INDEX_FILENAME = "index.json"
+
+TRACK_DTYPE = np.dtype("<f4")
+TILE_FIELDS = ["min", "max", "mean"]
+
+# Rows folded into the first tile level at a time when building from a raw file
+TILE_BLOCK_ROWS = TRACK_BASE_BIN * 65536
+
+def track_paths(directory, gene):
+    return os.path.join(directory, f"{gene}.f32"), os.path.join(directory, f"{gene}.tiles.f32")
+
+def track_levels(rows):
+    """Return (bin_size, offset, bins) for each tile level of a track with `rows` positions"""
+    levels = []
+    offset = 0
+    bin_size = TRACK_BASE_BIN
+    while rows > TRACK_BASE_BIN:
+        bins = -(-rows // bin_size)
+        levels.append((bin_size, offset, bins))
+        offset += bins
+        if bins == 1:
+            break
+        bin_size *= TRACK_TILE_FACTOR
+    return levels
+
+def _fold(minimum, maximum, total, count, group):
+    """Merge every `group` consecutive bins of (min, max, sum, count) arrays, NaN-padding the tail"""
+    bins = -(-len(minimum) // group)
+    pad = bins * group - len(minimum)
+
+    def grouped(values, fill):
+        if pad:
+            values = np.concatenate([values, np.full((pad,) + values.shape[1:], fill, dtype=values.dtype)])
+        return values.reshape((bins, group) + values.shape[1:])
+
+    return (
+        np.fmin.reduce(grouped(minimum, np.nan), axis=1),
+        np.fmax.reduce(grouped(maximum, np.nan), axis=1),
+        grouped(total, 0).sum(axis=1),
+        grouped(count, 0).sum(axis=1)
+    )
+
+def build_tiles(raw):
+    """Return the bins x 3 x samples tile array for a rows x samples float array (NaNs ignored)"""
+    rows = len(raw)
+    levels = track_levels(rows)
+    if not levels:
+        return np.empty((0, len(TILE_FIELDS), raw.shape[1]), dtype=TRACK_DTYPE)
+
+    # First level, built in blocks so a memory-mapped raw track is never loaded whole
+    parts = []
+    for start in range(0, rows, TILE_BLOCK_ROWS):
+        block = np.asarray(raw[start:start + TILE_BLOCK_ROWS], dtype=np.float64)
+        valid = ~np.isnan(block)
+        parts.append(_fold(block, block, np.where(valid, block, 0), valid.astype(np.int64), TRACK_BASE_BIN))
+    current = tuple(np.concatenate(values) for values in zip(*parts))
+
+    tiles = []
+    for i, (bin_size, offset, bins) in enumerate(levels):
+        if i:
+            current = _fold(*current, TRACK_TILE_FACTOR)
+        minimum, maximum, total, count = current
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / count, np.nan)
+        tiles.append(np.stack([minimum, maximum, mean], axis=1))
+    return np.concatenate(tiles).astype(TRACK_DTYPE)
+
+class TrackWriter:
+    """Write one gene's track, appending raw rows chunk by chunk.
+
+    Files are written under temporary names and moved into place by close(),
+    so a reader with the previous track memory-mapped keeps a valid file.
+    """
+
+    def __init__(self, directory, gene):
+        self.raw_path, self.tiles_path = track_paths(directory, gene)
+        self.rows = 0
+        self._file = open(self.raw_path + ".tmp", 'wb')
+
+    def append(self, values):
+        """Append a rows x samples array of counts (NaN for missing values)"""
+        self._file.write(np.ascontiguousarray(values, dtype=TRACK_DTYPE).tobytes())
+        self.rows += len(values)
+
+    def close(self, n_samples):
+        self._file.close()
+        raw_tmp = self.raw_path + ".tmp"
+        if self.rows:
+            raw = np.memmap(raw_tmp, dtype=TRACK_DTYPE, mode='r', shape=(self.rows, n_samples))
+            tiles = build_tiles(raw)
+            del raw
+        else:
+            tiles = np.empty((0, len(TILE_FIELDS), n_samples), dtype=TRACK_DTYPE)
+        tiles.tofile(self.tiles_path + ".tmp")
+        os.replace(raw_tmp, self.raw_path)
+        os.replace(self.tiles_path + ".tmp", self.tiles_path)
+        return self.rows
+
+    def abort(self):
+        self._file.close()
+        for path in (self.raw_path + ".tmp", self.tiles_path + ".tmp"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def write_gene_track(directory, gene, values):
+    """Write a complete rows x samples track for one gene and return its row count"""
+    writer = TrackWriter(directory, gene)
+    try:
+        writer.append(values)
+        return writer.close(values.shape[1])
+    except Exception:
+        writer.abort()
+        raise
+
+def write_track_index(directory, genes, samples):
+    """Write index.json for {gene: rows} and delete track files of genes not in it"""
+    index = {
+        "format": TRACK_FORMAT,
+        "samples": list(samples),
+        "base_bin": TRACK_BASE_BIN,
+        "tile_factor": TRACK_TILE_FACTOR,
+        "genes": genes
+    }
+    path = os.path.join(directory, TRACK_INDEX_FILENAME)
+    with open(path + ".tmp", 'w') as f:
+        json.dump(index, f)
+    os.replace(path + ".tmp", path)
+
+    keep = {os.path.basename(p) for gene in genes for p in track_paths(directory, gene)}
+    for filename in os.listdir(directory):
+        if filename.endswith(".f32") and filename not in keep:
+            os.remove(os.path.join(directory, filename))
+    return path
+
+def load_track_index(directory):
+    """Load index.json from a tracks directory, or return None if there isn't a usable one"""
+    try:
+        with open(os.path.join(directory, TRACK_INDEX_FILENAME), 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (index.get("format") != TRACK_FORMAT or index.get("base_bin") != TRACK_BASE_BIN
+            or index.get("tile_factor") != TRACK_TILE_FACTOR):
+        return None
+    return index
+
+def json_values(values):
+    """Round a float array for JSON, with NaN as None"""
+    return [None if value != value else round(value, 3) for value in values.tolist()]
+
+def track_window(directory, index, gene, start=None, end=None, max_points=1000):
+    """Return at most about max_points samples of a gene's track between positions [start, end).
+
+    Uses the raw counts when the window is small enough or the track is too
+    short to have tiles, otherwise the finest tile level that fits, returning
+    per-bin min/max/mean. Returns None for an unknown gene.
+    """
+    rows = index["genes"].get(gene)
+    if rows is None:
+        return None
+    samples = index["samples"]
+    start = min(max(int(start or 0), 0), max(rows - 1, 0))
+    end = min(max(int(end if end is not None else rows), start + 1), rows)
+    span = end - start
+    raw_path, tiles_path = track_paths(directory, gene)
+
+    window = {"gene": gene, "rows": rows, "start": start, "end": end, "samples": {}}
+    if rows == 0:
+        return dict(window, bin_size=1, x=[])
+
+    levels = track_levels(rows)
+    if span <= max_points or not levels:
+        raw = np.memmap(raw_path, dtype=TRACK_DTYPE, mode='r', shape=(rows, len(samples)))
+        values = np.asarray(raw[start:end], dtype=np.float64)
+        window.update(bin_size=1, x=list(range(start, end)))
+        for i, sample in enumerate(samples):
+            window["samples"][sample] = {"mean": json_values(values[:, i])}
+        return window
+
+    bin_size, offset, bins = next(
+        (level for level in levels if -(-span // level[0]) <= max_points), levels[-1]
+    )
+    first_bin = start // bin_size
+    last_bin = min(-(-end // bin_size), bins)
+    tiles = np.memmap(tiles_path, dtype=TRACK_DTYPE, mode='r',
+                      shape=(levels[-1][1] + levels[-1][2], len(TILE_FIELDS), len(samples)))
+    values = np.asarray(tiles[offset + first_bin:offset + last_bin], dtype=np.float64)
+    window.update(bin_size=bin_size, x=list(range(first_bin * bin_size, last_bin * bin_size, bin_size)))
+    for i, sample in enumerate(samples):
+        window["samples"][sample] = {
+            field: json_values(values[:, j, i]) for j, field in enumerate(TILE_FIELDS)
+        }
+    return window
@@ -0,0 +1,28 @@
+import os
+import shutil
+from contextlib import contextmanager
+
+# Whole-directory replacement shared by script.py (columnar stats) and static_search.py.
+# The new contents are written to <target>.tmp, then the old directory is renamed to
+# <target>.old and the new one into place, so files from two builds are never mixed and
+# files no longer written don't linger. Readers only see a missing directory for the
+# instant between the two renames.
+
+@contextmanager
+def replacing_directory(target):
+    """Yield an empty directory beside target and swap it in for target once the block succeeds"""
+    tmp_dir = target + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        yield tmp_dir
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    old_dir = target + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(target):
+        os.rename(target, old_dir)
+    os.rename(tmp_dir, target)
+    shutil.rmtree(old_dir, ignore_errors=True)
@@ -3,51 +3,340 @@ import numpy as np
 import glob
 import os
 import plotly.express as px
+import plotly.io as pio
+import plotly.offline
 import sys
 import json
+import gzip
+import base64
+import html
+import hashlib
+import argparse
+import logging
+import time
+import cProfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from datetime import datetime
+from compact_figure import write_compact_figure, decode_typed_array, load_figure
+from static_search import write_static_search, SEARCH_DIRNAME, SEARCH_INDEX_FILENAME
+from directory_swap import replacing_directory
+from coverage_tracks import (TrackWriter, write_gene_track, write_track_index, load_track_index, track_paths,
+                             TRACK_INDEX_FILENAME)
+
+try:
+    import brotli  # Optional: enables .br variants of the served data files
+except ImportError:
+    brotli = None
+
+try:
+    import resource  # Unix only: peak RSS in the run report
+except ImportError:
+    resource = None
+
+logger = logging.getLogger("sporulation")
 
 # Configuration
 file_path = "/home/perezthedev/Documents/Robleto_Lab/YB955_Genomics/sporulation_analysis/spor_output_genes/*.csv"
 base_output_dir = os.path.expanduser("~/Documents/Robleto_Lab/YB955_Genomics/sporulation_analysis/dash_board_search")
 data_output_dir = os.path.join(base_output_dir, "data")
 assets_output_dir = os.path.join(base_output_dir, "assets")
+plots_output_dir = os.path.join(base_output_dir, "plots")
 
 # Threshold constants
 CV_THRESHOLD = 0.11
 RANGE_THRESHOLD = 2000
 
-# Create output directories if they don't exist
-os.makedirs(data_output_dir, exist_ok=True)
-os.makedirs(assets_output_dir, exist_ok=True)
-print(f"Data output directory: {data_output_dir}")
-print(f"Assets output directory: {assets_output_dir}")
+# Number of worker processes for reading gene CSVs (1 = serial)
+NUM_WORKERS = 1
 
-def process_files_with_error_handling(file_path, data_output_dir):
-    """Process CSV files with error handling and return combined statistics DataFrame"""
-    files = sorted(glob.glob(file_path))
-    all_data = []
-    individual_summaries = []
+# Rows per chunk when computing statistics in streaming mode
+STREAM_CHUNKSIZE = 100_000
 
-    for file in files:
-        print(f"Processing: {file}")
-        gene_name = file.split('/')[-1].replace('.csv', '')
+# Rows with missing or non-numeric counts kept per file in streaming mode for the DEBUG dump
+STREAM_DUMP_ROWS = 60
+
+SAMPLES = ["M1", "M2", "M3", "Y1", "Y2", "Y3"]
+
+# Sample-sheet mode (--sample-sheet): any number of samples and strain groups in place of M1-Y3.
+# Genes are read in batches of up to GENE_BATCH_SIZE files whose padded size stays under GENE_BATCH_BYTES of CSV
+GENE_BATCH_SIZE = 64
+GENE_BATCH_BYTES = 64 * 2 ** 20
+
+# Category colors for sample-sheet groups that don't name one, in order of first appearance
+GROUP_COLORS = ["red", "blue", "orange", "purple", "brown", "magenta", "olive", "cyan"]
+
+# Incremental rebuild manifest (kept in the data output directory)
+MANIFEST_FILENAME = "ingest_manifest.json"
+MANIFEST_VERSION = 2
+
+# Scatter plot rendering: "svg", "webgl" or "auto" (webgl above WEBGL_POINT_THRESHOLD points)
+RENDER_MODE = "auto"
+WEBGL_POINT_THRESHOLD = 1000
+
+# Plot export: "json" (plain figure JSON), "compact" (typed arrays + lookup tables) or "both"
+PLOT_EXPORT = "both"
+GZIP_PLOT_EXPORT = False
+
+# Files served by app.py's /data route; precompressed .gz (and .br) copies are written next to them
+SERVED_DATA_FILES = [
+    "Summary_Stats_All_Sporulation_Genes.txt",
+    "Summary_Stats_Mfd-_Genes.txt",
+    "Summary_Stats_YB955_Genes.txt",
+    "Summary_Stats_Common_Genes_Genes.txt",
+    "Summary_Stats_Partial_Threshold_Genes.txt",
+    "Summary_Stats_Below_Threshold_Genes.txt",
+    "sporulation_CV_statistics.csv",
+    "gene_category_summary_table.csv"
+]
+
+# Memory-mappable columnar copy of the colored statistics, loaded by app.py
+COLUMNAR_STATS_DIRNAME = "sporulation_CV_statistics_columns"
 
+# Per-position coverage tracks with min/max/mean tiles for app.py's drill-down panel (see coverage_tracks.py)
+WRITE_TRACKS = True
+TRACKS_DIRNAME = "coverage_tracks"
+
+# Static search build (base figure, sharded gene details, n-gram index) in assets/search for the
+# standalone searchable page (see static_search.py)
+WRITE_STATIC_SEARCH = True
+
+# Gene-subset plots (--gene-sets): one page per gene set in plots/, cut from the full figure.
+# The manifest records each page's content digest so unchanged sets are skipped on later runs
+SUBSET_PLOT_SUFFIX = "_scatter_plot.html"
+SUBSET_MANIFEST_FILENAME = "subset_plots_manifest.json"
+SUBSET_MANIFEST_VERSION = 1
+
+# Significance stage (--significance): per-gene bootstrap confidence intervals and permutation
+# p-values for the difference in mean CV and mean Range between the M and Y samples
+SIGNIFICANCE_METRICS = ["CV", "Range"]
+SIGNIFICANCE_RESAMPLES = 10_000
+SIGNIFICANCE_CONFIDENCE = 0.95
+SIGNIFICANCE_SEED = 0
+# Genes per pool task; every chunk draws from the same seeded stream, so results depend on neither
+# the worker count nor the chunk size
+SIGNIFICANCE_GENE_CHUNK = 256
+# Resamples drawn at once within a chunk, bounding the genes x resamples x samples temporaries
+SIGNIFICANCE_RESAMPLE_BLOCK = 1000
+
+# Default logging level; DEBUG adds per-file progress and dumps of problematic rows
+LOG_LEVEL = "INFO"
+
+def peak_rss_mb(who="self"):
+    """Peak resident set size in MB of this process ("self") or its finished children, or None"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    return round(usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def cpu_seconds():
+    """User + system CPU time of this process and its finished children"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+class RunReport:
+    """Wall time, CPU time, rows and peak RSS for each pipeline stage and gene file.
+
+    Stage CPU time includes child processes once they finish (the ingest worker
+    pool). Peak RSS is the high-water mark at the end of the stage, so it only
+    grows from one stage to the next.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or {}
+        self.started = datetime.now()
+        self.start_time = time.perf_counter()
+        self.stages = []
+        self.files = []
+        self.batches = []
+        self.reused_files = 0
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block; set record["rows"] inside it to report rows processed"""
+        record = {"stage": name, "rows": None}
+        wall_start = time.perf_counter()
+        cpu_start = cpu_seconds()
         try:
+            yield record
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall_start, 6)
+            record["cpu_s"] = round(cpu_seconds() - cpu_start, 6)
+            record["peak_rss_mb"] = peak_rss_mb()
+            record["peak_rss_children_mb"] = peak_rss_mb("children")
+            self.stages.append(record)
+            logger.info("[%s] %.3fs wall, %.3fs CPU, rows=%s, peak RSS %s MB",
+                        name, record["wall_s"], record["cpu_s"], record["rows"], record["peak_rss_mb"])
+
+    def add_file(self, metrics):
+        if metrics is None:
+            self.reused_files += 1
+        else:
+            self.files.append(metrics)
+
+    def add_batch(self, metrics):
+        """Record the metrics of a sample-sheet batch, which cover several files at once"""
+        self.batches.append(metrics)
+
+    def rows(self):
+        return sum(metrics["rows"] or 0 for metrics in self.files + self.batches)
+
+    def to_dict(self):
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "total_wall_s": round(time.perf_counter() - self.start_time, 6),
+            "settings": self.settings,
+            "stages": self.stages,
+            "files_computed": len(self.files) + sum(len(metrics["files"]) for metrics in self.batches),
+            "files_reused": self.reused_files,
+            "files": self.files,
+            "batches": self.batches,
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_children_mb": peak_rss_mb("children")
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+class RunningStats:
+    """One-pass per-column count, mean, sum of squared deviations, min and max.
+
+    Chunks are merged with the parallel form of Welford's algorithm, so memory
+    stays bounded by the chunk size. NaNs are skipped, as pandas does.
+    """
+
+    def __init__(self, n_columns):
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+
+    def update(self, values):
+        """Fold a 2-D float array (rows x columns) into the running statistics"""
+        valid = ~np.isnan(values)
+        n_b = valid.sum(axis=0).astype(float)
+        has_data = n_b > 0
+        if not has_data.any():
+            return
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = np.nansum(values, axis=0) / n_b
+            m2_b = np.nansum((values - mean_b) ** 2, axis=0)
+            n = self.count + n_b
+            delta = mean_b - self.mean
+            mean = self.mean + delta * n_b / n
+            m2 = self.m2 + m2_b + delta ** 2 * self.count * n_b / n
+
+        self.mean = np.where(has_data, mean, self.mean)
+        self.m2 = np.where(has_data, m2, self.m2)
+        self.count = n
+        self.min = np.minimum(self.min, np.where(valid, values, np.inf).min(axis=0))
+        self.max = np.maximum(self.max, np.where(valid, values, -np.inf).max(axis=0))
+
+    def finalize(self):
+        """Return (mean, sd, min, max) with pandas semantics (ddof=1, NaN when undefined)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(self.count > 0, self.mean, np.nan)
+            sd = np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+        col_min = np.where(self.count > 0, self.min, np.nan)
+        col_max = np.where(self.count > 0, self.max, np.nan)
+        return mean, sd, col_min, col_max
+
+def compute_count_stats_streaming(file, chunksize=STREAM_CHUNKSIZE, track=None, dump_rows=False,
+                                  max_dump_rows=STREAM_DUMP_ROWS):
+    """Compute per-sample count statistics in one bounded-memory pass over a gene CSV.
+
+    Returns (stats DataFrame without the Gene column, number of rows containing NaNs,
+    DataFrame of the first max_dump_rows of those rows, row count). The rows are only
+    kept when dump_rows is set. If a TrackWriter is given, each chunk's counts are appended to it.
+    """
+    running = RunningStats(len(SAMPLES))
+    integer_columns = np.ones(len(SAMPLES), dtype=bool)
+    nan_count = 0
+    nan_rows = []
+    n_rows = 0
+
+    for chunk in pd.read_csv(file, skiprows=1, header=None, chunksize=chunksize):
+        n_rows += len(chunk)
+        count_columns = chunk.iloc[:, 2::3]
+        count_columns.columns = SAMPLES
+        count_columns = count_columns.apply(pd.to_numeric, errors='coerce')
+
+        chunk_nan = count_columns.isna().any(axis=1)
+        chunk_nan_count = int(chunk_nan.sum())
+        if dump_rows and chunk_nan_count and nan_count < max_dump_rows:
+            nan_rows.append(count_columns[chunk_nan].head(max_dump_rows - nan_count))
+        nan_count += chunk_nan_count
+
+        # pandas keeps integer columns integral, which affects how Range is written out
+        integer_columns &= np.array([pd.api.types.is_integer_dtype(t) for t in count_columns.dtypes])
+        values = count_columns.to_numpy(dtype=float)
+        running.update(values)
+        if track is not None:
+            track.append(values)
+
+    mean, sd, col_min, col_max = running.finalize()
+    value_range = col_max - col_min
+    stats = pd.DataFrame({
+        "Sample": SAMPLES,
+        "Mean": mean,
+        "SD": sd,
+        "CV": sd / mean,
+        "Range": value_range.astype(np.int64) if integer_columns.all() else value_range
+    })
+    nan_rows = pd.concat(nan_rows) if nan_rows else pd.DataFrame(columns=SAMPLES)
+    return stats, nan_count, nan_rows, n_rows
+
+def compute_gene_stats(file, streaming=False, chunksize=STREAM_CHUNKSIZE, dump_rows=False, tracks_dir=None):
+    """Compute M1-Y3 statistics for a single gene CSV.
+
+    Returns (gene_name, stats DataFrame or None, individual summary text, log, metrics).
+    The log is a list of (level, message) pairs, returned rather than logged so worker
+    processes don't interleave output. Problematic rows are only formatted into it when
+    dump_rows is set. metrics holds the file's wall time, CPU time, row count and the
+    computing process's peak RSS.
+    With streaming=True the file is read in chunks and never held in memory whole.
+    With tracks_dir set, the per-position counts are also written there as a coverage track.
+    """
+    gene_name = file.split('/')[-1].replace('.csv', '')
+    log = [(logging.DEBUG, f"Processing: {file}")]
+    metrics = {"file": file, "rows": None}
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    data = None
+    track = None
+
+    def finish_metrics():
+        metrics["wall_s"] = round(time.perf_counter() - wall_start, 6)
+        metrics["cpu_s"] = round(time.process_time() - cpu_start, 6)
+        metrics["peak_rss_mb"] = peak_rss_mb()
+        return metrics
+
+    try:
+        if streaming:
+            track = TrackWriter(tracks_dir, gene_name) if tracks_dir is not None else None
+            stats, nan_count, nan_rows, metrics["rows"] = compute_count_stats_streaming(file, chunksize, track,
+                                                                                        dump_rows=dump_rows)
+            if track is not None:
+                track.close(len(SAMPLES))
+                track = None
+        else:
             # Read CSV file
             data = pd.read_csv(file, skiprows=1, header=None)
+            metrics["rows"] = len(data)
 
             # Extract count data columns
             count_columns = data.iloc[:, 2::3]
-            count_columns.columns = ["M1", "M2", "M3", "Y1", "Y2", "Y3"]
+            count_columns.columns = SAMPLES
 
             # Convert all values to numeric (force non-numeric to NaN)
             count_columns = count_columns.apply(pd.to_numeric, errors='coerce')
-
-            # Check for NaN values (problematic entries)
-            if count_columns.isna().sum().sum() > 0:
-                print(f"WARNING: Missing or non-numeric values found in {file}")
-                print(count_columns[count_columns.isna().any(axis=1)])
+            nan_rows = count_columns[count_columns.isna().any(axis=1)]
+            nan_count = len(nan_rows)
 
             # Compute statistics
             stats = pd.DataFrame({
@@ -58,24 +347,219 @@ def process_files_with_error_handling(file_path, data_output_dir):
                 "Range": (count_columns.max() - count_columns.min()).values
             })
 
-            # Add Gene column
-            stats.insert(0, "Gene", gene_name)
-            all_data.append(stats)
+            if tracks_dir is not None:
+                write_gene_track(tracks_dir, gene_name, count_columns.to_numpy(dtype=float))
 
-            # Store individual summary for text file
-            individual_summary = f"File: {gene_name}.csv\nSummary Statistics for {gene_name}.csv:\n"
-            individual_summary += stats.set_index('Sample')[['Mean', 'SD', 'CV', 'Range']].to_string()
-            individual_summary += "\n\n"
-            individual_summaries.append(individual_summary)
+        # Check for NaN values (problematic entries)
+        if nan_count:
+            log.append((logging.WARNING, f"WARNING: Missing or non-numeric values found in {file}"))
+            if dump_rows:
+                if len(nan_rows) < nan_count:
+                    log.append((logging.DEBUG, f"First {len(nan_rows)} of {nan_count} rows with missing values:"))
+                log.append((logging.DEBUG, str(nan_rows)))
 
-        except Exception as e:
-            print(f"ERROR in file: {file} - {e}")
-            print(f"Problematic Data in {file}:")
+        # Add Gene column
+        stats.insert(0, "Gene", gene_name)
+
+        # Individual summary for text file
+        individual_summary = f"File: {gene_name}.csv\nSummary Statistics for {gene_name}.csv:\n"
+        individual_summary += stats.set_index('Sample')[['Mean', 'SD', 'CV', 'Range']].to_string()
+        individual_summary += "\n\n"
+
+        return gene_name, stats, individual_summary, log, finish_metrics()
+
+    except Exception as e:
+        if track is not None:
+            track.abort()
+        log.append((logging.ERROR, f"ERROR in file: {file} - {e}"))
+        if dump_rows:
+            log.append((logging.DEBUG, f"Problematic Data in {file}:"))
             try:
-                data = pd.read_csv(file, skiprows=1, header=None)
-                print(data.head(10))
+                # Only re-read the head of the file if the first read never succeeded
+                if data is None:
+                    data = pd.read_csv(file, skiprows=1, header=None, nrows=10)
+                log.append((logging.DEBUG, str(data.head(10))))
             except:
-                print("Could not read file for error display")
+                log.append((logging.DEBUG, "Could not read file for error display"))
+
+        return gene_name, None, None, log, finish_metrics()
+
+def file_sha256(file, block_size=1 << 20):
+    """Return the SHA-256 hex digest of a file, read in fixed-size blocks"""
+    digest = hashlib.sha256()
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class BuildManifest:
+    """Persistent record of ingested gene files and their computed statistics.
+
+    Entries are keyed on file path and hold size, mtime, content hash and the
+    cached compute_gene_stats() result (without metrics). A file is reused when size and mtime
+    match, or when they differ but the content hash doesn't (e.g. a fresh
+    checkout). `changed` records whether anything was recomputed, added or
+    dropped, whether the output settings (thresholds, plot options) differ
+    from the previous run, or whether the previous run stopped before writing
+    every output. The entries are saved as soon as ingestion finishes, so a
+    failed run still reuses them, but the run is only marked complete once
+    its outputs are written.
+    """
+
+    def __init__(self, path, output_settings=None):
+        self.path = path
+        self.output_settings = output_settings or {}
+        self.entries = {}
+        self.changed = True
+        self.reused = 0
+
+    @classmethod
+    def load(cls, path, output_settings=None):
+        manifest = cls(path, output_settings)
+        try:
+            with open(path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+
+        if saved.get("version") != MANIFEST_VERSION or saved.get("samples") != SAMPLES:
+            return manifest
+        manifest.entries = saved.get("files", {})
+        manifest.changed = not saved.get("complete") or saved.get("output_settings") != manifest.output_settings
+        return manifest
+
+    def lookup(self, file):
+        """Return the cached compute_gene_stats() result for an unchanged file, else None.
+
+        Cached results carry None in place of the per-file metrics.
+        """
+        entry = self.entries.get(file)
+        if entry is None:
+            return None
+
+        st = os.stat(file)
+        if (entry["size"], entry["mtime"]) != (st.st_size, st.st_mtime_ns):
+            if entry["size"] != st.st_size or entry["sha256"] != file_sha256(file):
+                return None
+            entry["mtime"] = st.st_mtime_ns
+
+        self.reused += 1
+        stats = pd.DataFrame(entry["rows"]) if entry["rows"] is not None else None
+        return entry["gene"], stats, entry["summary"], entry["log"], None
+
+    def store(self, file, result):
+        gene_name, stats, individual_summary, log, _ = result
+        st = os.stat(file)
+        self.entries[file] = {
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "sha256": file_sha256(file),
+            "gene": gene_name,
+            "rows": stats.to_dict("list") if stats is not None else None,
+            "summary": individual_summary,
+            # Only failures are replayed on later runs; warnings were shown when the file changed
+            "log": log[1:] if stats is None else []
+        }
+        self.changed = True
+
+    def retain(self, files):
+        """Drop entries for files that no longer exist in the input glob"""
+        removed = set(self.entries) - set(files)
+        for file in removed:
+            del self.entries[file]
+        if removed:
+            self.changed = True
+
+    def save(self, complete=True):
+        """Write the manifest; complete=False marks the outputs as not yet matching it"""
+        saved = {
+            "version": MANIFEST_VERSION,
+            "samples": SAMPLES,
+            "output_settings": self.output_settings,
+            "complete": complete,
+            "files": self.entries
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(saved, f)
+        os.replace(tmp_path, self.path)
+
+def process_files_with_error_handling(file_path, data_output_dir, workers=1, chunksize=None, streaming=False,
+                                      manifest=None, report=None, tracks_dir=None):
+    """Process CSV files with error handling and return combined statistics DataFrame
+
+    With workers > 1 the per-gene statistics are computed in a process pool and
+    streamed back in file order, so the merged outputs match a serial run exactly.
+    streaming=True computes each gene's statistics in one chunked pass (see RunningStats).
+    If a BuildManifest is given, only new or changed files are read.
+    If a RunReport is given, per-file metrics are added to it.
+    With tracks_dir set, each gene's coverage track is written there along with an index.
+    """
+    files = sorted(glob.glob(file_path))
+    all_data = []
+    individual_summaries = []
+
+    cached = {}
+    if manifest is not None:
+        manifest.retain(files)
+        for file in files:
+            result = manifest.lookup(file)
+            if result is not None:
+                cached[file] = result
+    if tracks_dir is not None:
+        os.makedirs(tracks_dir, exist_ok=True)
+        # Genes cached before tracks were written (or whose track is gone) have to be read again,
+        # as do all of them when the tracks hold other samples (written by a sample-sheet run)
+        track_index = load_track_index(tracks_dir)
+        indexed = track_index["genes"] if track_index is not None and track_index["samples"] == SAMPLES else {}
+        cached = {
+            file: result for file, result in cached.items()
+            if result[1] is None or (result[0] in indexed and os.path.exists(track_paths(tracks_dir, result[0])[1]))
+        }
+    pending = [file for file in files if file not in cached]
+
+    compute = partial(compute_gene_stats, streaming=streaming, dump_rows=logger.isEnabledFor(logging.DEBUG),
+                      tracks_dir=tracks_dir)
+    if workers > 1 and len(pending) > 1:
+        if chunksize is None:
+            # A few chunks per worker keeps the pool busy without per-file IPC overhead
+            chunksize = max(1, len(pending) // (workers * 4))
+        executor = ProcessPoolExecutor(max_workers=workers)
+        computed = executor.map(compute, pending, chunksize=chunksize)
+    else:
+        executor = None
+        computed = map(compute, pending)
+
+    try:
+        for file in files:
+            if file in cached:
+                gene_name, stats, individual_summary, log, metrics = cached[file]
+            else:
+                gene_name, stats, individual_summary, log, metrics = result = next(computed)
+                if manifest is not None:
+                    manifest.store(file, result)
+            if report is not None:
+                report.add_file(metrics)
+            for level, message in log:
+                logger.log(level, message)
+            if stats is None:
+                continue
+            all_data.append(stats)
+            individual_summaries.append(individual_summary)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if cached:
+        logger.info(f"Reused cached statistics for {len(cached)} unchanged files")
+
+    if tracks_dir is not None:
+        track_rows = {}
+        for stats in all_data:
+            gene_name = stats["Gene"].iloc[0]
+            raw_path = track_paths(tracks_dir, gene_name)[0]
+            track_rows[gene_name] = os.path.getsize(raw_path) // (4 * len(SAMPLES))
+        write_track_index(tracks_dir, track_rows, SAMPLES)
 
     # Save individual gene summaries to text file
     if individual_summaries:
@@ -85,71 +569,494 @@ def process_files_with_error_handling(file_path, data_output_dir):
     return pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame()
 
 def process_dataframe_with_colors(df):
-    """Apply color coding based on thresholds"""
-    df["Color"] = "gray"  # Default color (Below threshold)
-
-    i = 0
-    while i < len(df):
-        gene = df.iloc[i]["Gene"]
-        m_samples = df.iloc[i:i+3]  # M1, M2, M3
-        y_samples = df.iloc[i+3:i+6]  # Y1, Y2, Y3
-
-        # Check thresholds for M-samples
-        meets_range_m = m_samples["Range"] >= RANGE_THRESHOLD
-        meets_cv_m = m_samples["CV"] >= CV_THRESHOLD
-        meets_threshold_m = meets_range_m | meets_cv_m
-
-        # Check thresholds for Y-samples
-        meets_range_y = y_samples["Range"] >= RANGE_THRESHOLD
-        meets_cv_y = y_samples["CV"] >= CV_THRESHOLD
-        meets_threshold_y = meets_range_y | meets_cv_y
-
-        # Apply coloring logic
-        if len(m_samples) == 3 and set(m_samples["Sample"]) == {"M1", "M2", "M3"}:
-            if meets_threshold_m.all():
-                df.loc[(df["Gene"] == gene) & (df["Sample"].isin(["M1", "M2", "M3"])), "Color"] = "red"
-            elif meets_threshold_m.any():
-                df.loc[(df["Gene"] == gene) & (df["Sample"].isin(["M1", "M2", "M3"])), "Color"] = "black"
-
-        if len(y_samples) == 3 and set(y_samples["Sample"]) == {"Y1", "Y2", "Y3"}:
-            if meets_threshold_y.all():
-                df.loc[(df["Gene"] == gene) & (df["Sample"].isin(["Y1", "Y2", "Y3"])), "Color"] = "blue"
-            elif meets_threshold_y.any():
-                df.loc[(df["Gene"] == gene) & (df["Sample"].isin(["Y1", "Y2", "Y3"])), "Color"] = "black"
-
-        # Check for green (both M and Y meet threshold)
-        if (len(m_samples) == 3 and meets_threshold_m.all() and 
-            len(y_samples) == 3 and meets_threshold_y.all()):
-            df.loc[df["Gene"] == gene, "Color"] = "green"
-
-        i += 6
+    """Apply color coding based on thresholds
+
+    Rows are taken in consecutive blocks of six (M1-M3 then Y1-Y3), each block
+    is classified with array operations, and the resulting colors are applied
+    to every row of the block's gene. A block that is short or doesn't hold the
+    expected samples only colors the half that does, as a later block for the
+    same gene overrides an earlier one.
+    """
+    n_rows = len(df)
+    n_blocks = -(-n_rows // 6)
+    pad = n_blocks * 6 - n_rows
+
+    samples = np.concatenate([df["Sample"].to_numpy(dtype=object), np.full(pad, None, dtype=object)]).reshape(-1, 6)
+    cv = np.concatenate([df["CV"].to_numpy(dtype=float), np.full(pad, np.nan)]).reshape(-1, 6)
+    value_range = np.concatenate([df["Range"].to_numpy(dtype=float), np.full(pad, np.nan)]).reshape(-1, 6)
+
+    # NaN compares False, so padding and missing statistics never meet a threshold
+    meets_threshold = (value_range >= RANGE_THRESHOLD) | (cv >= CV_THRESHOLD)
+    rows_in_block = np.minimum(6, n_rows - 6 * np.arange(n_blocks))
+    full_m = rows_in_block >= 3
+    full_y = rows_in_block == 6
+
+    def has_samples(block, names):
+        return np.logical_and.reduce([(block == name).sum(axis=1) == 1 for name in names])
 
+    m_all, m_any = meets_threshold[:, :3].all(axis=1), meets_threshold[:, :3].any(axis=1)
+    y_all, y_any = meets_threshold[:, 3:].all(axis=1), meets_threshold[:, 3:].any(axis=1)
+    m_ok = full_m & has_samples(samples[:, :3], ["M1", "M2", "M3"])
+    y_ok = full_y & has_samples(samples[:, 3:], ["Y1", "Y2", "Y3"])
+    green = full_m & m_all & full_y & y_all
+
+    m_color = np.select([green, m_ok & m_all, m_ok & m_any], ["green", "red", "black"], None)
+    y_color = np.select([green, y_ok & y_all, y_ok & y_any], ["green", "blue", "black"], None)
+    other_color = np.where(green, "green", None)
+
+    # Later blocks win for genes that appear in more than one block
+    block_colors = pd.DataFrame({
+        "Gene": df["Gene"].to_numpy()[::6],
+        "M": m_color,
+        "Y": y_color,
+        "Other": other_color
+    }).groupby("Gene", sort=False).last()
+
+    sample_group = np.select(
+        [df["Sample"].isin(["M1", "M2", "M3"]), df["Sample"].isin(["Y1", "Y2", "Y3"])],
+        ["M", "Y"],
+        "Other"
+    )
+    gene_rows = block_colors.index.get_indexer(df["Gene"])
+    group_cols = block_colors.columns.get_indexer(sample_group)
+    colors = block_colors.to_numpy()[gene_rows, group_cols] if len(block_colors) else np.array([], dtype=object)
+    colors = np.where((gene_rows >= 0) & pd.notna(colors), colors, "gray")
+
+    df["Color"] = colors
     return df
 
-def create_gene_category_summary(df, data_output_dir):
+class SampleSheet:
+    """Samples and strain groups for the sample-sheet mode, read from a CSV.
+
+    Columns are sample and group, plus optionally column (0-based index of the
+    sample's column triple in the gene CSVs, default: the sheet row), and color
+    and label for the group (taken from the group's first row that sets them).
+    Group colors default to GROUP_COLORS and labels to the group name. The
+    sheet
+
+        sample,group,color,label
+        M1,M,red,Mfd-
+        M2,M,,
+        M3,M,,
+        Y1,Y,blue,YB955
+        Y2,Y,,
+        Y3,Y,,
+
+    reproduces the default M1-Y3 classification.
+    """
+
+    REQUIRED_COLUMNS = ["sample", "group"]
+    RESERVED_COLORS = ["green", "black", "gray"]
+    RESERVED_LABELS = ["All Sporulation", "Common Genes", "Partial Threshold", "Below Threshold"]
+
+    def __init__(self, samples, groups, columns=None, colors=None, labels=None):
+        if len(samples) != len(groups) or not all(groups):
+            raise ValueError("Every sample needs a group")
+        if not all(samples):
+            raise ValueError("Every sample sheet row needs a sample name")
+        if len(set(samples)) != len(samples):
+            raise ValueError("Sample names in the sample sheet must be unique")
+        self.samples = list(samples)
+        self.columns = list(columns) if columns is not None else list(range(len(samples)))
+        self.groups = list(dict.fromkeys(groups))
+        colors = colors or {}
+        labels = labels or {}
+        self.colors = [colors.get(group) or GROUP_COLORS[i % len(GROUP_COLORS)] for i, group in enumerate(self.groups)]
+        self.labels = [labels.get(group) or group for group in self.groups]
+        # samples x groups
+        self.membership = np.array([[group == name for name in self.groups] for group in groups], dtype=bool)
+
+        if len(set(self.colors)) != len(self.colors) or set(self.colors) & set(self.RESERVED_COLORS):
+            raise ValueError(f"Group colors must be distinct and not one of {self.RESERVED_COLORS}")
+        if (len(set(self.labels)) != len(self.labels) or set(self.labels) & set(self.RESERVED_LABELS)
+                or any("/" in label for label in self.labels)):
+            raise ValueError(f"Group labels must be distinct, contain no '/' and not be one of {self.RESERVED_LABELS}")
+
+    @classmethod
+    def load(cls, path):
+        sheet = pd.read_csv(path, dtype=str).fillna("")
+        sheet.columns = [column.strip().lower() for column in sheet.columns]
+        missing = [column for column in cls.REQUIRED_COLUMNS if column not in sheet.columns]
+        if missing:
+            raise ValueError(f"Sample sheet {path} is missing column(s): {', '.join(missing)}")
+        sheet = sheet.apply(lambda column: column.str.strip())
+
+        columns = sheet["column"].astype(int).tolist() if "column" in sheet.columns else None
+        colors, labels = {}, {}
+        for row in sheet.itertuples(index=False):
+            if "color" in sheet.columns and row.color:
+                colors.setdefault(row.group, row.color)
+            if "label" in sheet.columns and row.label:
+                labels.setdefault(row.group, row.label)
+        return cls(sheet["sample"].tolist(), sheet["group"].tolist(), columns, colors, labels)
+
+    def category_priority(self):
+        """CATEGORY_PRIORITY with one category per group in place of Mfd- and YB955"""
+        return [CATEGORY_PRIORITY[0]] + list(zip(self.colors, self.labels)) + [CATEGORY_PRIORITY[-1]]
+
+    def category_order(self):
+        """CATEGORY_ORDER with the group categories in place of Mfd- and YB955"""
+        return self.labels + CATEGORY_ORDER[2:]
+
+    def group_samples(self, i):
+        """Names of the samples in the i-th group"""
+        return [sample for sample, member in zip(self.samples, self.membership[:, i]) if member]
+
+    def group_labels(self):
+        return dict(zip(self.colors, self.labels))
+
+    def to_dict(self):
+        return {
+            "samples": self.samples,
+            "groups": [self.groups[i] for i in self.membership.argmax(axis=1)],
+            "columns": self.columns,
+            "colors": self.colors,
+            "labels": self.labels
+        }
+
+def read_count_matrix(file, columns):
+    """Read the count columns (by triple index) of one gene CSV as a positions x samples float array.
+
+    Returns (values, integral), where integral is False if pandas wouldn't have
+    kept every column as integers (non-numeric or missing values, decimals).
+    """
+    count_columns = [3 * column + 2 for column in columns]
+    data = pd.read_csv(file, skiprows=1, header=None, usecols=count_columns)[count_columns]
+    data = data.apply(pd.to_numeric, errors='coerce')
+    integral = all(pd.api.types.is_integer_dtype(t) for t in data.dtypes)
+    return data.to_numpy(dtype=float), integral
+
+def batch_statistics(block, lengths):
+    """Per-gene, per-sample (mean, sd, min, max) of a NaN-padded genes x samples x positions array.
+
+    NaNs are skipped and the SD uses ddof=1, as in pandas. Genes are reduced over their
+    own lengths (one reduction per distinct length) rather than the padded width, so the
+    sums add up in the same order as pandas' and the statistics match the M1-Y3 pipeline's bit for bit.
+    """
+    lengths = np.asarray(lengths)
+    stats = np.full((4,) + block.shape[:2], np.nan)
+    for length in np.unique(lengths):
+        genes = np.flatnonzero(lengths == length)
+        part = block[genes, :, :length]
+        valid = ~np.isnan(part)
+        count = valid.sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, part, 0).sum(axis=2) / count
+            deviations = np.where(valid, part - mean[:, :, None], 0)
+            sd = np.sqrt((deviations ** 2).sum(axis=2) / (count - 1))
+        stats[0, genes] = mean
+        stats[1, genes] = np.where(count > 1, sd, np.nan)
+        stats[2, genes] = np.where(count > 0, np.where(valid, part, np.inf).min(axis=2), np.nan)
+        stats[3, genes] = np.where(count > 0, np.where(valid, part, -np.inf).max(axis=2), np.nan)
+    return stats
+
+def compute_batch_stats(files, columns, tracks_dir=None, dump_rows=False):
+    """Compute statistics for a batch of gene CSVs with array reductions over the whole batch.
+
+    The files' counts are laid out as a NaN-padded (genes x samples x positions)
+    array and reduced along the position axis (see batch_statistics). Returns (genes, stats, integral,
+    logs, metrics): stats is a 4 x genes x samples array of mean, SD, min and max,
+    integral says per gene whether every column was integer-valued, and logs holds each
+    file's (level, message) list. Files that couldn't be read are left out of genes.
+    """
+    logs = []
+    metrics = {"files": list(files), "rows": 0}
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    genes, matrices, integral = [], [], []
+    for file in files:
+        gene_name = file.split('/')[-1].replace('.csv', '')
+        log = [(logging.DEBUG, f"Processing: {file}")]
+        logs.append(log)
+        try:
+            values, file_integral = read_count_matrix(file, columns)
+            if tracks_dir is not None:
+                write_gene_track(tracks_dir, gene_name, values)
+        except Exception as e:
+            log.append((logging.ERROR, f"ERROR in file: {file} - {e}"))
+            continue
+        nan_rows = np.isnan(values).any(axis=1)
+        if nan_rows.any():
+            log.append((logging.WARNING, f"WARNING: Missing or non-numeric values found in {file}"))
+            if dump_rows:
+                log.append((logging.DEBUG, str(pd.DataFrame(values[nan_rows], index=np.flatnonzero(nan_rows)))))
+        genes.append(gene_name)
+        matrices.append(values)
+        integral.append(file_integral)
+        metrics["rows"] += len(values)
+
+    positions = max((len(values) for values in matrices), default=0)
+    block = np.full((len(matrices), len(columns), positions), np.nan)
+    for i, values in enumerate(matrices):
+        block[i, :, :len(values)] = values.T
+    stats = batch_statistics(block, [len(values) for values in matrices])
+
+    metrics["wall_s"] = round(time.perf_counter() - wall_start, 6)
+    metrics["cpu_s"] = round(time.process_time() - cpu_start, 6)
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    return genes, stats, integral, logs, metrics
+
+def plan_batches(files, batch_size=GENE_BATCH_SIZE, batch_bytes=GENE_BATCH_BYTES):
+    """Group files into batches of similar size, so padding each gene to the longest in its batch stays cheap"""
+    sizes = {file: os.path.getsize(file) for file in files}
+    batches = []
+    batch = []
+    for file in sorted(files, key=sizes.get):
+        # Files come in increasing size, so the newest file sets the batch's padded size
+        if batch and (len(batch) >= batch_size or (len(batch) + 1) * sizes[file] > batch_bytes):
+            batches.append(batch)
+            batch = []
+        batch.append(file)
+    if batch:
+        batches.append(batch)
+    return batches
+
+def process_files_with_sample_sheet(file_path, data_output_dir, sheet, workers=1, batch_size=GENE_BATCH_SIZE,
+                                    report=None, tracks_dir=None):
+    """Process CSV files for the samples of a SampleSheet and return the combined statistics DataFrame
+
+    Files are read in size-sorted batches (see plan_batches), each reduced with
+    compute_batch_stats, over a process pool when workers > 1. Rows come out in
+    file order with the samples in sheet order, like process_files_with_error_handling.
+    """
+    files = sorted(glob.glob(file_path))
+    batches = plan_batches(files, batch_size)
+    if tracks_dir is not None:
+        os.makedirs(tracks_dir, exist_ok=True)
+
+    compute = partial(compute_batch_stats, columns=sheet.columns, tracks_dir=tracks_dir,
+                      dump_rows=logger.isEnabledFor(logging.DEBUG))
+    if workers > 1 and len(batches) > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        computed = executor.map(compute, batches)
+    else:
+        executor = None
+        computed = map(compute, batches)
+
+    gene_stats = {}
+    gene_integral = {}
+    logs = {}
+    try:
+        for batch, (genes, stats, batch_integral, batch_logs, metrics) in zip(batches, computed):
+            if report is not None:
+                report.add_batch(metrics)
+            logs.update(zip(batch, batch_logs))
+            for i, gene_name in enumerate(genes):
+                gene_stats[gene_name] = stats[:, i]
+                gene_integral[gene_name] = batch_integral[i]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Batches are size-ordered; logs and rows go back to file order
+    genes = []
+    for file in files:
+        for level, message in logs[file]:
+            logger.log(level, message)
+        gene_name = file.split('/')[-1].replace('.csv', '')
+        if gene_name in gene_stats:
+            genes.append(gene_name)
+    if not genes:
+        return pd.DataFrame()
+
+    n_samples = len(sheet.samples)
+    integral = [gene_integral[gene] for gene in genes]
+    mean, sd, col_min, col_max = np.stack([gene_stats[gene] for gene in genes], axis=1)
+    value_range = col_max - col_min
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cv = sd / mean
+    df = pd.DataFrame({
+        "Gene": np.repeat(np.array(genes, dtype=object), n_samples),
+        "Sample": np.tile(np.array(sheet.samples, dtype=object), len(genes)),
+        "Mean": mean.ravel(),
+        "SD": sd.ravel(),
+        "CV": cv.ravel(),
+        "Range": value_range.ravel().astype(np.int64) if all(integral) else value_range.ravel()
+    })
+
+    if tracks_dir is not None:
+        track_rows = {
+            gene: os.path.getsize(track_paths(tracks_dir, gene)[0]) // (4 * n_samples) for gene in genes
+        }
+        write_track_index(tracks_dir, track_rows, sheet.samples)
+
+    # Save individual gene summaries to text file, with each gene's Range as pandas would have typed it
+    summary_stats = df.set_index("Sample")[["Mean", "SD", "CV", "Range"]]
+    with open(os.path.join(data_output_dir, "individual_gene_summaries.txt"), 'w') as f:
+        for i, gene in enumerate(genes):
+            gene_stats = summary_stats.iloc[i * n_samples:(i + 1) * n_samples]
+            if integral[i]:
+                gene_stats = gene_stats.astype({"Range": np.int64})
+            gene_stats_text = gene_stats.to_string()
+            f.write(f"File: {gene}.csv\nSummary Statistics for {gene}.csv:\n{gene_stats_text}\n\n")
+
+    return df
+
+def classify_sample_matrix(cv, value_range, membership, group_colors):
+    """Colors for genes x samples CV and Range arrays, for any number of strain groups.
+
+    A sample is colored green when every sample of every group meets a
+    threshold, its group's color when every sample of its group does, black
+    when any sample of its group does, and gray otherwise. With the M and Y
+    groups this is the classification of process_dataframe_with_colors.
+    """
+    # NaN compares False, so missing statistics never meet a threshold
+    meets = (value_range >= RANGE_THRESHOLD) | (cv >= CV_THRESHOLD)
+    in_group = membership[None, :, :]
+    group_all = (meets[:, :, None] | ~in_group).all(axis=1)
+    group_any = (meets[:, :, None] & in_group).any(axis=1)
+    common = group_all.all(axis=1)
+
+    sample_group = membership.argmax(axis=1)
+    sample_colors = np.array(group_colors, dtype=object)[sample_group]
+    return np.select(
+        [common[:, None], group_all[:, sample_group], group_any[:, sample_group]],
+        [np.array("green", dtype=object), sample_colors[None, :], np.array("black", dtype=object)],
+        np.array("gray", dtype=object)
+    )
+
+def process_dataframe_with_sample_sheet(df, sheet):
+    """Apply color coding based on thresholds to the output of process_files_with_sample_sheet"""
+    shape = (-1, len(sheet.samples))
+    colors = classify_sample_matrix(
+        df["CV"].to_numpy(dtype=float).reshape(shape),
+        df["Range"].to_numpy(dtype=float).reshape(shape),
+        sheet.membership,
+        sheet.colors
+    )
+    df["Color"] = colors.ravel()
+    return df
+
+def resample_chunk(values, seed, n_first, n_resamples=SIGNIFICANCE_RESAMPLES, confidence=SIGNIFICANCE_CONFIDENCE):
+    """Bootstrap CIs and permutation p-values for the first-minus-second group difference of means.
+
+    values is a metrics x genes x samples array whose first n_first samples form
+    the first group, and seed anything np.random.default_rng accepts. Every gene in the chunk is resampled with the same draws,
+    so each block of resamples is a handful of gathers and means over the whole
+    array. Returns (difference, ci_low, ci_high, p_value), each metrics x genes;
+    genes with a missing value get NaN throughout.
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = values.shape[2]
+    n_second = n_samples - n_first
+    first, second = values[:, :, :n_first], values[:, :, n_first:]
+    difference = first.mean(axis=2) - second.mean(axis=2)
+    # Permuted means only match the observed difference up to rounding
+    tolerance = 1e-9 * np.abs(values).max(axis=2, initial=0)
+    threshold = np.abs(difference) - tolerance
+
+    bootstrap = np.empty(values.shape[:2] + (n_resamples,))
+    exceed = np.zeros(values.shape[:2], dtype=np.int64)
+    for start in range(0, n_resamples, SIGNIFICANCE_RESAMPLE_BLOCK):
+        size = min(SIGNIFICANCE_RESAMPLE_BLOCK, n_resamples - start)
+
+        # Bootstrap: draw each group's replicates with replacement
+        first_draw = rng.integers(0, n_first, (size, n_first))
+        second_draw = rng.integers(0, n_second, (size, n_second))
+        bootstrap[:, :, start:start + size] = (
+            first[:, :, first_draw].mean(axis=3) - second[:, :, second_draw].mean(axis=3)
+        )
+
+        # Permutation: shuffle the group labels over the pooled replicates
+        order = rng.permuted(np.tile(np.arange(n_samples), (size, 1)), axis=1)
+        permuted = values[:, :, order]
+        permuted_difference = permuted[..., :n_first].mean(axis=3) - permuted[..., n_first:].mean(axis=3)
+        exceed += (np.abs(permuted_difference) >= threshold[:, :, None]).sum(axis=2)
+
+    alpha = (1 - confidence) / 2
+    ci_low, ci_high = np.quantile(bootstrap, [alpha, 1 - alpha], axis=2)
+    p_value = np.where(np.isnan(difference), np.nan, (exceed + 1) / (n_resamples + 1))
+    return difference, ci_low, ci_high, p_value
+
+def compute_significance(df, first_samples, second_samples, n_resamples=SIGNIFICANCE_RESAMPLES,
+                         confidence=SIGNIFICANCE_CONFIDENCE, seed=SIGNIFICANCE_SEED, workers=1):
+    """Per-gene significance of the difference in mean CV and mean Range between two sample groups.
+
+    Genes are split into chunks of SIGNIFICANCE_GENE_CHUNK, each resampled by
+    resample_chunk from the same seed, over a process pool when workers > 1, so
+    each gene sees the same draws however the genes are chunked. Returns a DataFrame indexed by Gene with <metric>_Diff,
+    <metric>_Diff_Low, <metric>_Diff_High (bootstrap percentile interval) and
+    <metric>_Diff_P (two-sided permutation p-value) for each metric.
+
+    With three replicates per group there are only 20 distinct label
+    permutations, so p-values bottom out around 0.1 however many resamples are drawn.
+    """
+    samples = list(first_samples) + list(second_samples)
+    wide = {
+        metric: df.pivot(index="Gene", columns="Sample", values=metric).reindex(columns=samples)
+        for metric in SIGNIFICANCE_METRICS
+    }
+    genes = wide[SIGNIFICANCE_METRICS[0]].index
+    values = np.stack([wide[metric].to_numpy(dtype=float) for metric in SIGNIFICANCE_METRICS])
+
+    starts = range(0, len(genes), SIGNIFICANCE_GENE_CHUNK)
+    chunks = [values[:, start:start + SIGNIFICANCE_GENE_CHUNK] for start in starts]
+    compute = partial(resample_chunk, seed=seed, n_first=len(first_samples), n_resamples=n_resamples,
+                      confidence=confidence)
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(compute, chunks))
+    else:
+        results = list(map(compute, chunks))
+
+    columns = {}
+    for i, metric in enumerate(SIGNIFICANCE_METRICS):
+        for suffix, j in [("Diff", 0), ("Diff_Low", 1), ("Diff_High", 2), ("Diff_P", 3)]:
+            columns[f"{metric}_{suffix}"] = np.concatenate([result[j][i] for result in results]) if results else []
+    return pd.DataFrame(columns, index=genes)
+
+def add_significance(df, first_samples, second_samples, **kwargs):
+    """Add the compute_significance() columns of each row's gene to df"""
+    significance = compute_significance(df, first_samples, second_samples, **kwargs)
+    df = df.drop(columns=[column for column in significance.columns if column in df.columns])
+    return df.join(significance, on="Gene")
+
+def write_columnar_stats(df, data_output_dir):
+    """Save the colored statistics as one .npy file per column for memory-mapped loading.
+
+    Gene, Sample and Color are stored as int32 codes with their lookup tables in
+    categories.json. The directory is built beside the target and swapped in, so
+    readers never see a partially written store.
+    """
+    target = os.path.join(data_output_dir, COLUMNAR_STATS_DIRNAME)
+    with replacing_directory(target) as tmp_dir:
+        categories = {}
+        for column in ["Gene", "Sample", "Color"]:
+            codes, uniques = pd.factorize(df[column])
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), codes.astype(np.int32))
+            categories[column] = uniques.tolist()
+        for column in ["Mean", "SD", "CV", "Range"]:
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), df[column].to_numpy())
+
+        with open(os.path.join(tmp_dir, "categories.json"), 'w') as f:
+            json.dump({"rows": len(df), "categories": categories}, f)
+    return target
+
+# Category assigned from the highest-priority color present among a gene's samples
+CATEGORY_PRIORITY = [
+    ("green", "Common Genes"),       # Green - both M and Y meet threshold
+    ("red", "Mfd-"),                 # Red - M samples meet threshold
+    ("blue", "YB955"),               # Blue - Y samples meet threshold
+    ("black", "Partial Threshold"),  # Black - partial threshold
+]
+DEFAULT_CATEGORY = "Below Threshold"  # Gray - below threshold
+
+# Order of the per-category summary files (the M and Y group categories first)
+CATEGORY_ORDER = ["Mfd-", "YB955", "Common Genes", "Partial Threshold", "Below Threshold"]
+
+def create_gene_category_summary(df, data_output_dir, priority=CATEGORY_PRIORITY):
     """Create gene category summary based on colors"""
-    # Get unique genes and their predominant color
-    gene_colors = []
-    
-    for gene in df["Gene"].unique():
-        gene_data = df[df["Gene"] == gene]
-        colors = gene_data["Color"].value_counts()
-        
-        # Determine category based on color priority
-        if "green" in colors.index:
-            category = "Common Genes"  # Green - both M and Y meet threshold
-        elif "red" in colors.index:
-            category = "Mfd-"  # Red - M samples meet threshold
-        elif "blue" in colors.index:
-            category = "YB955"  # Blue - Y samples meet threshold
-        elif "black" in colors.index:
-            category = "Partial Threshold"  # Black - partial threshold
-        else:
-            category = "Below Threshold"  # Gray - below threshold
-            
-        gene_colors.append({"Gene": gene, "Category": category})
-    
-    gene_colors_df = pd.DataFrame(gene_colors)
+    # Rank each row's color once, then keep the best rank per gene in a single groupby
+    color_rank = {color: rank for rank, (color, _) in enumerate(priority)}
+    category_names = np.array([category for _, category in priority] + [DEFAULT_CATEGORY], dtype=object)
+    ranks = df["Color"].map(color_rank).fillna(len(priority)).astype(int)
+    best_rank = ranks.groupby(df["Gene"], sort=False, dropna=False).min()
+
+    gene_colors_df = pd.DataFrame({
+        "Gene": best_rank.index.to_numpy(),
+        "Category": category_names[best_rank.to_numpy()]
+    })
     
     # Create summary table
     summary_table = (
@@ -164,96 +1071,133 @@ def create_gene_category_summary(df, data_output_dir):
     
     # Save summary table
     summary_table.to_csv(os.path.join(data_output_dir, "gene_category_summary_table.csv"), index=False)
-    print(summary_table)
+    logger.info("%s", summary_table)
     
     return gene_colors_df
 
-def create_summary_files_by_category(df, gene_colors, data_output_dir):
-    """Create summary text files for each category"""
-    categories = {
-        "All Sporulation": df["Gene"].unique(),
-        "Mfd-": gene_colors[gene_colors["Category"] == "Mfd-"]["Gene"].values,
-        "YB955": gene_colors[gene_colors["Category"] == "YB955"]["Gene"].values,
-        "Common Genes": gene_colors[gene_colors["Category"] == "Common Genes"]["Gene"].values,
-        "Partial Threshold": gene_colors[gene_colors["Category"] == "Partial Threshold"]["Gene"].values,
-        "Below Threshold": gene_colors[gene_colors["Category"] == "Below Threshold"]["Gene"].values
-    }
-    
-    for category, genes in categories.items():
-        if len(genes) == 0:
-            continue
-            
-        filename = f"Summary_Stats_{category.replace(' ', '_')}_Genes.txt"
-        filepath = os.path.join(data_output_dir, filename)
-        
-        with open(filepath, 'w') as f:
+def summary_filename(category):
+    return f"Summary_Stats_{category.replace(' ', '_')}_Genes.txt"
+
+def create_summary_files_by_category(df, gene_colors, data_output_dir, category_order=CATEGORY_ORDER):
+    """Create summary text files for each category
+
+    All files are written in one pass over the sorted genes. Each gene's table
+    is rendered once and goes to both the All Sporulation file and the file
+    for its own category.
+    """
+    stat_columns = ["Mean", "SD", "CV", "Range"]
+    gene_category = dict(zip(gene_colors["Gene"], gene_colors["Category"]))
+
+    categories = {"All Sporulation": df["Gene"].unique()}
+    for category in category_order:
+        categories[category] = gene_colors[gene_colors["Category"] == category]["Gene"].values
+    categories = {category: genes for category, genes in categories.items() if len(genes) > 0}
+
+    # Per-category overall statistics from one groupby over (Category, Sample)
+    df_categories = df["Gene"].map(gene_category)
+    overall_stats = {"All Sporulation": df.groupby("Sample")[stat_columns].mean()}
+    for category, stats_summary in df.groupby([df_categories, "Sample"])[stat_columns].mean().groupby(level=0):
+        overall_stats[category] = stats_summary.droplevel(0)
+
+    gene_rows = df.groupby("Gene", sort=False).indices
+    files = {}
+    try:
+        for category, genes in categories.items():
+            f = files[category] = open(os.path.join(data_output_dir, summary_filename(category)), 'w')
             f.write(f"Summary Statistics for {category} Genes\n")
             f.write("=" * 50 + "\n\n")
             f.write(f"Total Genes: {len(genes)}\n")
             f.write(f"Gene List: {', '.join(sorted(genes))}\n\n")
-            
-            # Calculate overall statistics for this category
-            category_data = df[df["Gene"].isin(genes)]
-            if not category_data.empty:
-                f.write("Overall Statistics:\n")
-                f.write("-" * 20 + "\n")
-                stats_summary = category_data.groupby("Sample")[["Mean", "SD", "CV", "Range"]].mean()
-                f.write(stats_summary.to_string())
-                f.write("\n\n")
-                
-                f.write("Individual Gene Details:\n")
-                f.write("-" * 25 + "\n")
-                for gene in sorted(genes):
-                    gene_data = category_data[category_data["Gene"] == gene]
-                    if not gene_data.empty:
-                        f.write(f"\n{gene}:\n")
-                        gene_stats = gene_data.set_index("Sample")[["Mean", "SD", "CV", "Range"]]
-                        f.write(gene_stats.to_string())
-                        f.write("\n")
-
-def create_interactive_plot(df, title, filename, legend_x=0.95, legend_y=0.35, legend_font_size=20, gene_label="Gene"):
-    """Create an interactive scatter plot and save as JSON."""
+
+            f.write("Overall Statistics:\n")
+            f.write("-" * 20 + "\n")
+            f.write(overall_stats[category].to_string())
+            f.write("\n\n")
+
+            f.write("Individual Gene Details:\n")
+            f.write("-" * 25 + "\n")
+
+        for gene in sorted(categories["All Sporulation"]):
+            gene_stats = df.iloc[gene_rows[gene]].set_index("Sample")[stat_columns]
+            gene_text = f"\n{gene}:\n{gene_stats.to_string()}\n"
+            files["All Sporulation"].write(gene_text)
+            if gene_category.get(gene) in files:
+                files[gene_category[gene]].write(gene_text)
+    finally:
+        for f in files.values():
+            f.close()
+
+def resolve_render_mode(render_mode, n_points):
+    """Map a RENDER_MODE setting to the px.scatter render_mode for a given point count"""
+    if render_mode not in ("auto", "svg", "webgl"):
+        raise ValueError(f"Unknown render mode: {render_mode}")
+    if render_mode == "auto":
+        return "webgl" if n_points > WEBGL_POINT_THRESHOLD else "svg"
+    return render_mode
+
+def create_interactive_plot(df, title, filename, legend_x=0.95, legend_y=0.35, legend_font_size=20, gene_label="Gene",
+                            render_mode=RENDER_MODE, plot_export=PLOT_EXPORT, gzip_export=GZIP_PLOT_EXPORT,
+                            group_labels=None):
+    """Create an interactive scatter plot and save as JSON.
+
+    render_mode "webgl" emits Scattergl traces, "svg" plain Scatter traces, and
+    "auto" picks webgl above WEBGL_POINT_THRESHOLD points. plot_export selects
+    the plain JSON, the compact export (<name>.compact.json, see compact_figure.py)
+    or both; gzip_export gzips the compact file. group_labels maps each strain
+    group's color to its legend name, in legend order (default: YB955 and Mfd-).
+    Returns the figure dict.
+    """
+    if group_labels is None:
+        group_labels = {"blue": "YB955", "red": "Mfd<sup>−</sup>"}
+
     # Mapping of internal color codes to display names
-    color_labels = {
-        "red"   : "Mfd<sup>−</sup>",
-        "blue"  : "YB955",
+    color_labels = dict(group_labels)
+    color_labels.update({
         "green" : "Common Genes",
         "black" : "Partial Threshold",
         "gray" : "Below Threshold"
-    }
+    })
+    color_order = list(color_labels)
 
     fig = px.scatter(
         df, x="CV", y="Range",
         color="Color",
-        color_discrete_map={
-            "red": "red",
-            "blue": "blue",
-            "green": "green", 
-            "black": "black",
-            "gray": "gray"
-        },
+        color_discrete_map={color: color for color in color_order},
         category_orders={  # Legend display order (initial)
-            "Color": ["blue", "red", "green", "black", "gray"]
+            "Color": color_order
         },
         hover_name=None,
-        hover_data=None
+        hover_data=None,
+        render_mode=resolve_render_mode(render_mode, len(df))
     )
     
+    # Significance columns (see add_significance) go into the hover text when present
+    customdata_columns = ["Gene", "Sample", "Mean", "SD"]
+    significance_columns = [f"{metric}_{suffix}" for metric in SIGNIFICANCE_METRICS
+                            for suffix in ["Diff", "Diff_Low", "Diff_High", "Diff_P"]]
+    with_significance = all(column in df.columns for column in significance_columns)
+    if with_significance:
+        customdata_columns += significance_columns
+
     for trace in fig.data:
         trace_color = trace.name
         sub_df = df[df["Color"] == trace_color]
         # Convert NumPy arrays to lists for JSON serialization
-        trace.customdata = sub_df[["Gene", "Sample", "Mean", "SD"]].values.tolist()
+        trace.customdata = sub_df[customdata_columns].values.tolist()
 
     # Custom hover template with configurable gene label
-    fig.update_traces(
-        hovertemplate=f"<b>{gene_label}:</b> %{{customdata[0]}}<br>" +
-                      "<b>Sample:</b> %{customdata[1]}<br>" +
-                      "<b>Mean:</b> %{customdata[2]:.2f}<br>" +
-                      "<b>SD:</b> %{customdata[3]:.2f}<br>" +
-                      "<b>CV:</b> %{x:.3f}<br>" +
-                      "<b>Range:</b> %{y:.0f}<extra></extra>"
-    )
+    hovertemplate = (f"<b>{gene_label}:</b> %{{customdata[0]}}<br>" +
+                     "<b>Sample:</b> %{customdata[1]}<br>" +
+                     "<b>Mean:</b> %{customdata[2]:.2f}<br>" +
+                     "<b>SD:</b> %{customdata[3]:.2f}<br>" +
+                     "<b>CV:</b> %{x:.3f}<br>" +
+                     "<b>Range:</b> %{y:.0f}")
+    if with_significance:
+        hovertemplate += ("<br><b>CV difference:</b> %{customdata[4]:.3f} " +
+                          "[%{customdata[5]:.3f}, %{customdata[6]:.3f}], p = %{customdata[7]:.3g}" +
+                          "<br><b>Range difference:</b> %{customdata[8]:.0f} " +
+                          "[%{customdata[9]:.0f}, %{customdata[10]:.0f}], p = %{customdata[11]:.3g}")
+    fig.update_traces(hovertemplate=hovertemplate + "<extra></extra>")
 
     # Add threshold lines
     fig.add_vline(
@@ -303,28 +1247,22 @@ def create_interactive_plot(df, title, filename, legend_x=0.95, legend_y=0.35, l
         )
     )
 
-    # Draw Order Priority (higher drawn on top)
-    render_priority = {
-        "red": 5,
-        "blue": 5,
+    # Draw Order Priority (higher drawn on top); strain groups are drawn over everything else
+    render_priority = dict.fromkeys(group_labels, 5)
+    render_priority.update({
         "green": 4,
         "black": 3,
         "gray": 2
-    }
+    })
 
     # Legend Display Order
-    legend_rank = {
-        "YB955": 0,
-        "Mfd<sup>−</sup>": 1,
-        "Common Genes": 2,
-        "Partial Threshold": 3,
-        "Below Threshold": 4
-    }
+    legend_rank = {color_labels[color]: rank for rank, color in enumerate(color_order)}
 
     # Sort traces by internal color value for rendering
     sorted_traces = sorted(fig.data, key=lambda t: render_priority.get(t.name, 0))
 
     # Rename traces and assign legend rank
+    group_names = set(group_labels.values())
     for trace in sorted_traces:
         original_name = trace.name
         display_name = color_labels.get(original_name, original_name)
@@ -339,10 +1277,7 @@ def create_interactive_plot(df, title, filename, legend_x=0.95, legend_y=0.35, l
         if trace.name == "Below Threshold":
             trace.marker.size = 5
             trace.marker.opacity = 0.7
-        elif trace.name == "Mfd<sup>−</sup>":
-            trace.marker.size = 10
-            trace.marker.opacity = 1.0
-        elif trace.name == "YB955":
+        elif trace.name in group_names:
             trace.marker.size = 10
             trace.marker.opacity = 1.0
         elif trace.name == "Common Genes":
@@ -355,62 +1290,518 @@ def create_interactive_plot(df, title, filename, legend_x=0.95, legend_y=0.35, l
 
     fig.write_html(filename, include_plotlyjs='cdn', full_html=True)
 
+    fig_dict = fig.to_dict()
+
     # Save figure as JSON
-    with open(filename.replace('.html', '.json'), 'w') as f:
-        json.dump(fig.to_dict(), f)
-
-# Main execution workflow
-print("Starting Sporulation Analysis Pipeline...")
-print("=" * 50)
-
-# Step 1: Process all CSV files and create combined dataset
-print("\nStep 1: Processing CSV files and calculating statistics...")
-data_df = process_files_with_error_handling(file_path, data_output_dir)
-
-if data_df.empty:
-    print("No data processed. Exiting.")
-    sys.exit()
-
-# Save combined statistics
-data_df.to_csv(os.path.join(data_output_dir, "sporulation_CV_statistics.csv"), index=False)
-print(f"Combined statistics saved to: {os.path.join(data_output_dir, 'sporulation_CV_statistics.csv')}")
-
-# Step 2: Apply color coding based on thresholds
-print("\nStep 2: Applying color coding based on thresholds...")
-data_df = process_dataframe_with_colors(data_df)
-
-# Step 3: Create gene category summary
-print("\nStep 3: Creating gene category summary...")
-gene_colors = create_gene_category_summary(data_df, data_output_dir)
-
-# Step 4: Create summary files by category
-print("\nStep 4: Creating summary files by category...")
-create_summary_files_by_category(data_df, gene_colors, data_output_dir)
-
-# Step 5: Create interactive plot
-print("\nStep 5: Creating interactive visualization...")
-create_interactive_plot(
-    data_df, 
-    "All Sporulation-Affected Genes", 
-    os.path.join(assets_output_dir, "all_sporulation_genes_scatter_plot.html")
-)
-print("All sporulation-affected genes plot saved")
-
-# Final summary
-print(f"\nAnalysis complete! Outputs saved to:")
-print(f"Data: {data_output_dir}")
-print(f"Assets: {assets_output_dir}")
-print("\nGenerated files:")
-print("CSV Files:")
-print(f"  - {os.path.join(data_output_dir, 'sporulation_CV_statistics.csv')}")
-print(f"  - {os.path.join(data_output_dir, 'gene_category_summary_table.csv')}")
-print("Text Files:")
-print(f"  - {os.path.join(data_output_dir, 'individual_gene_summaries.txt')}")
-print(f"  - {os.path.join(data_output_dir, 'Summary_Stats_All_Sporulation_Genes.txt')}")
-print(f"  - {os.path.join(data_output_dir, 'Summary_Stats_Mfd-_Genes.txt')}")
-print(f"  - {os.path.join(data_output_dir, 'Summary_Stats_YB955_Genes.txt')}")
-print(f"  - {os.path.join(data_output_dir, 'Summary_Stats_Common_Genes_Genes.txt')}")
-print(f"  - {os.path.join(data_output_dir, 'Summary_Stats_Partial_Threshold_Genes.txt')}")
-print(f"  - {os.path.join(data_output_dir, 'Summary_Stats_Below_Threshold_Genes.txt')}")
-print("JSON Plot:")
-print(f"  - {os.path.join(assets_output_dir, 'all_sporulation_genes_scatter_plot.json')}")
+    if plot_export in ("json", "both"):
+        with open(filename.replace('.html', '.json'), 'w') as f:
+            json.dump(fig_dict, f)
+
+    if plot_export in ("compact", "both"):
+        write_compact_figure(fig_dict, filename.replace('.html', '.compact.json'), gzip_output=gzip_export)
+
+    return fig_dict
+
+def write_precompressed_variants(paths):
+    """Write gzip (and brotli, if installed) copies of each existing file for app.py to serve as-is"""
+    written = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            content = f.read()
+        with gzip.GzipFile(path + ".gz", 'wb', compresslevel=9, mtime=0) as f:
+            f.write(content)
+        written.append(path + ".gz")
+        if brotli is not None:
+            with open(path + ".br", 'wb') as f:
+                f.write(brotli.compress(content, quality=11))
+            written.append(path + ".br")
+    return written
+
+def load_gene_sets(paths):
+    """Read gene sets from GMT files (GO terms, regulons, ...) and plain gene lists.
+
+    A .gmt line is `name<TAB>description<TAB>gene<TAB>gene...`; the description
+    becomes the plot title unless it is empty or "na". Any other file is a
+    single set named after the file, with genes separated by newlines, commas
+    or whitespace and '#' starting a comment. Returns {name: {"title", "genes"}}.
+    """
+    gene_sets = {}
+
+    def add(name, title, genes):
+        if name in gene_sets:
+            logger.warning(f"Gene set {name} is defined more than once; keeping the last definition")
+        gene_sets[name] = {"title": title or name.replace("_", " "), "genes": list(dict.fromkeys(genes))}
+
+    for path in paths:
+        with open(path, 'r') as f:
+            if path.lower().endswith(".gmt"):
+                for line in f:
+                    fields = [field.strip() for field in line.rstrip("\n").split("\t")]
+                    if len(fields) < 3 or not fields[0]:
+                        continue
+                    title = fields[1] if fields[1].lower() not in ("", "na") else None
+                    add(fields[0], title, [gene for gene in fields[2:] if gene])
+            else:
+                genes = []
+                for line in f:
+                    genes.extend(line.split("#", 1)[0].replace(",", " ").split())
+                add(os.path.splitext(os.path.basename(path))[0], None, genes)
+    return gene_sets
+
+def subset_plot_filename(name):
+    """File name of a gene set's page, e.g. GO:0030435 -> GO_0030435_scatter_plot.html"""
+    safe = "".join(c if c.isascii() and (c.isalnum() or c in "-_") else "_" for c in name)
+    return safe + SUBSET_PLOT_SUFFIX
+
+def digest_column(values):
+    """A customdata column as a fixed-width array (float, else unicode) whose masked bytes can be hashed"""
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        return np.asarray([str(value) for value in values])
+
+class SubsetFigureBase:
+    """The full scatter figure, prepared once for cutting out gene subsets.
+
+    Each category trace's x, y, gene codes and customdata (as rows, and as
+    column arrays for digests) are decoded a single time; select(), digest()
+    and figure() then only mask them. Subset figures keep the full figure's
+    category styling, hover text, threshold lines and layout without going
+    through px.scatter again.
+    """
+
+    def __init__(self, fig_dict):
+        self.layout = fig_dict.get("layout", {})
+        self.gene_codes = {}
+        self.traces = []
+        for trace in fig_dict.get("data", []):
+            customdata = trace.get("customdata")
+            if customdata is None or not len(customdata):
+                continue
+            rows = np.empty(len(customdata), dtype=object)
+            rows[:] = [list(row) for row in customdata]
+            self.traces.append({
+                "style": {key: value for key, value in trace.items() if key not in ("x", "y", "customdata")},
+                "x": decode_typed_array(trace["x"]),
+                "y": decode_typed_array(trace["y"]),
+                "customdata": rows,
+                "columns": [digest_column(column) for column in zip(*customdata)],
+                "genes": np.array([self.gene_codes.setdefault(str(row[0]).lower(), len(self.gene_codes))
+                                   for row in customdata], dtype=np.int64)
+            })
+        # Subset digests include the styling and layout, so restyling the full figure rebuilds every page
+        styles = [trace["style"] for trace in self.traces]
+        self.signature = hashlib.sha256(
+            json.dumps([styles, self.layout], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def select(self, genes):
+        """Return (per-trace point masks, number of genes found) for the given genes, matched case-insensitively"""
+        selected = np.zeros(len(self.gene_codes), dtype=bool)
+        wanted = {gene.lower() for gene in genes}
+        selected[[self.gene_codes[gene] for gene in wanted if gene in self.gene_codes]] = True
+        return [selected[trace["genes"]] for trace in self.traces], int(selected.sum())
+
+    def digest(self, masks, title):
+        """Content digest of the subset figure for masks from select(), without building it"""
+        digest = hashlib.sha256(f"{self.signature}:{title}".encode("utf-8"))
+        for i, (trace, mask) in enumerate(zip(self.traces, masks)):
+            if not mask.any():
+                continue
+            digest.update(f"{i}:{trace['x'].dtype}:{trace['y'].dtype}".encode("utf-8"))
+            for values in [trace["x"], trace["y"]] + trace["columns"]:
+                digest.update(values[mask].tobytes())
+        return digest.hexdigest()
+
+    def figure(self, masks, title):
+        """The subset figure dict for masks from select(); traces without selected points are left out"""
+        data = [
+            dict(trace["style"], x=trace["x"][mask].tolist(), y=trace["y"][mask].tolist(),
+                 customdata=trace["customdata"][mask].tolist())
+            for trace, mask in zip(self.traces, masks) if mask.any()
+        ]
+        layout_title = dict(self.layout.get("title") or {}, text=title)
+        return {"data": data, "layout": dict(self.layout, title=layout_title)}
+
+SUBSET_PAGE_TEMPLATE = """<!doctype html>
+<html>
+<head>
+    <meta charset="utf-8" />
+    <title>{title}</title>
+    {plotly_script}
+    <style>html, body {{height: 100%; margin: 0;}}</style>
+</head>
+<body>
+    {plot}
+</body>
+</html>
+"""
+
+def plotly_cdn_script():
+    """The plotly.js CDN <script> tag for the bundled plotly.js version, with its integrity hash.
+
+    Hashing the bundled plotly.js costs more than rendering a subset page, so
+    this is built once per run rather than by to_html(include_plotlyjs='cdn') for every page.
+    """
+    version = plotly.offline.get_plotlyjs_version()
+    integrity = base64.b64encode(hashlib.sha256(plotly.offline.get_plotlyjs().encode("utf-8")).digest()).decode("ascii")
+    return (f'<script charset="utf-8" src="https://cdn.plot.ly/plotly-{version}.min.js" '
+            f'integrity="sha256-{integrity}" crossorigin="anonymous"></script>')
+
+def write_subset_plot(fig_dict, path, plotly_script):
+    """Write a subset figure as a standalone page loading plotly.js from the CDN, like the full plot"""
+    # The figure is cut from an already validated px figure, so skip plotly's Figure validation
+    plot = pio.to_html(fig_dict, include_plotlyjs=False, full_html=False, validate=False, default_height="100%")
+    page = SUBSET_PAGE_TEMPLATE.format(title=html.escape(fig_dict["layout"]["title"]["text"]),
+                                       plotly_script=plotly_script, plot=plot)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        f.write(page)
+    os.replace(tmp_path, path)
+    return path
+
+def create_subset_plots(fig_dict, gene_sets, plots_dir, workers=1):
+    """Render one scatter plot page per gene set into plots_dir.
+
+    fig_dict is the full figure from create_interactive_plot (or its export).
+    Sets whose subset figure has the same digest as in the last run, and whose
+    page still exists, are skipped; the rest are written on a worker pool.
+    Returns counts of sets, pages written, pages skipped and empty sets.
+    """
+    os.makedirs(plots_dir, exist_ok=True)
+    manifest_path = os.path.join(plots_dir, SUBSET_MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, 'r') as f:
+            saved = json.load(f)
+        digests = saved["plots"] if saved.get("version") == SUBSET_MANIFEST_VERSION else {}
+    except (OSError, ValueError, KeyError):
+        digests = {}
+
+    base = SubsetFigureBase(fig_dict)
+    pending = []
+    counts = {"sets": len(gene_sets), "written": 0, "skipped": 0, "empty": 0}
+    filenames = {}
+    for name, gene_set in gene_sets.items():
+        filename = subset_plot_filename(name)
+        if filename in filenames:
+            logger.warning(f"Gene sets {filenames[filename]} and {name} share the page {filename}; skipping {name}")
+            continue
+        filenames[filename] = name
+
+        masks, n_found = base.select(gene_set["genes"])
+        if n_found == 0:
+            logger.warning(f"Gene set {name}: none of its {len(gene_set['genes'])} genes are in the figure")
+            counts["empty"] += 1
+            continue
+        if n_found < len(gene_set["genes"]):
+            logger.debug(f"Gene set {name}: {len(gene_set['genes']) - n_found} genes not in the figure")
+
+        title = f"{gene_set['title']} (n = {n_found})"
+        path = os.path.join(plots_dir, filename)
+        digest = base.digest(masks, title)
+        if digests.get(filename) == digest and os.path.exists(path):
+            counts["skipped"] += 1
+            continue
+        digests[filename] = digest
+        pending.append((base.figure(masks, title), path))
+
+    figures = [fig for fig, _ in pending]
+    paths = [path for _, path in pending]
+    write = partial(write_subset_plot, plotly_script=plotly_cdn_script() if pending else None)
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(write, figures, paths, chunksize=max(1, len(pending) // (workers * 4))))
+    else:
+        list(map(write, figures, paths))
+    counts["written"] = len(pending)
+
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": SUBSET_MANIFEST_VERSION, "plots": digests}, f)
+    os.replace(tmp_path, manifest_path)
+    return counts
+
+def load_exported_figure(assets_dir):
+    """Load the full figure from the plain or compact export of the last run"""
+    name = "all_sporulation_genes_scatter_plot"
+    for filename in [f"{name}.json", f"{name}.compact.json", f"{name}.compact.json.gz"]:
+        path = os.path.join(assets_dir, filename)
+        if os.path.exists(path):
+            return load_figure(path)
+    raise FileNotFoundError(f"No figure export in {assets_dir}; run the pipeline without --subset-plots-only first")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sporulation analysis pipeline")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS,
+                        help="Worker processes for reading gene CSVs (0 = all CPU cores)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Compute statistics in one chunked pass instead of loading each file whole")
+    parser.add_argument("--render-mode", choices=["auto", "svg", "webgl"], default=RENDER_MODE,
+                        help=f"Plot trace type (auto = webgl above {WEBGL_POINT_THRESHOLD} points)")
+    parser.add_argument("--plot-export", choices=["json", "compact", "both"], default=PLOT_EXPORT,
+                        help="Figure export format(s)")
+    parser.add_argument("--gzip-plot", action="store_true", default=GZIP_PLOT_EXPORT,
+                        help="Gzip the compact figure export")
+    parser.add_argument("--sample-sheet", metavar="PATH",
+                        help="CSV of samples and strain groups to use in place of M1-Y3 (see SampleSheet)")
+    parser.add_argument("--batch-size", type=int, default=GENE_BATCH_SIZE,
+                        help="Gene files per batch in sample-sheet mode")
+    parser.add_argument("--significance", action="store_true",
+                        help="Add bootstrap CIs and permutation p-values for the M vs Y CV and Range differences")
+    parser.add_argument("--resamples", type=int, default=SIGNIFICANCE_RESAMPLES,
+                        help="Bootstrap and permutation resamples per gene")
+    parser.add_argument("--seed", type=int, default=SIGNIFICANCE_SEED,
+                        help="Random seed for the significance resampling")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="Ignore the ingest manifest and recompute every gene")
+    parser.add_argument("--no-tracks", dest="tracks", action="store_false", default=WRITE_TRACKS,
+                        help="Don't write per-position coverage tracks")
+    parser.add_argument("--no-static-search", dest="static_search", action="store_false",
+                        default=WRITE_STATIC_SEARCH,
+                        help="Don't write the static search build for the standalone searchable page")
+    parser.add_argument("--gene-sets", nargs="+", metavar="PATH",
+                        help="GMT files and/or gene list files; one subset plot per set is written to plots/")
+    parser.add_argument("--subset-plots-only", action="store_true",
+                        help="Only render the --gene-sets plots, from the figure exported by the last run")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default=LOG_LEVEL,
+                        help="Logging level (DEBUG also dumps problematic rows)")
+    parser.add_argument("--report", metavar="PATH",
+                        help="Write a JSON run report with per-stage and per-file timings")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Write cProfile stats for the main process to PATH")
+    args = parser.parse_args()
+    if args.subset_plots_only and not args.gene_sets:
+        parser.error("--subset-plots-only needs --gene-sets")
+    if args.streaming and args.sample_sheet:
+        parser.error("--streaming can't be combined with --sample-sheet, which reads genes in batches")
+    return args
+
+def configure_logging(level):
+    logging.basicConfig(level=getattr(logging, level), format="%(message)s", stream=sys.stdout)
+
+def run_subset_plots(args, report, workers, fig_dict=None):
+    """Render the --gene-sets plots from fig_dict, or from the last run's figure export"""
+    with report.stage("subset_plots") as stage:
+        if fig_dict is None:
+            fig_dict = load_exported_figure(assets_output_dir)
+        counts = create_subset_plots(fig_dict, load_gene_sets(args.gene_sets), plots_output_dir, workers=workers)
+        stage.update(counts, rows=counts["written"])
+    logger.info(f"Subset plots for {counts['sets']} gene sets: {counts['written']} written, "
+                f"{counts['skipped']} unchanged, {counts['empty']} without genes in the figure")
+
+def run_pipeline(args, report):
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+
+    if args.subset_plots_only:
+        logger.info(f"Rendering gene-subset plots into {plots_output_dir}...")
+        run_subset_plots(args, report, workers)
+        return
+
+    # Create output directories if they don't exist
+    os.makedirs(data_output_dir, exist_ok=True)
+    os.makedirs(assets_output_dir, exist_ok=True)
+    logger.info(f"Data output directory: {data_output_dir}")
+    logger.info(f"Assets output directory: {assets_output_dir}")
+
+    logger.info("Starting Sporulation Analysis Pipeline...")
+    logger.info("=" * 50)
+
+    # Step 1: Process all CSV files and create combined dataset
+    logger.info("\nStep 1: Processing CSV files and calculating statistics...")
+    manifest_path = os.path.join(data_output_dir, MANIFEST_FILENAME)
+    output_settings = {
+        "cv_threshold": CV_THRESHOLD,
+        "range_threshold": RANGE_THRESHOLD,
+        "render_mode": args.render_mode,
+        "plot_export": args.plot_export,
+        "gzip_plot": args.gzip_plot,
+        "significance": {"resamples": args.resamples, "seed": args.seed} if args.significance else None
+    }
+    sheet = SampleSheet.load(args.sample_sheet) if args.sample_sheet else None
+    report.settings.update(output_settings, workers=workers, streaming=args.streaming,
+                           sample_sheet=sheet.to_dict() if sheet is not None else None)
+    with report.stage("ingest") as stage:
+        tracks_dir = os.path.join(data_output_dir, TRACKS_DIRNAME) if args.tracks else None
+        if sheet is not None:
+            # The manifest caches M1-Y3 statistics, so sample-sheet runs always recompute every gene.
+            # They overwrite the M1-Y3 outputs, so the next M1-Y3 run must not take those as up to date
+            manifest = None
+            if os.path.exists(manifest_path):
+                BuildManifest.load(manifest_path, output_settings).save(complete=False)
+            data_df = process_files_with_sample_sheet(file_path, data_output_dir, sheet, workers=workers,
+                                                      batch_size=args.batch_size, report=report,
+                                                      tracks_dir=tracks_dir)
+        else:
+            if args.full_rebuild:
+                manifest = BuildManifest(manifest_path, output_settings)
+            else:
+                manifest = BuildManifest.load(manifest_path, output_settings)
+            data_df = process_files_with_error_handling(file_path, data_output_dir, workers=workers,
+                                                        streaming=args.streaming, manifest=manifest, report=report,
+                                                        tracks_dir=tracks_dir)
+            # Keep the computed statistics for the next run even if a later step fails
+            manifest.save(complete=False)
+        stage["rows"] = report.rows()
+
+    if data_df.empty:
+        logger.error("No data processed. Exiting.")
+        sys.exit()
+
+    outputs_present = all(os.path.exists(path) for path in [
+        os.path.join(data_output_dir, "sporulation_CV_statistics.csv"),
+        os.path.join(data_output_dir, "gene_category_summary_table.csv"),
+        os.path.join(data_output_dir, COLUMNAR_STATS_DIRNAME),
+        os.path.join(assets_output_dir, "all_sporulation_genes_scatter_plot.html")
+    ] + ([os.path.join(tracks_dir, TRACK_INDEX_FILENAME)] if tracks_dir is not None else [])
+      + ([os.path.join(assets_output_dir, SEARCH_DIRNAME, SEARCH_INDEX_FILENAME)] if args.static_search else []))
+    if manifest is not None and not manifest.changed and outputs_present:
+        manifest.save()
+        logger.info("No input changes since the last run; outputs are up to date.")
+        if args.gene_sets:
+            run_subset_plots(args, report, workers)
+        return
+
+    # Step 2: Apply color coding based on thresholds
+    logger.info("\nStep 2: Applying color coding based on thresholds...")
+    with report.stage("coloring") as stage:
+        if sheet is not None:
+            data_df = process_dataframe_with_sample_sheet(data_df, sheet)
+        else:
+            data_df = process_dataframe_with_colors(data_df)
+        write_columnar_stats(data_df, data_output_dir)
+        stage["rows"] = len(data_df)
+    logger.info(f"Columnar statistics saved to: {os.path.join(data_output_dir, COLUMNAR_STATS_DIRNAME)}")
+
+    if args.significance and sheet is not None and len(sheet.groups) < 2:
+        logger.warning("Skipping significance: the sample sheet has fewer than two groups")
+    elif args.significance:
+        if sheet is not None:
+            first_samples, second_samples = sheet.group_samples(0), sheet.group_samples(1)
+        else:
+            first_samples, second_samples = SAMPLES[:3], SAMPLES[3:]
+        logger.info(f"\nComputing significance of {'/'.join(first_samples)} vs {'/'.join(second_samples)} "
+                    f"differences ({args.resamples} resamples)...")
+        with report.stage("significance") as stage:
+            data_df = add_significance(data_df, first_samples, second_samples, n_resamples=args.resamples,
+                                       seed=args.seed, workers=workers)
+            stage["rows"] = data_df["Gene"].nunique()
+
+    # Save combined statistics
+    with report.stage("save_statistics") as stage:
+        data_df.drop(columns="Color").to_csv(os.path.join(data_output_dir, "sporulation_CV_statistics.csv"),
+                                             index=False)
+        stage["rows"] = len(data_df)
+    logger.info(f"Combined statistics saved to: {os.path.join(data_output_dir, 'sporulation_CV_statistics.csv')}")
+
+    # Step 3: Create gene category summary
+    logger.info("\nStep 3: Creating gene category summary...")
+    with report.stage("category_summary") as stage:
+        gene_colors = create_gene_category_summary(
+            data_df, data_output_dir, priority=sheet.category_priority() if sheet is not None else CATEGORY_PRIORITY
+        )
+        stage["rows"] = len(gene_colors)
+
+    # Step 4: Create summary files by category
+    logger.info("\nStep 4: Creating summary files by category...")
+    with report.stage("summary_files") as stage:
+        category_order = sheet.category_order() if sheet is not None else CATEGORY_ORDER
+        create_summary_files_by_category(data_df, gene_colors, data_output_dir, category_order=category_order)
+        stage["rows"] = len(gene_colors)
+
+    # Step 5: Create interactive plot
+    logger.info("\nStep 5: Creating interactive visualization...")
+    with report.stage("plot_export") as stage:
+        fig_dict = create_interactive_plot(
+            data_df, 
+            "All Sporulation-Affected Genes", 
+            os.path.join(assets_output_dir, "all_sporulation_genes_scatter_plot.html"),
+            render_mode=args.render_mode,
+            plot_export=args.plot_export,
+            gzip_export=args.gzip_plot,
+            group_labels=sheet.group_labels() if sheet is not None else None
+        )
+        stage["rows"] = len(data_df)
+    logger.info("All sporulation-affected genes plot saved")
+
+    # Step 6: Static search build for the standalone searchable page
+    if args.static_search:
+        logger.info("\nStep 6: Building the static search index...")
+        with report.stage("static_search") as stage:
+            search_stats = write_static_search(fig_dict, assets_output_dir)
+            stage["rows"] = search_stats["genes"]
+        logger.info(f"Search index: {search_stats['genes']} genes in {search_stats['shards']} shards, "
+                    f"{search_stats['base_bytes'] / 1024:.0f} KB base figure, "
+                    f"{search_stats['index_bytes'] / 1024:.0f} KB index")
+
+    # Step 7: One plot per gene set, cut from the full figure
+    if args.gene_sets:
+        logger.info("\nStep 7: Creating gene-subset plots...")
+        run_subset_plots(args, report, workers, fig_dict=fig_dict)
+
+    # Step 8: Precompress the files served by the dashboard
+    logger.info("\nStep 8: Precompressing served data files...")
+    with report.stage("precompress") as stage:
+        compressed = write_precompressed_variants(
+            [os.path.join(data_output_dir, filename) for filename in SERVED_DATA_FILES]
+        )
+        stage["rows"] = len(compressed)
+    logger.info(f"Wrote {len(compressed)} precompressed files")
+
+    # Every output now matches the manifest
+    if manifest is not None:
+        manifest.save()
+
+    # Final summary
+    logger.info(f"\nAnalysis complete! Outputs saved to:")
+    logger.info(f"Data: {data_output_dir}")
+    logger.info(f"Assets: {assets_output_dir}")
+    logger.info("\nGenerated files:")
+    logger.info("CSV Files:")
+    logger.info(f"  - {os.path.join(data_output_dir, 'sporulation_CV_statistics.csv')}")
+    logger.info(f"  - {os.path.join(data_output_dir, 'gene_category_summary_table.csv')}")
+    logger.info("Columnar Statistics:")
+    logger.info(f"  - {os.path.join(data_output_dir, COLUMNAR_STATS_DIRNAME)}")
+    if args.tracks:
+        logger.info("Coverage Tracks:")
+        logger.info(f"  - {os.path.join(data_output_dir, TRACKS_DIRNAME)}")
+    logger.info("Text Files:")
+    logger.info(f"  - {os.path.join(data_output_dir, 'individual_gene_summaries.txt')}")
+    for category in ["All Sporulation"] + category_order:
+        logger.info(f"  - {os.path.join(data_output_dir, summary_filename(category))}")
+    logger.info("JSON Plot:")
+    if args.plot_export in ("json", "both"):
+        logger.info(f"  - {os.path.join(assets_output_dir, 'all_sporulation_genes_scatter_plot.json')}")
+    if args.plot_export in ("compact", "both"):
+        compact_name = "all_sporulation_genes_scatter_plot.compact.json" + (".gz" if args.gzip_plot else "")
+        logger.info(f"  - {os.path.join(assets_output_dir, compact_name)}")
+    if args.static_search:
+        logger.info("Static Search Build:")
+        logger.info(f"  - {os.path.join(assets_output_dir, SEARCH_DIRNAME)}")
+    if args.gene_sets:
+        logger.info("Subset Plots:")
+        logger.info(f"  - {plots_output_dir}")
+
+def main():
+    args = parse_args()
+    configure_logging(args.log_level)
+    report = RunReport()
+
+    profiler = cProfile.Profile() if args.profile else None
+    try:
+        if profiler is not None:
+            profiler.runcall(run_pipeline, args, report)
+        else:
+            run_pipeline(args, report)
+    finally:
+        if profiler is not None:
+            # Load with pstats, snakeviz, or flameprof/gprof2dot for a flamegraph
+            profiler.dump_stats(args.profile)
+            logger.info(f"Profile written to: {args.profile}")
+        if args.report:
+            report.write(args.report)
+            logger.info(f"Run report written to: {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""Production entry point for the dashboard: load everything once, then fork workers.
+
+The master process imports app.py, which loads the snapshot (figure, search
+and gene indexes, threshold model, track index). It then runs Dash's
+first-request setup and freezes the garbage collector before forking the
+workers. The workers inherit all of that copy-on-write instead of each
+importing and loading it again:
+
+    python serve.py --workers 4 --port 5000
+
+Workers are run by gunicorn (with preload_app) when it is installed, otherwise
+by a built-in pre-fork supervisor around werkzeug's threaded server. Once a
+worker answers /healthz, a JSON "startup" log line reports import, load and
+time-to-first-request, plus the RSS, PSS and private memory of every process.
+
+Data reloads happen in the master too: it watches the pipeline outputs like
+app.py does (DATA_RELOAD_INTERVAL), reloads them itself and replaces the
+workers, so they keep sharing one copy. SIGHUP does the same on demand.
+SIGTERM and SIGINT stop the server.
+"""
+import time
+
+START_TIME = time.perf_counter()
+
+import argparse
+import gc
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import urllib.request
+
+try:
+    import gunicorn.app.base  # Optional: preferred worker manager when installed
+except ImportError:
+    gunicorn = None
+
+logger = logging.getLogger("sporulation.serve")
+
+# Seconds to wait for the first /healthz answer before giving up on the startup report
+FIRST_REQUEST_TIMEOUT = 60
+
+# Seconds a worker gets to finish in-flight requests after SIGTERM
+GRACEFUL_TIMEOUT = 10
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve the sporulation dashboard with preloaded, forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes (0 = one per CPU core)")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker (gunicorn gthread workers)")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "builtin"], default="auto",
+                        help="Worker manager (auto = gunicorn if installed)")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        default=os.environ.get("LOG_LEVEL", "INFO"))
+    return parser.parse_args()
+
+def memory_mb(pid):
+    """RSS, PSS and private (unshared) memory of a process in MB from /proc, or None where unavailable.
+
+    PSS splits each shared page between the processes mapping it, so unlike
+    RSS it shows how much memory the workers actually add up to.
+    """
+    fields = {"Rss": "rss_mb", "Pss": "pss_mb", "Private_Clean": "private_mb", "Private_Dirty": "private_mb"}
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    key = fields[name]
+                    usage[key] = usage.get(key, 0) + int(value.split()[0]) / 1024
+    except (OSError, ValueError):
+        return None
+    return {key: round(value, 1) for key, value in usage.items()}
+
+def child_pids():
+    """PIDs of this process's children (Linux only; empty elsewhere)"""
+    pids = []
+    try:
+        for task in os.listdir("/proc/self/task"):
+            with open(f"/proc/self/task/{task}/children", 'r') as f:
+                pids.extend(int(pid) for pid in f.read().split())
+    except OSError:
+        pass
+    return sorted(set(pids))
+
+def wait_for_first_request(url, timeout=FIRST_REQUEST_TIMEOUT):
+    """Poll url until it answers; return the worker's /healthz JSON, or None on timeout"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                return json.load(response)
+        except OSError:
+            time.sleep(0.01)
+    return None
+
+def report_startup(host, port, timings):
+    """Log the startup timings and memory use once a worker has answered its first request"""
+    connect_host = "127.0.0.1" if host in ("0.0.0.0", "") else ("::1" if host == "::" else host)
+    health = wait_for_first_request(f"http://{connect_host}:{port}/healthz")
+    if health is None:
+        logger.error("No worker answered /healthz within %ss", FIRST_REQUEST_TIMEOUT)
+        return
+    timings["first_request_s"] = round(time.perf_counter() - START_TIME, 3)
+    # Give the remaining workers a moment to finish starting before sampling them
+    time.sleep(0.5)
+    logger.info(json.dumps({
+        "event": "startup",
+        **timings,
+        "data_version": health.get("version"),
+        "master": memory_mb(os.getpid()),
+        "workers": {pid: memory_mb(pid) for pid in child_pids()}
+    }))
+
+def load_dashboard():
+    """Import app.py (loading the snapshot) and do the per-process setup the workers would otherwise repeat"""
+    timings = {}
+    import_start = time.perf_counter()
+    import app as dashboard
+    timings["import_load_s"] = round(time.perf_counter() - import_start, 3)
+
+    # Dash validates the layout and builds its script/CSS tags on the first request; do it once here
+    setup_start = time.perf_counter()
+    with dashboard.app.server.test_request_context():
+        dashboard.app._setup_server()
+    timings["dash_setup_s"] = round(time.perf_counter() - setup_start, 3)
+    return dashboard, timings
+
+def freeze_shared_state():
+    """Move everything allocated so far out of the GC's reach, so collections in workers don't dirty shared pages"""
+    gc.collect()
+    gc.freeze()
+
+_failed_signature = None
+
+def reload_data(dashboard):
+    """Reload the snapshot in the master if its sources changed; False if that reload failed"""
+    global _failed_signature
+    signature = dashboard.source_signature(dashboard.SNAPSHOT_SOURCES)
+    if signature == dashboard.snapshot["signature"]:
+        return True
+    if signature == _failed_signature or not dashboard.reload_snapshot():
+        _failed_signature = signature
+        return False
+    freeze_shared_state()
+    return True
+
+def start_master_watcher(dashboard):
+    """Watch the data sources from the master instead of from every worker.
+
+    A change is reloaded here and then SIGHUP makes the server fork fresh
+    workers from the new state.
+    """
+    interval = dashboard.DATA_RELOAD_INTERVAL
+    dashboard.DATA_RELOAD_INTERVAL = 0
+    if interval <= 0:
+        return None
+
+    def reload():
+        if not reload_data(dashboard):
+            return False
+        os.kill(os.getpid(), signal.SIGHUP)
+        return True
+
+    return dashboard.SnapshotWatcher(interval, reload=reload).start()
+
+class PreforkServer:
+    """Fork worker processes that serve app.py from one listening socket.
+
+    The master binds the socket and never serves requests itself. It restarts
+    workers that die, replaces them all after reloading the data on SIGHUP,
+    and stops them on SIGTERM/SIGINT.
+    """
+
+    def __init__(self, dashboard, host, port, workers):
+        self.dashboard = dashboard
+        self.host = host
+        self.port = port
+        self.n_workers = workers
+        self.workers = set()
+        self.stopping = False
+        self.reload_requested = False
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        self.socket = socket.create_server((host, port), family=family, backlog=2048)
+        self.socket.set_inheritable(True)
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self.run_worker()
+        self.workers.add(pid)
+        return pid
+
+    def run_worker(self):
+        from werkzeug.serving import make_server
+
+        # The master handles Ctrl-C for the whole process group
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        status = 0
+        try:
+            server = make_server(self.host, self.port, self.dashboard.app.server, threaded=True,
+                                 fd=self.socket.fileno())
+            # shutdown() waits for serve_forever() to return, so it has to run on another thread
+            signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+            server.serve_forever()
+        except BaseException:
+            logger.exception("Worker %s failed", os.getpid())
+            status = 1
+        finally:
+            os._exit(status)
+
+    def stop_workers(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    remaining.discard(pid)
+            time.sleep(0.05)
+        for pid in remaining:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.workers -= set(pids)
+
+    def reload(self):
+        """Reload the data in the master if needed, then replace every worker with one forked from it"""
+        if not reload_data(self.dashboard):
+            logger.error("Reload failed; keeping the current workers")
+            return
+        old_workers = set(self.workers)
+        for _ in range(self.n_workers):
+            self.spawn()
+        self.stop_workers(old_workers)
+
+    def run(self):
+        def request_stop(*_):
+            self.stopping = True
+
+        def request_reload(*_):
+            self.reload_requested = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGHUP, request_reload)
+        for _ in range(self.n_workers):
+            self.spawn()
+
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid in self.workers:
+                self.workers.discard(pid)
+                logger.warning("Worker %s exited with status %s; starting a new one", pid, status)
+                self.spawn()
+                time.sleep(0.5)  # Don't spin if workers keep failing at startup
+            elif not pid:
+                time.sleep(0.1)
+
+        self.stop_workers(set(self.workers))
+        self.socket.close()
+
+def run_gunicorn(dashboard, args, workers):
+    class DashboardApplication(gunicorn.app.base.BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": f"[{args.host}]:{args.port}" if ":" in args.host else f"{args.host}:{args.port}",
+                "workers": workers,
+                "worker_class": "gthread",
+                "threads": args.threads,
+                "preload_app": True,
+                "graceful_timeout": GRACEFUL_TIMEOUT,
+                "loglevel": args.log_level.lower(),
+                # SIGHUP: reload the data in the master before gunicorn forks the replacement workers
+                "on_reload": lambda arbiter: reload_data(dashboard)
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return dashboard.app.server
+
+    DashboardApplication().run()
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level), format="%(message)s")
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork(); run app.py directly on this platform")
+    if args.server == "gunicorn" and gunicorn is None:
+        sys.exit("gunicorn is not installed")
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+
+    dashboard, timings = load_dashboard()
+    timings["server"] = "gunicorn" if args.server != "builtin" and gunicorn is not None else "builtin"
+    timings["worker_count"] = workers
+    start_master_watcher(dashboard)
+    freeze_shared_state()
+    timings["ready_to_fork_s"] = round(time.perf_counter() - START_TIME, 3)
+
+    threading.Thread(target=report_startup, args=(args.host, args.port, timings), daemon=True).start()
+    if timings["server"] == "gunicorn":
+        run_gunicorn(dashboard, args, workers)
+    else:
+        PreforkServer(dashboard, args.host, args.port, workers).run()
+
+if __name__ == "__main__":
+    main()
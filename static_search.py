@@ -0,0 +1,148 @@
+import hashlib
+import json
+import math
+import os
+from compact_figure import compact_figure
+from directory_swap import replacing_directory
+
+# Static search build for the standalone page (all_sporulation_genes_scatter_plot_searchable.html),
+# written by script.py into assets/search/:
+#   base.json          compact figure (see compact_figure.py) whose customdata is only the gene name;
+#                      enough to draw every point and show gene, CV and Range on hover. Its "version"
+#                      is the build's, which the page requests index.json with and expects back
+#   index.json         the build version, gene names sorted case-insensitively, each gene's shard, every trace's full
+#                      hovertemplate and an n-gram index: each substring of up to SEARCH_GRAM_LENGTH
+#                      characters of a lowercase gene name -> ascending ids of the genes containing it
+#   shards/<key>.json  for the genes whose lowercase name starts with <key>: their points as
+#                      [trace, position] pairs into base.json and the matching full customdata rows.
+#                      Keys are the shortest prefixes that keep a shard at SEARCH_SHARD_GENES genes or
+#                      fewer, so even names sharing a long common prefix spread over small shards
+# The page paints base.json alone, loads index.json on the first search and then only the shards
+# holding matched genes. Terms up to SEARCH_GRAM_LENGTH characters are a single lookup; longer terms
+# intersect the postings of their n-grams and confirm the few candidates left.
+
+SEARCH_FORMAT = "sporulation-search-1"
+SEARCH_DIRNAME = "search"
+SEARCH_BASE_FILENAME = "base.json"
+SEARCH_INDEX_FILENAME = "index.json"
+SEARCH_SHARDS_DIRNAME = "shards"
+
+SEARCH_GRAM_LENGTH = 3
+SEARCH_SHARD_GENES = 32
+
+# Hover text of the base figure after the gene line; the rest of the details live in the shards
+BASE_HOVER_SUFFIX = "<br><b>CV:</b> %{x:.3f}<br><b>Range:</b> %{y:.0f}<extra></extra>"
+
+def shard_key(gene, prefix):
+    """The first `prefix` characters of the lowercase gene name, made file-name safe"""
+    key = "".join(c if c.isascii() and c.isalnum() else "_" for c in gene.lower()[:prefix])
+    return key or "_"
+
+def plan_shards(genes, max_genes=SEARCH_SHARD_GENES, prefix=1):
+    """Map each gene to its shard key, lengthening the prefix of any shard over max_genes genes"""
+    groups = {}
+    for gene in genes:
+        groups.setdefault(shard_key(gene, prefix), []).append(gene)
+    shards = {}
+    for key, members in groups.items():
+        if len(members) > max_genes and any(len(gene) > prefix for gene in members):
+            shards.update(plan_shards(members, max_genes, prefix + 1))
+        else:
+            shards.update(dict.fromkeys(members, key))
+    return shards
+
+def gene_grams(gene, length=SEARCH_GRAM_LENGTH):
+    """Every distinct substring of the lowercase gene name of up to `length` characters"""
+    gene = gene.lower()
+    return {gene[start:start + n] for n in range(1, length + 1) for start in range(len(gene) - n + 1)}
+
+def json_row(row):
+    """A customdata row with non-finite floats as null, since JSON.parse rejects NaN"""
+    return [None if isinstance(value, float) and not math.isfinite(value) else value for value in row]
+
+def split_figure(fig_dict):
+    """Split a figure dict into the base figure and per-gene point details.
+
+    Returns (base, details, hovertemplates): details maps each gene to its
+    {"points": [[trace, position], ...], "customdata": [...]} and hovertemplates
+    holds every trace's original hovertemplate.
+    """
+    data = []
+    details = {}
+    hovertemplates = []
+    for t, trace in enumerate(fig_dict.get("data", [])):
+        customdata = trace.get("customdata")
+        hovertemplate = trace.get("hovertemplate")
+        hovertemplates.append(hovertemplate)
+        if customdata is None or not len(customdata):
+            data.append(trace)
+            continue
+        for position, row in enumerate(customdata):
+            entry = details.setdefault(str(row[0]), {"points": [], "customdata": []})
+            entry["points"].append([t, position])
+            entry["customdata"].append(json_row(row))
+        gene_line = (hovertemplate or "%{customdata[0]}").split("<br>")[0]
+        data.append(dict(trace, customdata=[[str(row[0])] for row in customdata],
+                         hovertemplate=gene_line + BASE_HOVER_SUFFIX))
+    return dict(fig_dict, data=data), details, hovertemplates
+
+def dump_json(value):
+    return json.dumps(value, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+def write_static_search(fig_dict, assets_dir):
+    """Write the static search build for a figure dict into assets_dir/search and return its stats.
+
+    The build is written beside the target and swapped in, so shards of genes
+    that are gone don't linger and a page never mixes files from two builds.
+    """
+    base, details, hovertemplates = split_figure(fig_dict)
+    genes = sorted(details, key=lambda gene: (gene.lower(), gene))
+    gene_keys = plan_shards(genes)
+    shard_names = sorted(set(gene_keys.values()))
+    shard_ids = {name: i for i, name in enumerate(shard_names)}
+    gene_shard = [shard_ids[gene_keys[gene]] for gene in genes]
+
+    grams = {}
+    for gene_id, gene in enumerate(genes):
+        for gram in gene_grams(gene):
+            grams.setdefault(gram, []).append(gene_id)
+
+    shards = {name: {} for name in shard_names}
+    for gene, shard_id in zip(genes, gene_shard):
+        shards[shard_names[shard_id]][gene] = details[gene]
+    payloads = {os.path.join(SEARCH_SHARDS_DIRNAME, f"{name}.json"): dump_json({"genes": shard})
+                for name, shard in shards.items()}
+    base_figure = compact_figure(base)
+    payloads[SEARCH_BASE_FILENAME] = dump_json(base_figure)
+
+    # index.json and shard URLs carry the version, so browsers never combine files from two builds
+    digest = hashlib.sha1()
+    for name in sorted(payloads):
+        digest.update(name.encode("utf-8"))
+        digest.update(payloads[name])
+    version = digest.hexdigest()[:16]
+    payloads[SEARCH_BASE_FILENAME] = dump_json(dict(base_figure, version=version))
+    payloads[SEARCH_INDEX_FILENAME] = dump_json({
+        "format": SEARCH_FORMAT,
+        "version": version,
+        "gram_length": SEARCH_GRAM_LENGTH,
+        "genes": genes,
+        "shards": shard_names,
+        "gene_shard": gene_shard,
+        "hovertemplates": hovertemplates,
+        "grams": dict(sorted(grams.items()))
+    })
+
+    with replacing_directory(os.path.join(assets_dir, SEARCH_DIRNAME)) as tmp_dir:
+        os.makedirs(os.path.join(tmp_dir, SEARCH_SHARDS_DIRNAME))
+        for name, payload in payloads.items():
+            with open(os.path.join(tmp_dir, name), 'wb') as f:
+                f.write(payload)
+
+    return {
+        "genes": len(genes),
+        "shards": len(shard_names),
+        "base_bytes": len(payloads[SEARCH_BASE_FILENAME]),
+        "index_bytes": len(payloads[SEARCH_INDEX_FILENAME]),
+        "total_bytes": sum(len(payload) for payload in payloads.values())
+    }
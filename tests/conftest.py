@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+# The pipeline and dashboard are top-level modules in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+import script
+
+class Pipeline:
+    """script.py's run_pipeline pointed at a synthetic gene panel and output directories under root"""
+
+    def __init__(self, root, monkeypatch, n_genes=12, positions=120):
+        self.input_dir = os.path.join(root, "input")
+        self.output_dir = os.path.join(root, "output")
+        self.data_dir = os.path.join(self.output_dir, "data")
+        self.assets_dir = os.path.join(self.output_dir, "assets")
+        benchmark.generate_panel(self.input_dir, n_genes, positions)
+        monkeypatch.setattr(script, "file_path", os.path.join(self.input_dir, "*.csv"))
+        monkeypatch.setattr(script, "data_output_dir", self.data_dir)
+        monkeypatch.setattr(script, "assets_output_dir", self.assets_dir)
+        monkeypatch.setattr(script, "plots_output_dir", os.path.join(self.output_dir, "plots"))
+        self.monkeypatch = monkeypatch
+
+    def run(self, *argv):
+        """Run the pipeline with command-line arguments argv and return its RunReport"""
+        self.monkeypatch.setattr(sys, "argv", ["script.py", *argv])
+        report = script.RunReport()
+        script.run_pipeline(script.parse_args(), report)
+        return report
+
+    def input_file(self, gene):
+        return os.path.join(self.input_dir, f"{gene}.csv")
+
+    def read_data(self, filename):
+        with open(os.path.join(self.data_dir, filename), 'rb') as f:
+            return f.read()
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    return Pipeline(str(tmp_path), monkeypatch)
+
+@pytest.fixture
+def app_client(tmp_path, monkeypatch):
+    """A logged-in Flask test client for app.py, run from an empty working directory under tmp_path"""
+    import base64
+    monkeypatch.chdir(tmp_path)
+    import app
+    monkeypatch.setattr(app, "DATA_RELOAD_INTERVAL", 0)
+
+    credentials = base64.b64encode(b"guest:Support bacteria, we need more culture!").decode()
+    client = app.app.server.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Basic {credentials}"
+    return client
@@ -0,0 +1,81 @@
+"""/api/genes: filters, pagination and error responses"""
+import numpy as np
+import pytest
+
+SAMPLES = ["M1", "M2", "M3", "Y1", "Y2", "Y3"]
+
+def gene_columns(n_genes):
+    """Per-row statistics for n_genes genes; gene i has maximum CV i/100 and maximum Range 100*i"""
+    genes = [f"gene{i:03d}" for i in range(n_genes)]
+    columns = {name: [] for name in ["Gene", "Sample", "Mean", "SD", "CV", "Range"]}
+    for i, gene in enumerate(genes):
+        for j, sample in enumerate(SAMPLES):
+            columns["Gene"].append(gene)
+            columns["Sample"].append(sample)
+            columns["Mean"].append(1000.0)
+            columns["SD"].append(10.0 * i)
+            columns["CV"].append(i / 100 * (j + 1) / len(SAMPLES))
+            columns["Range"].append(100.0 * i * (j + 1) / len(SAMPLES))
+    return {name: np.array(values) for name, values in columns.items()}
+
+@pytest.fixture
+def client(app_client, monkeypatch):
+    import app
+    categories = {f"gene{i:03d}": "Mfd-" if i % 3 == 0 else "Below Threshold" for i in range(25)}
+    gene_index = app.build_gene_index(gene_columns(25), categories)
+    monkeypatch.setattr(app, "snapshot", dict(app.snapshot, gene_index=gene_index))
+    return app_client
+
+def gene_names(response):
+    return [gene["gene"] for gene in response.get_json()["genes"]]
+
+def test_all_genes(client):
+    body = client.get("/api/genes").get_json()
+    assert body["total"] == 25
+    assert body["next_offset"] is None
+    assert body["genes"][4] == {"gene": "gene004", "category": "Below Threshold", "max_cv": 0.04,
+                                "max_range": 400.0}
+
+def test_category_filter(client):
+    assert gene_names(client.get("/api/genes?category=mfd-")) == [f"gene{i:03d}" for i in range(0, 25, 3)]
+    assert client.get("/api/genes?category=unknown").get_json()["total"] == 0
+
+def test_threshold_filters(client):
+    assert gene_names(client.get("/api/genes?cv_min=0.2")) == [f"gene{i:03d}" for i in range(20, 25)]
+    assert gene_names(client.get("/api/genes?range_min=2200")) == ["gene022", "gene023", "gene024"]
+    assert gene_names(client.get("/api/genes?cv_min=0.1&range_min=1500&category=Mfd-")) == ["gene015", "gene018",
+                                                                                          "gene021", "gene024"]
+
+def test_pagination(client):
+    first = client.get("/api/genes?limit=10").get_json()
+    assert (first["offset"], first["limit"], first["next_offset"]) == (0, 10, 10)
+    last = client.get("/api/genes?limit=10&offset=20").get_json()
+    assert [gene["gene"] for gene in last["genes"]] == [f"gene{i:03d}" for i in range(20, 25)]
+    assert last["next_offset"] is None
+    beyond = client.get("/api/genes?offset=100").get_json()
+    assert (beyond["total"], beyond["genes"]) == (25, [])
+
+def test_limit_bounds(client):
+    import app
+    assert client.get(f"/api/genes?limit={app.API_MAX_LIMIT}").status_code == 200
+    for query in ["limit=0", f"limit={app.API_MAX_LIMIT + 1}", "offset=-1"]:
+        response = client.get(f"/api/genes?{query}")
+        assert response.status_code == 400
+        assert "limit must be" in response.get_json()["error"]
+
+@pytest.mark.parametrize("query", ["cv_min=high", "range_min=1e", "limit=ten", "offset=1.5"])
+def test_bad_parameters(client, query):
+    response = client.get(f"/api/genes?{query}")
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Invalid query parameter")
+
+def test_single_gene(client):
+    body = client.get("/api/genes/GENE007").get_json()
+    assert body["gene"] == "gene007"
+    assert [sample["Sample"] for sample in body["samples"]] == SAMPLES
+    assert client.get("/api/genes/nope").status_code == 404
+
+def test_unavailable(client, monkeypatch):
+    import app
+    monkeypatch.setattr(app, "snapshot", dict(app.snapshot, gene_index=None))
+    assert client.get("/api/genes").status_code == 503
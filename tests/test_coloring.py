@@ -0,0 +1,90 @@
+"""process_dataframe_with_colors must color rows as the original row-by-row implementation did"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import script
+
+def reference_colors(df):
+    """The original iloc implementation, kept as the reference"""
+    df["Color"] = "gray"
+
+    i = 0
+    while i < len(df):
+        gene = df.iloc[i]["Gene"]
+        m_samples = df.iloc[i:i+3]
+        y_samples = df.iloc[i+3:i+6]
+
+        meets_threshold_m = (m_samples["Range"] >= script.RANGE_THRESHOLD) | (m_samples["CV"] >= script.CV_THRESHOLD)
+        meets_threshold_y = (y_samples["Range"] >= script.RANGE_THRESHOLD) | (y_samples["CV"] >= script.CV_THRESHOLD)
+
+        if len(m_samples) == 3 and set(m_samples["Sample"]) == {"M1", "M2", "M3"}:
+            if meets_threshold_m.all():
+                df.loc[(df["Gene"] == gene) & (df["Sample"].isin(["M1", "M2", "M3"])), "Color"] = "red"
+            elif meets_threshold_m.any():
+                df.loc[(df["Gene"] == gene) & (df["Sample"].isin(["M1", "M2", "M3"])), "Color"] = "black"
+
+        if len(y_samples) == 3 and set(y_samples["Sample"]) == {"Y1", "Y2", "Y3"}:
+            if meets_threshold_y.all():
+                df.loc[(df["Gene"] == gene) & (df["Sample"].isin(["Y1", "Y2", "Y3"])), "Color"] = "blue"
+            elif meets_threshold_y.any():
+                df.loc[(df["Gene"] == gene) & (df["Sample"].isin(["Y1", "Y2", "Y3"])), "Color"] = "black"
+
+        if (len(m_samples) == 3 and meets_threshold_m.all() and
+            len(y_samples) == 3 and meets_threshold_y.all()):
+            df.loc[df["Gene"] == gene, "Color"] = "green"
+
+        i += 6
+
+    return df
+
+def random_frame(rng, n_genes):
+    """Stats rows for n_genes genes, with missing, shuffled, extra and duplicated sample rows"""
+    rows = []
+    for g in range(n_genes):
+        samples = list(script.SAMPLES)
+        layout = rng.integers(6)
+        if layout == 1:
+            del samples[rng.integers(len(samples))]
+        elif layout == 2:
+            rng.shuffle(samples)
+        elif layout == 3:
+            samples.insert(rng.integers(len(samples) + 1), "Z1")
+        elif layout == 4:
+            samples.insert(rng.integers(len(samples) + 1), samples[rng.integers(len(samples))])
+        # Genes are sometimes split or repeated, so a later block for a gene overrides an earlier one
+        gene = f"gene{rng.integers(n_genes) if rng.random() < 0.1 else g}"
+        for sample in samples:
+            rows.append({
+                "Gene": gene,
+                "Sample": sample,
+                "Mean": rng.uniform(100, 5000),
+                "SD": rng.uniform(1, 500),
+                "CV": np.nan if rng.random() < 0.05 else rng.uniform(0, 2 * script.CV_THRESHOLD),
+                "Range": np.nan if rng.random() < 0.05 else rng.uniform(0, 2 * script.RANGE_THRESHOLD)
+            })
+    return pd.DataFrame(rows)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_reference(seed):
+    df = random_frame(np.random.default_rng(seed), 40)
+    expected = reference_colors(df.copy())["Color"]
+    actual = script.process_dataframe_with_colors(df.copy())["Color"]
+    pd.testing.assert_series_equal(actual, expected)
+
+def test_complete_genes():
+    rng = np.random.default_rng(100)
+    df = pd.DataFrame({
+        "Gene": np.repeat([f"gene{g}" for g in range(200)], 6),
+        "Sample": script.SAMPLES * 200,
+        "CV": rng.uniform(0, 2 * script.CV_THRESHOLD, 1200),
+        "Range": rng.integers(0, 2 * script.RANGE_THRESHOLD, 1200)
+    })
+    expected = reference_colors(df.copy())["Color"]
+    actual = script.process_dataframe_with_colors(df.copy())["Color"]
+    pd.testing.assert_series_equal(actual, expected)
+    assert set(actual) == {"gray", "black", "red", "blue", "green"}
+
+def test_empty_frame():
+    df = pd.DataFrame({"Gene": [], "Sample": [], "CV": [], "Range": []})
+    assert script.process_dataframe_with_colors(df)["Color"].empty
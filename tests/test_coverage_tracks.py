@@ -0,0 +1,49 @@
+"""Coverage track files and the windows served by /api/tracks"""
+import numpy as np
+import pytest
+
+from coverage_tracks import TRACK_BASE_BIN, track_levels, track_window, write_gene_track, write_track_index
+
+SAMPLES = ["M1", "M2", "M3", "Y1", "Y2", "Y3"]
+
+def write_tracks(directory, genes):
+    """Write a track per {gene: rows x samples array} and the index; return the index dict"""
+    for gene, values in genes.items():
+        write_gene_track(str(directory), gene, values)
+    write_track_index(str(directory), {gene: len(values) for gene, values in genes.items()}, SAMPLES)
+    return {"samples": SAMPLES, "genes": {gene: len(values) for gene, values in genes.items()}}
+
+@pytest.mark.parametrize("rows", [1, 5, TRACK_BASE_BIN])
+def test_tiny_gene_without_tiles(tmp_path, rows):
+    values = np.arange(rows * len(SAMPLES), dtype=float).reshape(rows, len(SAMPLES))
+    index = write_tracks(tmp_path, {"tiny": values})
+    assert track_levels(rows) == []
+
+    window = track_window(str(tmp_path), index, "tiny", max_points=1)
+    assert window["bin_size"] == 1
+    assert window["x"] == list(range(rows))
+    assert window["samples"]["Y1"]["mean"] == values[:, 3].tolist()
+
+def test_tiled_window(tmp_path):
+    rng = np.random.default_rng(0)
+    values = rng.uniform(0, 1000, (5000, len(SAMPLES))).round()
+    values[17, 2] = np.nan
+    index = write_tracks(tmp_path, {"long": values})
+
+    raw = track_window(str(tmp_path), index, "long", 100, 300, max_points=500)
+    assert raw["bin_size"] == 1
+    assert raw["samples"]["M1"]["mean"] == values[100:300, 0].tolist()
+
+    window = track_window(str(tmp_path), index, "long", max_points=100)
+    bin_size = window["bin_size"]
+    assert bin_size > 1 and len(window["x"]) <= 100
+    for i, sample in enumerate(SAMPLES):
+        column = values[:, i]
+        bins = [column[start:start + bin_size] for start in window["x"]]
+        assert window["samples"][sample]["min"] == pytest.approx([np.nanmin(b) for b in bins], abs=1e-3)
+        assert window["samples"][sample]["max"] == pytest.approx([np.nanmax(b) for b in bins], abs=1e-3)
+        assert window["samples"][sample]["mean"] == pytest.approx([np.nanmean(b) for b in bins], abs=1e-3)
+
+def test_unknown_gene(tmp_path):
+    index = write_tracks(tmp_path, {"tiny": np.zeros((3, len(SAMPLES)))})
+    assert track_window(str(tmp_path), index, "missing") is None
@@ -0,0 +1,61 @@
+"""/data/<filename>: precompressed variants, ETags, conditional and range requests"""
+import gzip
+import os
+
+import pytest
+
+CONTENT = b"Gene,Sample,Mean\n" + b"".join(b"gene%05d,M1,%d\n" % (i, i * 7) for i in range(500))
+
+@pytest.fixture
+def client(app_client, tmp_path):
+    data_dir = tmp_path / "data"
+    os.makedirs(data_dir / "coverage_tracks")
+    os.makedirs(data_dir / "sporulation_CV_statistics_columns")
+    path = data_dir / "sporulation_CV_statistics.csv"
+    path.write_bytes(CONTENT)
+    with gzip.open(str(path) + ".gz", 'wb') as f:
+        f.write(CONTENT)
+    st = os.stat(path)
+    os.utime(str(path) + ".gz", ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    return app_client
+
+def test_identity(client):
+    response = client.get("/data/sporulation_CV_statistics.csv")
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+def test_gzip_variant(client):
+    response = client.get("/data/sporulation_CV_statistics.csv", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == CONTENT
+
+def test_not_modified(client):
+    etag = client.get("/data/sporulation_CV_statistics.csv").headers["ETag"]
+    response = client.get("/data/sporulation_CV_statistics.csv", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    gzip_etag = client.get("/data/sporulation_CV_statistics.csv", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    assert gzip_etag != etag
+    response = client.get("/data/sporulation_CV_statistics.csv",
+                          headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag})
+    assert response.status_code == 304
+
+def test_range(client):
+    response = client.get("/data/sporulation_CV_statistics.csv",
+                          headers={"Range": "bytes=10-99", "Accept-Encoding": "gzip"})
+    assert response.status_code == 206
+    assert response.data == CONTENT[10:100]
+    assert "Content-Encoding" not in response.headers
+
+def test_versioned_link_is_immutable(client):
+    etag = client.get("/data/sporulation_CV_statistics.csv").headers["ETag"].strip('"')
+    response = client.get(f"/data/sporulation_CV_statistics.csv?v={etag}")
+    assert "immutable" in response.headers["Cache-Control"]
+
+@pytest.mark.parametrize("filename", ["missing.csv", "coverage_tracks", "sporulation_CV_statistics_columns", ".."])
+def test_not_found(client, filename):
+    assert client.get(f"/data/{filename}").status_code == 404
@@ -0,0 +1,110 @@
+"""Incremental rebuilds from the ingest manifest must match a clean full rebuild"""
+import json
+import os
+
+import pytest
+
+import script
+
+def stage_names(report):
+    return [stage["stage"] for stage in report.stages]
+
+def data_outputs(pipeline):
+    """Contents of every file the pipeline wrote to the data directory, besides the manifest"""
+    return {
+        filename: pipeline.read_data(filename) for filename in sorted(os.listdir(pipeline.data_dir))
+        if os.path.isfile(os.path.join(pipeline.data_dir, filename)) and filename != script.MANIFEST_FILENAME
+    }
+
+def edit_counts(path):
+    """Change the first M1 count of a gene CSV"""
+    with open(path) as f:
+        lines = f.read().split("\n")
+    fields = lines[1].split(",")
+    fields[2] = str(int(fields[2]) + 12345)
+    lines[1] = ",".join(fields)
+    with open(path, 'w') as f:
+        f.write("\n".join(lines))
+
+def manifest_path(pipeline):
+    return os.path.join(pipeline.data_dir, script.MANIFEST_FILENAME)
+
+def test_unchanged_rerun_skips_every_gene(pipeline):
+    first = pipeline.run()
+    assert first.to_dict()["files_computed"] == 12
+    outputs = data_outputs(pipeline)
+
+    second = pipeline.run()
+    assert second.to_dict()["files_computed"] == 0
+    assert second.reused_files == 12
+    assert stage_names(second) == ["ingest"]
+    assert data_outputs(pipeline) == outputs
+    assert "Summary_Stats_All_Sporulation_Genes.txt" in outputs
+
+def test_changed_input_reprocesses_only_that_gene(pipeline):
+    pipeline.run()
+    edit_counts(pipeline.input_file("gene00003"))
+
+    report = pipeline.run()
+    assert [os.path.basename(metrics["file"]) for metrics in report.files] == ["gene00003.csv"]
+    assert report.reused_files == 11
+    assert "coloring" in stage_names(report)
+    incremental = data_outputs(pipeline)
+
+    pipeline.run("--full-rebuild")
+    assert data_outputs(pipeline) == incremental
+
+def test_removed_input_matches_full_rebuild(pipeline):
+    pipeline.run()
+    os.remove(pipeline.input_file("gene00005"))
+
+    report = pipeline.run()
+    assert report.to_dict()["files_computed"] == 0
+    assert "coloring" in stage_names(report)
+    incremental = data_outputs(pipeline)
+    assert b"gene00005" not in incremental["sporulation_CV_statistics.csv"]
+
+    pipeline.run("--full-rebuild")
+    assert data_outputs(pipeline) == incremental
+
+def test_changed_output_settings_rebuild_outputs(pipeline):
+    pipeline.run()
+    report = pipeline.run("--render-mode", "svg")
+    assert report.reused_files == 12
+    assert "plot_export" in stage_names(report)
+
+    assert stage_names(pipeline.run("--render-mode", "svg")) == ["ingest"]
+
+def test_incomplete_manifest_rebuilds_outputs(pipeline):
+    pipeline.run()
+    with open(manifest_path(pipeline)) as f:
+        saved = json.load(f)
+    assert saved["complete"] is True
+    saved["complete"] = False
+    with open(manifest_path(pipeline), 'w') as f:
+        json.dump(saved, f)
+
+    report = pipeline.run()
+    assert report.reused_files == 12
+    assert "precompress" in stage_names(report)
+    with open(manifest_path(pipeline)) as f:
+        assert json.load(f)["complete"] is True
+
+def test_failed_run_leaves_manifest_incomplete(pipeline, monkeypatch):
+    create_summary_files = script.create_summary_files_by_category
+    pipeline.run()
+    edit_counts(pipeline.input_file("gene00003"))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("summary files failed")
+
+    monkeypatch.setattr(script, "create_summary_files_by_category", fail)
+    with pytest.raises(RuntimeError):
+        pipeline.run()
+    with open(manifest_path(pipeline)) as f:
+        assert json.load(f)["complete"] is False
+
+    monkeypatch.setattr(script, "create_summary_files_by_category", create_summary_files)
+    report = pipeline.run()
+    assert report.to_dict()["files_computed"] == 0
+    assert "summary_files" in stage_names(report)
@@ -0,0 +1,35 @@
+"""/metrics needs the dashboard login or, when configured, the scrape token"""
+import pytest
+
+@pytest.fixture
+def anonymous(app_client):
+    app_client.environ_base.pop("HTTP_AUTHORIZATION")
+    return app_client
+
+def test_login_required_by_default(anonymous):
+    response = anonymous.get("/metrics")
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"].startswith("Basic")
+
+    # A proxy on the same host doesn't make a request trusted
+    assert anonymous.get("/metrics", environ_base={"REMOTE_ADDR": "127.0.0.1"}).status_code == 401
+
+@pytest.mark.parametrize("header", ["Basic Z3Vlc3Q6d3Jvbmc=", "Basic !!!", "Bearer secret"])
+def test_bad_credentials(anonymous, header):
+    assert anonymous.get("/metrics", headers={"Authorization": header}).status_code == 401
+
+def test_login(app_client):
+    response = app_client.get("/metrics")
+    assert response.status_code == 200
+    assert "sporulation_" in response.get_data(as_text=True)
+
+def test_token(anonymous, monkeypatch):
+    import app
+    monkeypatch.setattr(app, "METRICS_TOKEN", "secret")
+    assert anonymous.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
+    assert anonymous.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = anonymous.get("/metrics")
+    assert (response.status_code, response.headers["WWW-Authenticate"]) == (401, "Bearer")
+
+def test_healthz_is_public(anonymous):
+    assert anonymous.get("/healthz").get_json()["status"] == "ok"
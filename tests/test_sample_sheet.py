@@ -0,0 +1,79 @@
+"""Sample-sheet parsing and sample-sheet runs against the default M1-Y3 pipeline"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import script
+from coverage_tracks import load_track_index, track_window
+
+DEFAULT_LAYOUT = """sample,group,color,label
+M1,M,red,Mfd-
+M2,M,,
+M3,M,,
+Y1,Y,blue,YB955
+Y2,Y,,
+Y3,Y,,
+"""
+
+def write_sheet(tmp_path, text, name="sheet.csv"):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+def data_outputs(pipeline):
+    """Every file under the data directory except the manifest, keyed by relative path"""
+    outputs = {}
+    for root, _, files in os.walk(pipeline.data_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            if name != script.MANIFEST_FILENAME:
+                with open(path, 'rb') as f:
+                    outputs[os.path.relpath(path, pipeline.data_dir)] = f.read()
+    return outputs
+
+def test_default_layout_sheet(tmp_path):
+    sheet = script.SampleSheet.load(write_sheet(tmp_path, DEFAULT_LAYOUT))
+    assert sheet.samples == script.SAMPLES
+    assert sheet.columns == list(range(6))
+    assert sheet.category_priority() == script.CATEGORY_PRIORITY
+    assert sheet.category_order() == script.CATEGORY_ORDER
+
+@pytest.mark.parametrize("text, message", [
+    ("sample,color\nM1,red\n", "missing column(s): group"),
+    ("name,strain\nM1,M\n", "missing column(s): sample, group"),
+    ("sample,group\nM1,M\nM1,Y\n", "must be unique"),
+    ("sample,group\nM1,M\nY1,\n", "needs a group"),
+    ("sample,group\nM1,M\n,Y\n", "needs a sample name"),
+    ("sample,group,color\nM1,M,red\nY1,Y,red\n", "Group colors"),
+    ("sample,group,color\nM1,M,green\n", "Group colors"),
+    ("sample,group,label\nM1,M,Common Genes\n", "Group labels"),
+    ("sample,group,label\nM1,M,a/b\n", "Group labels"),
+])
+def test_invalid_sheet(tmp_path, text, message):
+    with pytest.raises(ValueError, match=message.replace("(", r"\(").replace(")", r"\)")):
+        script.SampleSheet.load(write_sheet(tmp_path, text))
+
+def test_default_layout_sheet_reproduces_default_outputs(pipeline, tmp_path):
+    pipeline.run()
+    default = data_outputs(pipeline)
+    pipeline.run("--sample-sheet", write_sheet(tmp_path, DEFAULT_LAYOUT))
+    assert data_outputs(pipeline) == default
+
+def test_default_run_after_sheet_run_rewrites_tracks(pipeline, tmp_path):
+    pipeline.run()
+    pipeline.run("--sample-sheet", write_sheet(tmp_path, "sample,group\nM1,M\nM2,M\nY1,Y\nY2,Y\n"))
+    tracks_dir = os.path.join(pipeline.data_dir, script.TRACKS_DIRNAME)
+    assert load_track_index(tracks_dir)["samples"] == ["M1", "M2", "Y1", "Y2"]
+
+    pipeline.run()
+    index = load_track_index(tracks_dir)
+    assert index["samples"] == script.SAMPLES
+    for gene, rows in index["genes"].items():
+        counts = pd.read_csv(pipeline.input_file(gene)).to_numpy()[:, 2::3]
+        assert rows == len(counts)
+        window = track_window(tracks_dir, index, gene, max_points=rows)
+        assert window["bin_size"] == 1
+        for i, sample in enumerate(script.SAMPLES):
+            np.testing.assert_array_equal(window["samples"][sample]["mean"], counts[:, i])
@@ -0,0 +1,88 @@
+"""compute_significance must be reproducible from its seed and well-behaved on degenerate genes"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import script
+
+FIRST, SECOND = script.SAMPLES[:3], script.SAMPLES[3:]
+
+def statistics_frame(cv, value_range, samples=script.SAMPLES):
+    """A long Gene/Sample/CV/Range frame from genes x samples CV and Range arrays"""
+    genes = [f"gene{i:05d}" for i in range(len(cv))]
+    return pd.DataFrame({
+        "Gene": np.repeat(genes, len(samples)),
+        "Sample": np.tile(samples, len(genes)),
+        "CV": np.ravel(cv),
+        "Range": np.ravel(value_range),
+    })
+
+def random_frame(n_genes, seed=0):
+    rng = np.random.default_rng(seed)
+    return statistics_frame(rng.uniform(0, 0.5, (n_genes, 6)), rng.integers(0, 3000, (n_genes, 6)))
+
+@pytest.mark.parametrize("workers, chunk", [(1, 7), (2, 256), (3, 5), (2, 1)])
+def test_results_independent_of_workers_and_chunks(monkeypatch, workers, chunk):
+    df = random_frame(23)
+    reference = script.compute_significance(df, FIRST, SECOND, n_resamples=300, seed=5)
+
+    monkeypatch.setattr(script, "SIGNIFICANCE_GENE_CHUNK", chunk)
+    result = script.compute_significance(df, FIRST, SECOND, n_resamples=300, seed=5, workers=workers)
+    pd.testing.assert_frame_equal(result, reference)
+
+def test_seed_changes_draws():
+    df = random_frame(23)
+    first = script.compute_significance(df, FIRST, SECOND, n_resamples=300, seed=1)
+    second = script.compute_significance(df, FIRST, SECOND, n_resamples=300, seed=2)
+    assert not first["CV_Diff_Low"].equals(second["CV_Diff_Low"])
+
+def test_p_value_floor():
+    # Ten well-separated replicates per group: no label permutation comes close to the observed difference
+    samples = [f"A{i}" for i in range(10)] + [f"B{i}" for i in range(10)]
+    cv = np.r_[np.linspace(0.40, 0.45, 10), np.linspace(0.01, 0.02, 10)][None, :]
+    value_range = np.r_[np.arange(2000, 2010), np.arange(10, 20)][None, :]
+    df = statistics_frame(cv, value_range, samples)
+
+    n_resamples = 199
+    result = script.compute_significance(df, samples[:10], samples[10:], n_resamples=n_resamples)
+    assert result["CV_Diff_P"].iloc[0] == 1 / (n_resamples + 1)
+    assert result["Range_Diff_P"].iloc[0] == 1 / (n_resamples + 1)
+
+def test_p_values_never_zero():
+    result = script.compute_significance(random_frame(40), FIRST, SECOND, n_resamples=50)
+    p_values = result[["CV_Diff_P", "Range_Diff_P"]].to_numpy()
+    assert (p_values >= 1 / 51).all() and (p_values <= 1).all()
+
+def test_degenerate_genes():
+    cv = np.array([
+        [0.1, 0.2, 0.3, 0.1, 0.2, 0.3],
+        [0.1, np.nan, 0.3, 0.1, 0.2, 0.3],    # a sample without statistics
+        [np.nan] * 6,                         # all-zero counts: SD / mean is NaN
+        [0.25] * 6,                           # zero variance across samples
+    ])
+    value_range = np.array([
+        [10, 20, 30, 40, 50, 60],
+        [10, 20, 30, 40, 50, 60],
+        [0] * 6,
+        [500] * 6,
+    ])
+    with np.errstate(all="raise"):
+        result = script.compute_significance(statistics_frame(cv, value_range), FIRST, SECOND, n_resamples=100)
+
+    columns = [f"CV_{suffix}" for suffix in ["Diff", "Diff_Low", "Diff_High", "Diff_P"]]
+    assert result.loc["gene00001", columns].isna().all()
+    assert result.loc["gene00002", columns].isna().all()
+    assert result.loc["gene00001", "Range_Diff"] == pytest.approx(-30)
+
+    # No difference to find: the interval collapses to 0 and every permutation ties the observed difference
+    for metric in script.SIGNIFICANCE_METRICS:
+        assert result.loc["gene00003", [f"{metric}_Diff", f"{metric}_Diff_Low", f"{metric}_Diff_High"]].eq(0).all()
+        assert result.loc["gene00003", f"{metric}_Diff_P"] == 1
+    assert result.loc["gene00002", "Range_Diff_P"] == 1
+
+def test_add_significance_replaces_columns():
+    df = random_frame(4)
+    once = script.add_significance(df, FIRST, SECOND, n_resamples=50)
+    twice = script.add_significance(once, FIRST, SECOND, n_resamples=50)
+    pd.testing.assert_frame_equal(once, twice)
+    assert len(once) == len(df)
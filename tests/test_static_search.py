@@ -0,0 +1,37 @@
+"""The static search build's files must identify the build they belong to"""
+import json
+import os
+
+from compact_figure import load_figure
+from static_search import SEARCH_BASE_FILENAME, SEARCH_DIRNAME, SEARCH_INDEX_FILENAME, write_static_search
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIGURE = os.path.join(ROOT, "assets", "all_sporulation_genes_scatter_plot.json")
+
+def build(fig_dict, assets_dir):
+    write_static_search(fig_dict, str(assets_dir))
+    files = {}
+    for name in [SEARCH_BASE_FILENAME, SEARCH_INDEX_FILENAME]:
+        with open(os.path.join(str(assets_dir), SEARCH_DIRNAME, name), 'r') as f:
+            files[name] = json.load(f)
+    return files[SEARCH_BASE_FILENAME], files[SEARCH_INDEX_FILENAME]
+
+def test_base_and_index_share_the_build_version(tmp_path):
+    fig_dict = load_figure(FIGURE)
+    base, index = build(fig_dict, tmp_path / "first")
+    assert base["version"] == index["version"]
+
+    # Same figure, same version; any change to the figure gives a new one
+    assert build(fig_dict, tmp_path / "again")[0]["version"] == base["version"]
+    trace = dict(fig_dict["data"][0], name="Renamed")
+    changed_base, changed_index = build(dict(fig_dict, data=[trace] + fig_dict["data"][1:]), tmp_path / "changed")
+    assert changed_base["version"] == changed_index["version"] != base["version"]
+
+def test_committed_build_matches_its_figure(tmp_path):
+    base, index = build(load_figure(FIGURE), tmp_path)
+    committed_base, committed_index = (
+        json.load(open(os.path.join(ROOT, "assets", SEARCH_DIRNAME, name), 'r'))
+        for name in [SEARCH_BASE_FILENAME, SEARCH_INDEX_FILENAME]
+    )
+    assert committed_base == base
+    assert committed_index == index
@@ -0,0 +1,78 @@
+"""The streaming statistics reader must match the whole-file pandas path"""
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import script
+
+def write_gene(path, counts):
+    """Write a gene CSV in the pipeline's layout from a rows x samples list of count strings"""
+    header = ",".join(f"{sample}_ref,{sample}_pos,{sample}_count" for sample in script.SAMPLES)
+    lines = [header]
+    for pos, row in enumerate(counts):
+        lines.append(",".join(f"A,{pos},{value}" for value in row))
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+def random_counts(rng, n_rows):
+    base = rng.uniform(200, 9000, len(script.SAMPLES))
+    counts = np.clip(rng.normal(base, base * 0.2, (n_rows, len(script.SAMPLES))), 0, None).astype(np.int64)
+    return [[str(value) for value in row] for row in counts]
+
+def compare(file, chunksize):
+    _, expected, _, expected_log, _ = script.compute_gene_stats(file)
+    _, actual, _, actual_log, _ = script.compute_gene_stats(file, streaming=True, chunksize=chunksize)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9)
+    assert [level for level, _ in actual_log] == [level for level, _ in expected_log]
+
+@pytest.mark.parametrize("chunksize", [1, 3, 7, 1000])
+def test_integral_counts(tmp_path, chunksize):
+    counts = random_counts(np.random.default_rng(0), 50)
+    file = write_gene(tmp_path / "geneA.csv", counts)
+    compare(file, chunksize)
+    _, stats, _, _, _ = script.compute_gene_stats(file, streaming=True, chunksize=chunksize)
+    assert pd.api.types.is_integer_dtype(stats["Range"])
+
+@pytest.mark.parametrize("chunksize", [1, 4, 1000])
+def test_missing_and_non_numeric(tmp_path, chunksize):
+    counts = random_counts(np.random.default_rng(1), 40)
+    counts[5][0] = ""
+    counts[17][3] = "n/a"
+    counts[30][5] = "x"
+    file = write_gene(tmp_path / "geneB.csv", counts)
+    compare(file, chunksize)
+
+@pytest.mark.parametrize("chunksize", [2, 1000])
+def test_missing_in_late_chunk_only(tmp_path, chunksize):
+    counts = random_counts(np.random.default_rng(2), 20)
+    counts[19][2] = ""
+    compare(write_gene(tmp_path / "geneC.csv", counts), chunksize)
+
+def test_column_without_values(tmp_path):
+    counts = random_counts(np.random.default_rng(3), 10)
+    for row in counts:
+        row[4] = ""
+    compare(write_gene(tmp_path / "geneD.csv", counts), 3)
+
+def test_single_row(tmp_path):
+    compare(write_gene(tmp_path / "geneE.csv", random_counts(np.random.default_rng(4), 1)), 1)
+
+def test_nan_rows_only_kept_for_dump(tmp_path):
+    counts = random_counts(np.random.default_rng(5), 100)
+    for row in counts[::2]:
+        row[1] = "x"
+    file = write_gene(tmp_path / "geneF.csv", counts)
+
+    _, nan_count, nan_rows, n_rows = script.compute_count_stats_streaming(file, chunksize=7)
+    assert (nan_count, n_rows) == (50, 100)
+    assert nan_rows.empty
+
+    _, nan_count, nan_rows, _ = script.compute_count_stats_streaming(file, chunksize=7, dump_rows=True,
+                                                                     max_dump_rows=12)
+    assert nan_count == 50
+    assert list(nan_rows.index) == list(range(0, 24, 2))
+
+    _, _, _, log, _ = script.compute_gene_stats(file, streaming=True, chunksize=7, dump_rows=True)
+    assert any(level == logging.WARNING for level, _ in log)
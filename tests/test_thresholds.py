@@ -0,0 +1,87 @@
+"""The dashboard's threshold sliders must classify genes exactly as script.py does"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+import script
+
+def random_stats(rng, n_genes):
+    return pd.DataFrame({
+        "Gene": np.repeat([f"gene{g:03d}" for g in range(n_genes)], len(script.SAMPLES)),
+        "Sample": script.SAMPLES * n_genes,
+        "Mean": rng.uniform(100, 5000, n_genes * len(script.SAMPLES)),
+        "SD": rng.uniform(1, 500, n_genes * len(script.SAMPLES)),
+        "CV": rng.uniform(0, 0.4, n_genes * len(script.SAMPLES)),
+        "Range": rng.uniform(0, 6000, n_genes * len(script.SAMPLES)).round()
+    })
+
+def scatter_figure(df):
+    """A figure dict with one trace per color, laid out as create_interactive_plot's"""
+    data = []
+    for color, points in df.groupby("Color", sort=False):
+        data.append({
+            "type": "scattergl",
+            "mode": "markers",
+            "marker": {"color": color, "size": 5, "opacity": 1.0},
+            "x": points["CV"].tolist(),
+            "y": points["Range"].tolist(),
+            "customdata": points[["Gene", "Sample", "Mean", "SD"]].values.tolist(),
+            "hovertemplate": "%{customdata[0]}"
+        })
+    return {"data": data, "layout": {}}
+
+def threshold_model(df):
+    fig_dict = app.ensure_category_traces(scatter_figure(df))
+    index = app.build_search_index(fig_dict, set(df["Gene"].str.lower()))
+    return app.build_threshold_model(fig_dict, index), index
+
+@pytest.mark.parametrize("cv_threshold, range_threshold", [(0.11, 2000), (0.05, 1000), (0.2, 500), (0.3, 5000),
+                                                          (0.0, 0), (1.0, 10000)])
+def test_matches_pipeline(tmp_path, monkeypatch, cv_threshold, range_threshold):
+    df = script.process_dataframe_with_colors(random_stats(np.random.default_rng(0), 300))
+    model, index = threshold_model(df)
+    assert model["enabled"]
+
+    monkeypatch.setattr(script, "CV_THRESHOLD", cv_threshold)
+    monkeypatch.setattr(script, "RANGE_THRESHOLD", range_threshold)
+    expected = script.process_dataframe_with_colors(df.drop(columns="Color"))
+    expected_colors = dict(zip(zip(expected["Gene"], expected["Sample"]), expected["Color"]))
+    expected_categories = script.create_gene_category_summary(expected, str(tmp_path))
+
+    point_codes, gene_categories = app.classify_points(model, cv_threshold, range_threshold)
+    actual_colors = {(row[0], row[1]): app.CATEGORY_COLORS[code]
+                     for row, code in zip(model["customdata"], point_codes)}
+    assert actual_colors == expected_colors
+
+    actual_categories = {index["genes"][i]: app.CATEGORY_NAMES[code] for i, code in enumerate(gene_categories)}
+    assert actual_categories == {gene.lower(): category for gene, category
+                                 in zip(expected_categories["Gene"], expected_categories["Category"])}
+
+def test_view_counts(monkeypatch):
+    df = script.process_dataframe_with_colors(random_stats(np.random.default_rng(1), 100))
+    model, index = threshold_model(df)
+    view = app.threshold_view(model, index, 0.2, 3000)
+    assert sum(view["counts"].values()) == 100
+    assert sum(len(slot) for slot in view["slots"] if slot is not None) == len(df)
+
+def test_sample_sheet_figure_is_left_alone():
+    rng = np.random.default_rng(2)
+    samples = ["S001", "S002", "S003", "S004"]
+    df = pd.DataFrame({
+        "Gene": np.repeat([f"gene{g:03d}" for g in range(20)], len(samples)),
+        "Sample": samples * 20,
+        "Mean": 1000.0, "SD": 100.0,
+        "CV": rng.uniform(0, 0.4, 80),
+        "Range": rng.uniform(0, 6000, 80),
+        "Color": rng.choice(["red", "purple", "gray"], 80)
+    })
+    fig_dict = scatter_figure(df)
+    assert not app.supports_threshold_model(fig_dict)
+
+    index = app.build_search_index(fig_dict, set(df["Gene"].str.lower()))
+    model = app.build_threshold_model(fig_dict, index)
+    assert not model["enabled"]
+    view = app.threshold_view(model, index, 0.01, 10)
+    assert view["thresholds"] == model["default_thresholds"]
+    assert [list(slot) for slot in view["slots"]] == [list(info["points"]) for info in index["traces"]]